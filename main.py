@@ -1,5 +1,5 @@
 from src.audio.classifier import AudioClassifier
-import librosa
+import soundfile as sf
 def test_model():
 
     file_num = input ('''Enter audio file: 
@@ -32,8 +32,8 @@ def test_model():
     
     if audio_path: 
         try: 
-            full_audio, sample_rate = librosa.load(audio_path, sr=16000)
-            duration = len(full_audio) / sample_rate
+            # read the duration from the header instead of decoding the whole file
+            duration = sf.info(audio_path).duration
             print(f"📊 Audio duration: {duration:.1f} seconds ({duration/60:.1f} minutes)")
         
             if duration > 30: 
@@ -0,0 +1,100 @@
+import os
+import json
+import hashlib
+import numpy as np
+import torch
+from .audio_model import waveform_to_spectrogram
+from .waveform_bank import load_chunk, chunk_signature
+
+RARITY_WEIGHT = 0.5  # how much predicted rare classes lift a chunk in the queue
+
+
+def model_fingerprint(model):
+    """Short hash of the weights, so cached scores are dropped after a retrain"""
+    h = hashlib.sha1()
+    for tensor in model.state_dict().values():
+        h.update(tensor.detach().cpu().numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def score_chunks(chunk_files, model, audio_dir, cache_path=None, batch_size=32, store=None):
+    """Sigmoid probabilities for every chunk, computed in batches and cached per (file, model)"""
+    fingerprint = model_fingerprint(model)
+    cache = {}
+    if cache_path:
+        try:
+            with open(cache_path, "r") as f:
+                cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            cache = {}
+    if cache.get("model") != fingerprint:
+        cache = {"model": fingerprint, "chunks": {}}
+
+    probs = {}
+    todo = []
+    for chunk_file in chunk_files:
+        signature = chunk_signature(audio_dir, chunk_file, store)
+        entry = cache["chunks"].get(chunk_file)
+        if entry and entry["signature"] == signature:
+            probs[chunk_file] = np.array(entry["probs"])
+        else:
+            todo.append((chunk_file, signature))
+
+    if todo:
+        print(f"Scoring {len(todo)} chunks ({len(chunk_files) - len(todo)} cached)...")
+    model.eval()
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        audio = np.stack([load_chunk(audio_dir, f, store).mean(axis=0) for f, _ in batch])
+        with torch.no_grad():
+            batch_probs = torch.sigmoid(model(waveform_to_spectrogram(audio))).numpy()
+        for (chunk_file, signature), p in zip(batch, batch_probs):
+            probs[chunk_file] = p
+            cache["chunks"][chunk_file] = {"signature": signature, "probs": p.tolist()}
+
+    if cache_path and todo:
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp, cache_path)
+    return probs
+
+
+def uncertainty(p, threshold, strategy="entropy"):
+    """0 = confident, 1 = maximally unsure"""
+    p = np.clip(p, 1e-6, 1 - 1e-6)
+    if strategy == "entropy":
+        # mean binary entropy over labels, in bits
+        return float(np.mean(-(p * np.log2(p) + (1 - p) * np.log2(1 - p))))
+    # margin: how close the least decided label sits to the threshold
+    margin = np.abs(p - threshold) / max(threshold, 1 - threshold)
+    return float(1 - margin.min())
+
+
+def rank_chunks(chunk_files, model, all_labels, threshold, audio_dir, existing_labels,
+                strategy="entropy", cache_path=None, store=None):
+    """Order chunks most-informative first: uncertain ones, boosted when they look like rare classes.
+
+    Returns (ordered chunk files, chunk -> probabilities) so the caller doesn't
+    need to run the model again for each chunk.
+    """
+    probs = score_chunks(chunk_files, model, audio_dir, cache_path, store=store)
+
+    # rarity from the labels collected so far; unseen classes are the rarest
+    counts = np.zeros(len(all_labels))
+    index = {label: i for i, label in enumerate(all_labels)}
+    for labels in existing_labels.values():
+        for label in labels:
+            if label in index:
+                counts[index[label]] += 1
+    rarity = 1.0 / (1.0 + counts)
+    rarity = rarity / rarity.max()
+
+    scores = {}
+    for chunk_file in chunk_files:
+        p = probs[chunk_file]
+        rare_bonus = float((p * rarity).sum() / max(p.sum(), 1e-6))
+        scores[chunk_file] = uncertainty(p, threshold, strategy) + RARITY_WEIGHT * rare_bonus
+
+    ordered = sorted(chunk_files, key=lambda c: scores[c], reverse=True)
+    return ordered, probs
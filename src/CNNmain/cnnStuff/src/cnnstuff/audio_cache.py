@@ -0,0 +1,127 @@
+import os
+import glob
+import hashlib
+import struct
+import librosa
+import numpy as np
+
+# Decoded-audio cache: mono float32 PCM stored as .npy files that are memory-mapped on reuse.
+# Entries are keyed by source path, mtime, size and target sample rate, so editing or
+# replacing a source file simply misses the old entry, which then ages out of the LRU.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get(
+    "AUDIO_CACHE_DIR",
+    os.path.abspath(os.path.join(script_dir, "..", "..", "..", "data", "decoded_cache")),
+)
+MAX_CACHE_BYTES = int(os.environ.get("AUDIO_CACHE_MAX_BYTES", 4 * 1024**3))
+
+# fixed-size .npy header so a streamed entry can be written before its length is known
+_HEADER_LEN = 128
+
+
+def _npy_header(n_samples, frame_shape=()):
+    shape = "".join(f"{d}, " for d in (n_samples, *frame_shape)).rstrip(" ")
+    header = "{'descr': '<f4', 'fortran_order': False, 'shape': (%s), }" % shape
+    header = header.ljust(_HEADER_LEN - 10 - 1) + "\n"
+    return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+def cache_path(audio_path, sr, cache_dir=None):
+    """Where the decoded copy of audio_path at sr lives (whether or not it exists yet)"""
+    st = os.stat(audio_path)
+    key = f"{os.path.abspath(audio_path)}|{st.st_mtime_ns}|{st.st_size}|{sr}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir or CACHE_DIR, f"{digest}.npy")
+
+
+def get_cached(audio_path, sr, cache_dir=None):
+    """Memory-mapped decoded audio, or None on a cache miss"""
+    path = cache_path(audio_path, sr, cache_dir)
+    try:
+        audio = np.load(path, mmap_mode="r")
+    except (FileNotFoundError, ValueError):
+        return None
+    os.utime(path)  # mark as recently used
+    return audio
+
+
+def evict(max_bytes=None, cache_dir=None, keep=None):
+    """Delete least recently used entries until the cache fits in max_bytes"""
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir or CACHE_DIR, "*.npy")):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+
+class CacheWriter:
+    """Builds a cache entry block by block while a file is being stream-decoded
+
+    frame_shape is the shape of each row after the first axis, e.g. () for
+    audio samples or (frames, mel_bins) for per-segment features.
+    """
+
+    def __init__(self, audio_path, sr, cache_dir=None, frame_shape=()):
+        self.path = cache_path(audio_path, sr, cache_dir)
+        self.cache_dir = cache_dir
+        self.frame_shape = tuple(frame_shape)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.tmp = f"{self.path}.{os.getpid()}.tmp"
+        self.f = open(self.tmp, "wb")
+        self.f.write(_npy_header(0, self.frame_shape))
+        self.n_samples = 0
+
+    def append(self, block):
+        block = np.ascontiguousarray(block, dtype="<f4")
+        self.f.write(block.tobytes())
+        self.n_samples += len(block)
+
+    def commit(self):
+        self.f.seek(0)
+        self.f.write(_npy_header(self.n_samples, self.frame_shape))
+        self.f.close()
+        os.replace(self.tmp, self.path)
+        evict(cache_dir=self.cache_dir, keep=self.path)
+
+    def abort(self):
+        self.f.close()
+        try:
+            os.remove(self.tmp)
+        except OSError:
+            pass
+
+
+def load_audio(audio_path, sr, cache_dir=None):
+    """Drop-in for librosa.load(audio_path, sr=sr) that decodes each file only once"""
+    audio = get_cached(audio_path, sr, cache_dir)
+    if audio is not None:
+        return audio, sr
+
+    audio, _ = librosa.load(audio_path, sr=sr)
+    writer = None
+    try:
+        writer = CacheWriter(audio_path, sr, cache_dir)
+        writer.append(audio)
+        writer.commit()
+    except OSError as e:
+        # an unwritable cache shouldn't stop the analysis
+        if writer is not None:
+            writer.abort()
+        print(f"Warning: Could not cache decoded audio ({e}).")
+    return audio, sr
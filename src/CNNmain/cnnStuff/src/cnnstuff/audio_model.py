@@ -3,21 +3,41 @@ import torch.nn as nn
 import torchaudio.transforms as T
 import librosa
 import numpy as np
+import json
+import os
 
 class AudioCNN(nn.Module):
-    """Simple CNN for audio classification"""
-    def __init__(self, num_classes=7): # Adjusted for new label count
+    """Simple CNN for audio classification
+
+    The defaults build the original topology (and load its checkpoints).
+    width scales the channel counts, separable swaps the second conv for a
+    depthwise-separable one, and stem_stride downsamples in the first conv.
+    causal drops the time padding so no output looks at future frames, which
+    lets StreamingAudioCNN (streaming.py) update it a few frames at a time.
+    """
+    def __init__(self, num_classes=7, width=1.0, separable=False, stem_stride=1, causal=False): # Adjusted for new label count
         super().__init__()
+        c1 = max(8, int(round(32 * width)))
+        c2 = max(8, int(round(64 * width)))
+        padding = (1, 0) if causal else 1  # (freq, time)
+        self.causal = causal
+        if separable:
+            second = nn.Sequential(
+                nn.Conv2d(c1, c1, 3, padding=padding, groups=c1),  # depthwise
+                nn.Conv2d(c1, c2, 1),                              # pointwise
+            )
+        else:
+            second = nn.Conv2d(c1, c2, 3, padding=padding)
         self.features = nn.Sequential(
-            nn.Conv2d(1, 32, 3, padding=1),
+            nn.Conv2d(1, c1, 3, stride=stem_stride, padding=padding),
             nn.ReLU(),
             nn.MaxPool2d(2),
-            nn.Conv2d(32, 64, 3, padding=1), 
+            second, 
             nn.ReLU(),
             nn.AdaptiveAvgPool2d((1, 1))
         )
         self.flatten = nn.Flatten()
-        self.classifier = nn.Linear(64, num_classes)
+        self.classifier = nn.Linear(c2, num_classes)
     
     def forward(self, x):
         x = self.features(x)
@@ -25,19 +45,98 @@ class AudioCNN(nn.Module):
         # No activation here, BCEWithLogitsLoss will handle it
         return self.classifier(x)
 
+# Named AudioCNN configurations, from most accurate to fastest
+MODEL_VARIANTS = {
+    "simple": {},
+    "slim": {"width": 0.5},
+    "dsconv": {"separable": True},
+    "dsconv_slim": {"separable": True, "width": 0.5},
+    "fast": {"separable": True, "width": 0.5, "stem_stride": 2},
+    "causal": {"causal": True},
+    "causal_dsconv": {"causal": True, "separable": True},
+}
+
+def build_model(variant="simple", num_classes=7):
+    if variant not in MODEL_VARIANTS:
+        raise ValueError(f"Unknown model variant '{variant}'. Choose from: {', '.join(MODEL_VARIANTS)}")
+    return AudioCNN(num_classes=num_classes, **MODEL_VARIANTS[variant])
+
+def metadata_path(model_path):
+    """audio_model.pth -> audio_model.json, where the variant is recorded"""
+    return os.path.splitext(model_path)[0] + ".json"
+
+def save_model(model, model_path, variant, labels, trained_on=None):
+    """Write weights (atomically) and the metadata needed to rebuild the model
+
+    trained_on is the {chunk: labels} the checkpoint has learned from, so an
+    incremental fine-tune can tell which labels were added or changed since.
+    """
+    metadata = {"variant": variant, "config": MODEL_VARIANTS[variant], "labels": labels}
+    if trained_on is not None:
+        metadata["trained_on"] = trained_on
+    # both files are written then renamed so a live HotReloadingModel never sees a partial
+    # file, weights first so new metadata never describes the old weights
+    torch.save(model.state_dict(), model_path + ".tmp")
+    os.replace(model_path + ".tmp", model_path)
+    meta_path = metadata_path(model_path)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(meta_path + ".tmp", meta_path)
+
+def load_metadata(model_path):
+    """The checkpoint's metadata, or {} for checkpoints saved before metadata existed"""
+    try:
+        with open(metadata_path(model_path), "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def load_model_weights(model_path, num_classes):
+    """Build the right variant for a checkpoint and load its weights (no metadata = original AudioCNN)"""
+    variant = load_metadata(model_path).get("variant", "simple")
+    model = build_model(variant, num_classes)
+    model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    return model
+
+SAMPLE_RATE = 22050
+CLIP_SECONDS = 3.0
+N_MELS = 64
+
+_mel_transform = None
+
+def get_mel_transform():
+    """Shared mel transform so the filterbank is only built once per process"""
+    global _mel_transform
+    if _mel_transform is None:
+        _mel_transform = T.MelSpectrogram(sample_rate=SAMPLE_RATE, n_mels=N_MELS)
+    return _mel_transform
+
+def waveform_to_spectrogram(audio):
+    """Convert a mono waveform at SAMPLE_RATE (or a batch of them) to a spectrogram tensor"""
+    audio_tensor = torch.as_tensor(audio, dtype=torch.float32)
+
+    # Create mel spectrogram
+    mel_spec = get_mel_transform()(audio_tensor)
+
+    # Add channel dimension for CNN
+    return mel_spec.unsqueeze(-3)
+
+def prepare_waveform(audio, sr, downmix_channels=None):
+    """Downmix and resample raw (samples, channels) audio to the mono clip the model expects
+
+    downmix_channels is the divisor for the downmix when audio holds only some
+    of a device's channels (see capture's active channels); default is the mean.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if audio.ndim == 2:
+        audio = audio.sum(axis=1) / (downmix_channels or audio.shape[1])
+    if sr != SAMPLE_RATE:
+        audio = librosa.resample(audio, orig_sr=sr, target_sr=SAMPLE_RATE)
+    return audio[:int(SAMPLE_RATE * CLIP_SECONDS)]
+
 def audio_to_spectrogram(audio_path):
     """Convert audio file to spectrogram tensor"""
     # Load audio
-    audio, sr = librosa.load(audio_path, sr=22050, duration=3.0)
-    
-    # Convert to tensor
-    audio_tensor = torch.tensor(audio)
-    
-    # Create mel spectrogram
-    mel_transform = T.MelSpectrogram(sample_rate=22050, n_mels=64)
-    mel_spec = mel_transform(audio_tensor)
-    
-    # Add channel dimension for CNN
-    mel_spec = mel_spec.unsqueeze(0)
-    
-    return mel_spec
\ No newline at end of file
+    audio, sr = librosa.load(audio_path, sr=SAMPLE_RATE, duration=CLIP_SECONDS)
+
+    return waveform_to_spectrogram(audio)
@@ -0,0 +1,92 @@
+import json
+import time
+import argparse
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Subset
+from .audio_model import MODEL_VARIANTS, SAMPLE_RATE, CLIP_SECONDS, build_model, waveform_to_spectrogram
+from .train_model import SimpleAudioDataset, SpectrogramCollate, fit, get_data_paths
+
+
+def measure_latency(model, runs=50, warmup=5):
+    """Median / p95 CPU latency in ms for one 3-second window"""
+    spectrogram = waveform_to_spectrogram(torch.zeros(int(SAMPLE_RATE * CLIP_SECONDS))).unsqueeze(0)
+    model.eval()
+    times = []
+    with torch.no_grad():
+        for i in range(warmup + runs):
+            start = time.perf_counter()
+            model(spectrogram)
+            if i >= warmup:
+                times.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(times)), float(np.percentile(times, 95))
+
+
+def f1_score(model, dataloader, threshold=0.5):
+    """Micro-averaged F1 over all labels"""
+    tp = fp = fn = 0
+    model.eval()
+    with torch.no_grad():
+        for data, target in dataloader:
+            pred = torch.sigmoid(model(data)) > threshold
+            truth = target > 0.5
+            tp += int((pred & truth).sum())
+            fp += int((pred & ~truth).sum())
+            fn += int((~pred & truth).sum())
+    return 2 * tp / max(1, 2 * tp + fp + fn)
+
+
+def benchmark(variants, epochs=10, val_fraction=0.2, seed=0):
+    paths = get_data_paths()
+    with open(paths["labels"], "r") as f:
+        all_labels = json.load(f)
+
+    dataset = SimpleAudioDataset(paths["manual_labels"], paths["audio_chunks"], all_labels, paths["waveform_bank"])
+    generator = torch.Generator().manual_seed(seed)
+    order = torch.randperm(len(dataset), generator=generator).tolist()
+    n_val = max(1, int(len(dataset) * val_fraction))
+    collate = SpectrogramCollate()
+    train_loader = DataLoader(Subset(dataset, order[n_val:]), batch_size=8, shuffle=True, collate_fn=collate)
+    val_loader = DataLoader(Subset(dataset, order[:n_val]), batch_size=8, collate_fn=collate)
+
+    results = []
+    for variant in variants:
+        print(f"\n--- {variant} ---")
+        torch.manual_seed(seed)
+        model = build_model(variant, num_classes=len(all_labels))
+        params = sum(p.numel() for p in model.parameters())
+        latency_ms, latency_p95 = measure_latency(model)
+        fit(model, train_loader, epochs, verbose=False)
+        f1 = f1_score(model, val_loader)
+        results.append({
+            "variant": variant,
+            "params": params,
+            "latency_ms": latency_ms,
+            "latency_p95_ms": latency_p95,
+            "val_f1": f1,
+        })
+        print(f"params={params}  latency={latency_ms:.2f} ms (p95 {latency_p95:.2f})  F1={f1:.3f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare AudioCNN variants on CPU latency, size and validation F1.")
+    parser.add_argument("--variants", nargs="+", choices=list(MODEL_VARIANTS), default=list(MODEL_VARIANTS))
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU threads (default: torch's choice)")
+    parser.add_argument("--output", type=str, default=None, help="Optional JSON file for the results.")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    results = benchmark(args.variants, epochs=args.epochs)
+
+    print("\n--- Summary ---")
+    print(f"{'variant':<12} {'params':>8} {'ms':>8} {'p95 ms':>8} {'F1':>6}")
+    for r in results:
+        print(f"{r['variant']:<12} {r['params']:>8} {r['latency_ms']:>8.2f} {r['latency_p95_ms']:>8.2f} {r['val_f1']:>6.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
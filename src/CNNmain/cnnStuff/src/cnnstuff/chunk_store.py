@@ -0,0 +1,246 @@
+import os
+import json
+import glob
+import argparse
+import numpy as np
+import soundfile as sf
+
+# Packed chunk store: audio chunks appended back to back into a few large shard
+# files instead of one small WAV each. PCM is stored interleaved exactly as it
+# would be in the WAV (int16 for the usual PCM_16 chunks, float32 otherwise),
+# and index.jsonl gets one line per chunk with its shard, byte offset, length,
+# sample rate and where it came from. Shards are memory-mapped for reading, so
+# a training pass over the store is a few sequential reads instead of an
+# open/read/close per chunk.
+#
+# Both files are append-only: a chunk's PCM is written and flushed before its
+# index line, so a crash leaves at most unreferenced bytes at the end of a
+# shard or a partial last line. Readers ignore both, and the writer cuts a
+# partial last line off before appending so the next entry starts on its own
+# line. Appending a name that is already stored replaces it (the later index
+# line wins).
+#
+# Chunks keep their WAV filenames as names, so manual_labels.json and the other
+# per-chunk files work unchanged whether a chunk lives here or in audio_chunks/.
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.environ.get(
+    "CHUNK_STORE_DIR",
+    os.path.abspath(os.path.join(script_dir, "..", "..", "..", "data", "chunk_store")),
+)
+SHARD_BYTES = 256 * 1024**2  # ~1900 stereo 3 s chunks at 22.05 kHz per shard
+DTYPES = {"int16": "<i2", "float32": "<f4"}
+
+
+class ChunkStore:
+    """Sharded, append-only chunk container with memory-mapped reads"""
+
+    def __init__(self, store_dir=STORE_DIR, shard_bytes=SHARD_BYTES):
+        self.store_dir = store_dir
+        self.shard_bytes = shard_bytes
+        self.index_path = os.path.join(store_dir, "index.jsonl")
+        self.entries = {}
+        self.maps = {}  # shard -> np.memmap of the whole shard as bytes
+        self.writer = None
+        self.index_file = None
+        self._load_index()
+
+    @staticmethod
+    def exists(store_dir=STORE_DIR):
+        return os.path.exists(os.path.join(store_dir, "index.jsonl"))
+
+    def _shard_path(self, shard):
+        return os.path.join(self.store_dir, f"shard_{shard:05d}.pcm")
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        sizes = {}
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial last line from a crash
+            shard = entry["shard"]
+            if shard not in sizes:
+                path = self._shard_path(shard)
+                sizes[shard] = os.path.getsize(path) if os.path.exists(path) else 0
+            if entry["offset"] + entry["bytes"] <= sizes[shard]:
+                self.entries[entry["name"]] = entry
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def names(self):
+        """Chunk names in storage order, i.e. the order that reads the shards sequentially"""
+        return sorted(self.entries, key=lambda n: (self.entries[n]["shard"], self.entries[n]["offset"]))
+
+    def info(self, name):
+        """The chunk's index entry (shard, offset, bytes, frames, channels, dtype, sample_rate, source, start)"""
+        return self.entries[name]
+
+    def signature(self, name):
+        """Changes whenever the chunk is replaced, like a file's [mtime, size]"""
+        entry = self.entries[name]
+        return [entry["shard"], entry["offset"]]
+
+    def read(self, name):
+        """Raw (frames, channels) PCM as stored, a read-only view into the shard"""
+        entry = self.entries[name]
+        shard = entry["shard"]
+        end = entry["offset"] + entry["bytes"]
+        mm = self.maps.get(shard)
+        if mm is None or len(mm) < end:
+            # shards grow while appending, and a memmap only covers the size it was opened at
+            if self.writer is not None:
+                self.writer[1].flush()
+            mm = np.memmap(self._shard_path(shard), dtype=np.uint8, mode="r")
+            self.maps[shard] = mm
+        pcm = mm[entry["offset"]:end].view(DTYPES[entry["dtype"]])
+        return pcm.reshape(entry["frames"], entry["channels"])
+
+    def load(self, name):
+        """(float32 audio, sample_rate) like sf.read(path, dtype="float32"): (frames,) for mono, else (frames, channels)"""
+        entry = self.entries[name]
+        pcm = self.read(name)
+        if entry["dtype"] == "int16":
+            audio = pcm.astype(np.float32) / 32768.0
+        else:
+            audio = np.array(pcm, dtype=np.float32)
+        return (audio[:, 0] if entry["channels"] == 1 else audio), entry["sample_rate"]
+
+    def _open_writer(self, nbytes):
+        if self.writer is None:
+            shards = sorted(glob.glob(os.path.join(self.store_dir, "shard_*.pcm")))
+            shard = int(os.path.basename(shards[-1])[6:11]) if shards else 0
+            os.makedirs(self.store_dir, exist_ok=True)
+            self._trim_partial_line()
+            self.writer = (shard, open(self._shard_path(shard), "ab"))
+            self.index_file = open(self.index_path, "a")
+        shard, f = self.writer
+        if f.tell() > 0 and f.tell() + nbytes > self.shard_bytes:
+            f.close()
+            self.writer = (shard + 1, open(self._shard_path(shard + 1), "ab"))
+        return self.writer
+
+    def _trim_partial_line(self):
+        """Truncate index.jsonl after its last newline, dropping a line cut short by a crash"""
+        try:
+            f = open(self.index_path, "rb+")
+        except FileNotFoundError:
+            return
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                step = min(4096, end)
+                f.seek(end - step)
+                newline = f.read(step).rfind(b"\n")
+                if newline >= 0:
+                    end = end - step + newline + 1
+                    break
+                end -= step
+            if end < size:
+                f.truncate(end)
+
+    def append(self, name, audio, sample_rate, source=None, start=None, dtype="int16"):
+        """Store (frames,) or (frames, channels) audio under name; float input is written as int16 unless dtype="float32" """
+        audio = np.asarray(audio)
+        if audio.ndim == 1:
+            audio = audio[:, None]
+        if dtype == "int16" and audio.dtype != np.int16:
+            audio = np.clip(np.round(audio * 32768.0), -32768, 32767)  # inverse of load()'s scaling
+        data = np.ascontiguousarray(audio, dtype=DTYPES[dtype]).tobytes()
+
+        shard, f = self._open_writer(len(data))
+        offset = f.tell()
+        f.write(data)
+        f.flush()
+        entry = {
+            "name": name, "shard": shard, "offset": offset, "bytes": len(data),
+            "frames": audio.shape[0], "channels": audio.shape[1], "dtype": dtype,
+            "sample_rate": int(sample_rate), "source": source, "start": start,
+        }
+        self.index_file.write(json.dumps(entry) + "\n")
+        self.index_file.flush()
+        self.entries[name] = entry
+        return entry
+
+    def close(self):
+        if self.writer is not None:
+            self.writer[1].close()
+            self.index_file.close()
+            self.writer = None
+            self.index_file = None
+        self.maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(store_dir=STORE_DIR):
+    """The chunk store if one has been created, else None (chunks are plain WAVs in audio_chunks/)"""
+    return ChunkStore(store_dir) if ChunkStore.exists(store_dir) else None
+
+
+def migrate(audio_dir, store_dir=STORE_DIR, remove=False):
+    """Pack every WAV in audio_dir that isn't stored yet; with remove, delete each WAV once it is stored"""
+    with ChunkStore(store_dir) as store:
+        names = sorted(f for f in os.listdir(audio_dir) if f.endswith(".wav") and f not in store)
+        print(f"Packing {len(names)} chunks from {audio_dir} into {store_dir}...")
+        for i, name in enumerate(names):
+            path = os.path.join(audio_dir, name)
+            subtype = sf.info(path).subtype
+            dtype = "int16" if subtype == "PCM_16" else "float32"
+            audio, sr = sf.read(path, dtype=dtype, always_2d=True)
+            store.append(name, audio, sr, source=path, dtype=dtype)
+            if remove:
+                os.remove(path)
+            if (i + 1) % 1000 == 0:
+                print(f"  {i + 1}/{len(names)}")
+        print(f"✅ Store now holds {len(store)} chunks.")
+    return names
+
+
+def export(out_dir, store_dir=STORE_DIR, names=None):
+    """Write stored chunks back out as WAVs (all of them, or just names)"""
+    store = ChunkStore(store_dir)
+    names = store.names() if names is None else list(names)
+    os.makedirs(out_dir, exist_ok=True)
+    for name in names:
+        entry = store.info(name)
+        subtype = "PCM_16" if entry["dtype"] == "int16" else "FLOAT"
+        sf.write(os.path.join(out_dir, name), store.read(name), entry["sample_rate"], subtype=subtype)
+    store.close()
+    print(f"Exported {len(names)} chunks to {out_dir}/")
+    return names
+
+
+if __name__ == "__main__":
+    data_dir = os.path.abspath(os.path.join(script_dir, "..", "..", "..", "data"))
+    parser = argparse.ArgumentParser(description="Pack audio chunks into sharded files, or export them back to WAVs.")
+    parser.add_argument("--store", default=STORE_DIR, help="Store directory.")
+    parser.add_argument("--migrate", action="store_true", help="Pack the WAVs in --audio_dir into the store.")
+    parser.add_argument("--remove", action="store_true", help="With --migrate, delete each WAV once it is stored.")
+    parser.add_argument("--export", metavar="DIR", help="Write every stored chunk to DIR as a WAV.")
+    parser.add_argument("--audio_dir", default=os.path.join(data_dir, "audio_chunks"))
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate(args.audio_dir, args.store, remove=args.remove)
+    elif args.export:
+        export(args.export, args.store)
+    else:
+        store = ChunkStore(args.store)
+        shards = {e["shard"] for e in store.entries.values()}
+        total = sum(e["bytes"] for e in store.entries.values())
+        print(f"{len(store)} chunks in {len(shards)} shards, {total / 1024**2:.1f} MiB of PCM")
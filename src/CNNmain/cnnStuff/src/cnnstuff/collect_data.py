@@ -1,4 +1,3 @@
-import librosa
 import soundfile as sf
 import os
 import json
@@ -6,8 +5,13 @@ import argparse
 import torch
 import platform
 import subprocess
-from .audio_model import AudioCNN
-from .predict import classify
+import tempfile
+from .audio_model import load_model_weights
+from .predict import classify, classify_waveform, probs_to_labels
+from .active_learning import rank_chunks
+from .fingerprint import FingerprintIndex, fingerprint_waveform, get_paths as fingerprint_paths, load_duplicates
+from .audio_cache import load_audio
+from .chunk_store import ChunkStore, open_store
 
 def play_audio(file_path):
     """Plays the audio file using a system-specific command."""
@@ -28,6 +32,13 @@ def play_audio(file_path):
     except (FileNotFoundError, subprocess.CalledProcessError, Exception) as e:
         print(f"Warning: Could not play audio ({e}). Please play the file manually.")
 
+def stored_chunk_path(store, chunk_file):
+    """A temporary WAV copy of a stored chunk, for the system audio player"""
+    path = os.path.join(tempfile.gettempdir(), f"cnnstuff_{chunk_file}")
+    audio, sr = store.load(chunk_file)
+    sf.write(path, audio, sr)
+    return path
+
 def get_user_correction(label_map):
     """Gets corrected labels from the user."""
     while True:
@@ -44,8 +55,12 @@ def get_user_correction(label_map):
         except:
             print(f"❌ Invalid input format.")
 
-def model_assisted_labeling(chunk_files, model, all_labels, threshold):
-    """Interactive labeling for new chunks, assisted by the model."""
+def model_assisted_labeling(chunk_files, model, all_labels, threshold, rank=None, store=None):
+    """Interactive labeling for new chunks, assisted by the model.
+
+    rank ('entropy' or 'margin') puts the most uncertain / rarest-looking chunks first.
+    Chunks held in store (a ChunkStore) are read from it instead of audio_chunks/.
+    """
     # --- Path Setup ---
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.abspath(os.path.join(script_dir, '..', '..', '..'))
@@ -68,13 +83,28 @@ def model_assisted_labeling(chunk_files, model, all_labels, threshold):
 
     print(f"--- Model-Assisted Labeling ---")
     print(f"Found {len(unlabeled_chunks)} new audio chunks to label.")
+
+    ranked_probs = {}
+    if rank:
+        scores_path = os.path.join(project_root, 'data', 'labeling_scores.json')
+        unlabeled_chunks, ranked_probs = rank_chunks(
+            unlabeled_chunks, model, all_labels, threshold, audio_dir, existing_labels,
+            strategy=rank, cache_path=scores_path, store=store)
+        print(f"Queue ordered by {rank} uncertainty and class rarity.")
     
     new_labels = {}
     for i, chunk_file in enumerate(unlabeled_chunks):
-        audio_file_path = os.path.join(audio_dir, chunk_file)
+        stored = store is not None and chunk_file in store
+        audio_file_path = stored_chunk_path(store, chunk_file) if stored else os.path.join(audio_dir, chunk_file)
         
         # Get both the final prediction and the detailed confidence scores
-        predicted_labels, confidence = classify(model, audio_file_path, all_labels, threshold)
+        if chunk_file in ranked_probs:
+            predicted_labels, confidence = probs_to_labels(torch.as_tensor(ranked_probs[chunk_file]), all_labels, threshold)
+        elif stored:
+            audio, sr = store.load(chunk_file)
+            predicted_labels, confidence = classify_waveform(model, audio, sr, all_labels, threshold)
+        else:
+            predicted_labels, confidence = classify(model, audio_file_path, all_labels, threshold)
 
         print(f"\n({i+1}/{len(unlabeled_chunks)}) Labeling: {chunk_file}")
         play_audio(audio_file_path)
@@ -122,28 +152,52 @@ def model_assisted_labeling(chunk_files, model, all_labels, threshold):
     
     print(f"\n📊 Results: Added {len(new_labels)} new labels. Saved to {manual_labels_path}")
 
-def split_audio_to_chunks(audio_file, chunk_length=3):
-    """Split audio file into 3-second chunks"""
+def split_audio_to_chunks(audio_file, chunk_length=3, dedupe=False, store=None):
+    """Split audio file into 3-second chunks
+
+    With dedupe, chunks that are near-duplicates of an already indexed chunk
+    are not written at all. With store (a ChunkStore), chunks are appended to
+    it instead of being written as WAVs.
+    """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.abspath(os.path.join(script_dir, '..', '..', '..'))
     output_dir = os.path.join(project_root, 'data', 'audio_chunks')
     os.makedirs(output_dir, exist_ok=True)
     
     print(f"Loading audio file: {audio_file}...")
-    audio, sr = librosa.load(audio_file, sr=22050)
+    audio, sr = load_audio(audio_file, sr=22050)
     samples_per_chunk = int(chunk_length * sr)
     
+    index = FingerprintIndex.load(fingerprint_paths()["index"]) if dedupe else None
+    skipped = 0
+
     chunks = []
     base_name = os.path.splitext(os.path.basename(audio_file))[0]
     for i in range(0, len(audio), samples_per_chunk):
         chunk = audio[i:i + samples_per_chunk]
         if len(chunk) == samples_per_chunk:
             chunk_filename = f"{base_name}_chunk_{i//samples_per_chunk:03d}.wav"
-            chunk_path = os.path.join(output_dir, chunk_filename)
-            sf.write(chunk_path, chunk, sr)
+            if index is not None:
+                fp = fingerprint_waveform(chunk)
+                if index.query(fp, exclude=chunk_filename):
+                    skipped += 1
+                    continue
+            if store is not None:
+                store.append(chunk_filename, chunk, sr, source=os.path.abspath(audio_file), start=i / sr)
+                signature = store.signature(chunk_filename)
+            else:
+                chunk_path = os.path.join(output_dir, chunk_filename)
+                sf.write(chunk_path, chunk, sr)
+                st = os.stat(chunk_path)
+                signature = [st.st_mtime_ns, st.st_size]
             chunks.append(chunk_filename)
+            if index is not None:
+                index.add(chunk_filename, fp, signature)
     
-    print(f"Created {len(chunks)} chunks in {output_dir}/")
+    if index is not None:
+        index.save(fingerprint_paths()["index"])
+        print(f"Skipped {skipped} near-duplicate chunks.")
+    print(f"Created {len(chunks)} chunks in {store.store_dir if store is not None else output_dir}/")
     return chunks
 
 if __name__ == "__main__":
@@ -151,6 +205,12 @@ if __name__ == "__main__":
     parser.add_argument("audio_file", type=str, help="Path to the new audio or video file to process.")
     parser.add_argument("--model_path", type=str, default="audio_model.pth", help="Path to the trained model file.")
     parser.add_argument("--threshold", type=float, default=0.35, help="Prediction threshold for the model.")
+    parser.add_argument("--rank", choices=["entropy", "margin"], default=None,
+                        help="Label the most uncertain / rare-looking chunks first instead of in filename order.")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Skip chunks that are near-duplicates of ones already indexed (see cnnstuff.fingerprint).")
+    parser.add_argument("--store", action="store_true",
+                        help="Append new chunks to the packed chunk store (see cnnstuff.chunk_store) instead of writing WAVs.")
     args = parser.parse_args()
 
     # --- Path Setup ---
@@ -168,24 +228,30 @@ if __name__ == "__main__":
         exit()
 
     try:
-        model = AudioCNN(num_classes=len(all_labels))
-        model.load_state_dict(torch.load(model_path_abs))
+        model = load_model_weights(model_path_abs, num_classes=len(all_labels))
     except FileNotFoundError:
         print(f"Error: Model file not found at `{model_path_abs}`. Have you trained a model yet?")
         exit()
 
     # --- Run Process ---
     audio_chunks_dir = os.path.join(project_root, 'data', 'audio_chunks')
+    store = ChunkStore() if args.store else open_store()
 
     if args.audio_file.lower() == "existing":
-        # Label already-split files
-        chunk_filenames = sorted([f for f in os.listdir(audio_chunks_dir) if f.endswith(".wav")])
-        model_assisted_labeling(chunk_filenames, model, all_labels, args.threshold)
+        # Label already-split files, whether they are WAVs or packed in the store
+        chunk_filenames = [f for f in os.listdir(audio_chunks_dir) if f.endswith(".wav")] if os.path.isdir(audio_chunks_dir) else []
+        if store is not None:
+            chunk_filenames = set(chunk_filenames) | set(store.names())
+        chunk_filenames = sorted(chunk_filenames)
+        if args.dedupe:
+            duplicates = load_duplicates()
+            chunk_filenames = [f for f in chunk_filenames if f not in duplicates]
+        model_assisted_labeling(chunk_filenames, model, all_labels, args.threshold, args.rank, store)
 
     elif os.path.exists(args.audio_file):
         # Split the provided file, then label
-        chunk_filenames = split_audio_to_chunks(args.audio_file)
-        model_assisted_labeling(chunk_filenames, model, all_labels, args.threshold)
+        chunk_filenames = split_audio_to_chunks(args.audio_file, dedupe=args.dedupe, store=store if args.store else None)
+        model_assisted_labeling(chunk_filenames, model, all_labels, args.threshold, args.rank, store)
 
     else:
         print(f"Error: '{args.audio_file}' not found or invalid. Provide a file or use 'existing'.")
@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import struct
+import zlib
+import numpy as np
+
+# Fixed-layout record passed from capture to the overlay, little-endian:
+#   version u8, label count u8, reserved u16, labels crc32 u32, sequence u32,
+#   timestamp f64, angle f32, intensity f32, predicted-label bitmask u32,
+#   then MAX_LABELS uint8 confidences (0-255) in labels.json order.
+# Every record is RECORD_SIZE bytes, so a short or torn read is easy to reject.
+RECORD_VERSION = 1
+MAX_LABELS = 32
+_HEADER = struct.Struct("<BBHIIdffI")
+RECORD_SIZE = _HEADER.size + MAX_LABELS
+
+
+def default_labels_path():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.abspath(os.path.join(script_dir, "..", "..", "..", "data", "labels.json"))
+
+
+def load_labels(labels_path=None):
+    with open(labels_path or default_labels_path(), "r") as f:
+        return json.load(f)
+
+
+class DetectionCodec:
+    """Encodes and decodes detection records for one label list.
+
+    Both sides must use the same labels.json; a CRC of the list is stored in
+    each record so a mismatch is caught instead of mapping confidences to the
+    wrong labels.
+    """
+
+    def __init__(self, labels):
+        if len(labels) > MAX_LABELS:
+            raise ValueError(f"At most {MAX_LABELS} labels fit in a record, got {len(labels)}")
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.labels_crc = zlib.crc32(json.dumps(self.labels).encode("utf-8"))
+        self._buffer = bytearray(RECORD_SIZE)
+        self._confidences = np.zeros(MAX_LABELS, dtype=np.float32)
+        self._quantized = np.frombuffer(self._buffer, dtype=np.uint8, offset=_HEADER.size)
+
+    def encode(self, sequence, timestamp, angle, intensity, predicted, confidence):
+        """Record bytes for one result; reuses an internal buffer, so copy it if it must outlive the next call"""
+        mask = 0
+        for label in predicted:
+            if label in self.index:
+                mask |= 1 << self.index[label]
+
+        self._confidences[:] = 0.0
+        for label, score in confidence.items():
+            i = self.index.get(label)
+            if i is not None:
+                self._confidences[i] = score
+        np.clip(self._confidences, 0.0, 1.0, out=self._confidences)
+        self._confidences *= 255.0
+        np.rint(self._confidences, out=self._confidences)
+        self._quantized[:] = self._confidences
+
+        _HEADER.pack_into(self._buffer, 0, RECORD_VERSION, len(self.labels), 0, self.labels_crc,
+                          sequence & 0xFFFFFFFF, timestamp, angle, intensity, mask)
+        return self._buffer
+
+    def encode_result(self, sequence, result, timestamp):
+        """encode() for the dict classify_window returns"""
+        return self.encode(sequence, timestamp, result["angle"], result["intensity"],
+                           result["label"], result["confidence"])
+
+    def decode(self, data):
+        """Result dict in the same shape classify_window returns, plus sequence and timestamp.
+
+        Raises ValueError for a short record, an unknown version or a different label list.
+        """
+        if len(data) != RECORD_SIZE:
+            raise ValueError(f"Expected a {RECORD_SIZE}-byte record, got {len(data)} bytes")
+        version, n_labels, _, labels_crc, sequence, timestamp, angle, intensity, mask = _HEADER.unpack_from(data)
+        if version != RECORD_VERSION:
+            raise ValueError(f"Unsupported detection record version {version} (expected {RECORD_VERSION})")
+        if n_labels != len(self.labels) or labels_crc != self.labels_crc:
+            raise ValueError("Detection record was written with a different labels.json")
+
+        quantized = np.frombuffer(data, dtype=np.uint8, count=n_labels, offset=_HEADER.size)
+        scores = (quantized / 255.0).tolist()
+        return {
+            "sequence": sequence,
+            "timestamp": timestamp,
+            "angle": angle,
+            "intensity": intensity,
+            "label": [label for i, label in enumerate(self.labels) if mask >> i & 1],
+            "confidence": dict(zip(self.labels, scores)),
+        }
+
+
+def write_record(data, path, retries=10):
+    """Atomically replace path with one record (tmp + rename, retried while a reader holds the file)"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    for _ in range(retries):
+        try:
+            os.replace(tmp, path)
+            return True
+        except PermissionError:
+            time.sleep(0.01)
+    return False
+
+
+def read_record(path):
+    """Raw record bytes, or None if the file is missing or incomplete"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(RECORD_SIZE + 1)
+    except OSError:
+        return None
+    return data if len(data) == RECORD_SIZE else None
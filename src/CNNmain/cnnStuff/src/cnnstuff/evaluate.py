@@ -1,11 +1,12 @@
-import torch
 import json
 import os
 import argparse
 import subprocess
 import platform
-from .audio_model import AudioCNN
-from .predict import classify 
+from .audio_model import load_model_weights
+from .predict import classify, classify_waveform
+from .chunk_store import open_store
+from .collect_data import stored_chunk_path
 
 
 def play_audio(file_path):
@@ -52,9 +53,10 @@ def get_user_correction(label_map):
         except:
             print(f"Invalid input format. Please try again.")
 
-def interactive_evaluate(model, all_labels, manual_labels_path, audio_dir, threshold):
+def interactive_evaluate(model, all_labels, manual_labels_path, audio_dir, threshold, store=None):
     """
     Iterate through audio files, show predictions, and ask for user feedback.
+    Chunks held in store (a ChunkStore) are read from it instead of audio_dir.
     """
     # Load existing manual labels
     try:
@@ -77,14 +79,19 @@ def interactive_evaluate(model, all_labels, manual_labels_path, audio_dir, thres
     print("-" * 40)
 
     for i, filename in enumerate(files_to_check):
+        stored = store is not None and filename in store
         audio_file_path = os.path.join(audio_dir, filename)
         
-        if not os.path.exists(audio_file_path):
+        if not stored and not os.path.exists(audio_file_path):
             continue
 
         # Get model's prediction
-
-        predicted_labels, _ = classify(model, audio_file_path, all_labels, threshold)        
+        if stored:
+            audio, sr = store.load(filename)
+            predicted_labels, _ = classify_waveform(model, audio, sr, all_labels, threshold)
+            audio_file_path = stored_chunk_path(store, filename)
+        else:
+            predicted_labels, _ = classify(model, audio_file_path, all_labels, threshold)        
         correct_labels = manual_labels.get(filename, [])
 
         print(f"\n({i+1}/{len(files_to_check)}) Evaluating: {filename}")
@@ -155,11 +162,10 @@ if __name__ == "__main__":
 
     # --- Load Model ---
     try:
-        model = AudioCNN(num_classes=len(all_labels))
-        model.load_state_dict(torch.load(model_path_abs))
+        model = load_model_weights(model_path_abs, num_classes=len(all_labels))
     except FileNotFoundError:
         print(f"Error: Model file not found at `{model_path_abs}`.")
         exit()
 
     # --- Run Evaluation ---
-    interactive_evaluate(model, all_labels, manual_labels_path, audio_dir, args.threshold)
+    interactive_evaluate(model, all_labels, manual_labels_path, audio_dir, args.threshold, store=open_store())
@@ -0,0 +1,153 @@
+import os
+import glob
+import json
+import time
+import struct
+from .detection_record import RECORD_SIZE, DetectionCodec
+
+# Append-only detection log: every window's record (see detection_record.py) is
+# appended to the current segment file, and a new segment is started once the
+# file reaches max_bytes. Each segment starts with a small header holding the
+# labels list, so a segment can be decoded on its own even after labels.json
+# changes. A crash can leave at most one partial record at the end, which
+# readers ignore.
+
+LOG_MAGIC = b"DETLOG1\n"
+_LEN = struct.Struct("<I")
+MAX_SEGMENT_BYTES = 16 * 1024**2  # ~260k windows, about three days of capture at one window per second
+MAX_SEGMENTS = 50
+
+
+class DetectionLog:
+    """Size-rotated writer; append() takes the bytes DetectionCodec.encode returns"""
+
+    def __init__(self, log_dir, labels, max_bytes=MAX_SEGMENT_BYTES, max_segments=MAX_SEGMENTS):
+        self.log_dir = log_dir
+        self.labels = list(labels)
+        self.max_bytes = max_bytes
+        self.max_segments = max_segments
+        self.file = None
+        self.path = None
+        self.size = 0
+        os.makedirs(log_dir, exist_ok=True)
+
+    def _open_segment(self):
+        if self.file is not None:
+            self.file.close()
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.log_dir, f"detections_{stamp}_{time.time_ns() % 10**9:09d}.bin")
+        header = json.dumps({"labels": self.labels, "record_size": RECORD_SIZE}).encode("utf-8")
+        self.file = open(path, "ab")
+        self.file.write(LOG_MAGIC + _LEN.pack(len(header)) + header)
+        self.file.flush()
+        self.size = self.file.tell()
+        self.path = path
+
+        # drop the oldest segments beyond the limit
+        for old in list_segments(self.log_dir)[:-self.max_segments]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def set_labels(self, labels):
+        """Start a new segment for records encoded over a different labels list"""
+        labels = list(labels)
+        if labels != self.labels:
+            self.labels = labels
+            self.close()
+
+    def append(self, record):
+        if self.file is None or self.size + len(record) > self.max_bytes:
+            self._open_segment()
+        self.file.write(record)
+        # one 64-byte write per window; flushing keeps the log usable after a crash
+        self.file.flush()
+        self.size += len(record)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def list_segments(log_dir):
+    """Segment files oldest first (names sort by creation time)"""
+    return sorted(glob.glob(os.path.join(log_dir, "detections_*.bin")))
+
+
+def read_segment(path):
+    """Yield the detection dicts stored in one segment file"""
+    with open(path, "rb") as f:
+        if f.read(len(LOG_MAGIC)) != LOG_MAGIC:
+            raise ValueError(f"{path} is not a detection log")
+        (header_len,) = _LEN.unpack(f.read(_LEN.size))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        if header.get("record_size") != RECORD_SIZE:
+            raise ValueError(f"{path} uses a different record layout")
+        codec = DetectionCodec(header["labels"])
+        while True:
+            record = f.read(RECORD_SIZE)
+            if len(record) < RECORD_SIZE:
+                return  # end of file, or a record cut short by a crash
+            yield codec.decode(record)
+
+
+def read_log(path):
+    """Detections from a segment file, or from every segment in a log directory in order"""
+    paths = list_segments(path) if os.path.isdir(path) else [path]
+    for segment in paths:
+        yield from read_segment(segment)
+
+
+class LogReplay:
+    """Plays logged detections back against the clock, speed times faster than they were recorded.
+
+    current() returns the latest detection that is due, like reading the live
+    latest_detection.bin, so the overlay polls it exactly as it polls capture.
+    Gaps longer than max_gap seconds (between matches or capture sessions) are
+    shortened to max_gap.
+    """
+
+    def __init__(self, events, speed=1.0, max_gap=5.0, hold=1.0, clock=time.perf_counter):
+        if speed <= 0:
+            raise ValueError(f"speed must be positive, got {speed}")
+        self.events = iter(events)
+        self.speed = speed
+        self.max_gap = max_gap
+        self.hold = hold  # log seconds the last detection stays visible once the log runs out
+        self.clock = clock
+        self.next_event = next(self.events, None)
+        self.latest = None
+        self.start_clock = None
+        self.offset = 0.0  # log time skipped by shortened gaps
+        self.played = 0
+
+    @property
+    def finished(self):
+        return self.next_event is None
+
+    def _log_time(self, event):
+        return event["timestamp"] - self.offset
+
+    def current(self):
+        now = self.clock()
+        if self.start_clock is None:
+            if self.next_event is None:
+                return None
+            self.start_clock = now
+            self.offset = self.next_event["timestamp"]
+
+        elapsed = (now - self.start_clock) * self.speed
+        while self.next_event is not None and self._log_time(self.next_event) <= elapsed:
+            self.latest = self.next_event
+            self.played += 1
+            self.next_event = next(self.events, None)
+            if self.next_event is not None:
+                gap = self.next_event["timestamp"] - self.latest["timestamp"]
+                if gap > self.max_gap:
+                    self.offset += gap - self.max_gap
+
+        if self.finished and self.latest is not None and elapsed - self._log_time(self.latest) > self.hold:
+            return None
+        return self.latest
@@ -0,0 +1,189 @@
+import os
+import json
+import argparse
+import numpy as np
+import torch
+import torch.nn.functional as F
+from .audio_model import waveform_to_spectrogram
+from .waveform_bank import chunk_signature, load_chunk, load_clip
+from .chunk_store import open_store
+
+# 256-bit fingerprint: signs of the time-and-frequency energy differences over a
+# 17x17 grid of pooled log-mel energies. Loudness changes cancel out in the
+# differences, so the same sound at a different level still matches.
+GRID = 17
+FINGERPRINT_BYTES = (GRID - 1) * (GRID - 1) // 8
+MAX_DISTANCE = 40  # bits out of 256 that may differ for two chunks to count as near-duplicates
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def fingerprint_waveform(audio):
+    """32-byte fingerprint of a mono waveform at the model sample rate"""
+    mel = waveform_to_spectrogram(audio)  # (1, n_mels, frames)
+    log_mel = torch.log(mel + 1e-6)
+    grid = F.adaptive_avg_pool2d(log_mel, (GRID, GRID))[0]
+    d_freq = grid[1:, :] - grid[:-1, :]
+    bits = (d_freq[:, 1:] - d_freq[:, :-1]) > 0
+    return np.packbits(bits.numpy().astype(np.uint8).ravel())
+
+
+def fingerprint_file(audio_path):
+    return fingerprint_waveform(load_clip(audio_path).mean(axis=0))
+
+
+def hamming(a, b):
+    """Bit distance between one fingerprint and one or many (rows) fingerprints"""
+    return _POPCOUNT[np.bitwise_xor(a, b)].sum(axis=-1)
+
+
+class FingerprintIndex:
+    """Near-duplicate lookup over chunk fingerprints.
+
+    Each fingerprint byte is an LSH band: two chunks become candidates when any
+    byte matches exactly, and candidates are then confirmed with the full
+    Hamming distance. Near-duplicates (a few bits apart) almost always share a
+    byte, while unrelated chunks rarely do, so a lookup touches few entries.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.names = []
+        self.fingerprints = []
+        self.signatures = {}
+        self.buckets = [dict() for _ in range(FINGERPRINT_BYTES)]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.signatures
+
+    def add(self, name, fingerprint, signature=None):
+        row = len(self.names)
+        self.names.append(name)
+        self.fingerprints.append(fingerprint)
+        self.signatures[name] = signature
+        for band, value in enumerate(fingerprint.tolist()):
+            self.buckets[band].setdefault(value, []).append(row)
+
+    def query(self, fingerprint, exclude=None):
+        """[(name, distance)] for indexed chunks within max_distance, closest first"""
+        candidates = set()
+        for band, value in enumerate(fingerprint.tolist()):
+            candidates.update(self.buckets[band].get(value, ()))
+        if not candidates:
+            return []
+        rows = np.fromiter(candidates, dtype=np.intp)
+        distances = hamming(fingerprint, np.stack([self.fingerprints[r] for r in rows]))
+        matches = [(self.names[r], int(d)) for r, d in zip(rows, distances)
+                   if d <= self.max_distance and self.names[r] != exclude]
+        return sorted(matches, key=lambda m: m[1])
+
+    def save(self, path):
+        data = {
+            "max_distance": self.max_distance,
+            "chunks": {name: {"fingerprint": fp.tobytes().hex(), "signature": self.signatures[name]}
+                       for name, fp in zip(self.names, self.fingerprints)},
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, max_distance=None):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(max_distance or MAX_DISTANCE)
+        index = cls(max_distance or data.get("max_distance", MAX_DISTANCE))
+        for name, entry in data["chunks"].items():
+            fp = np.frombuffer(bytes.fromhex(entry["fingerprint"]), dtype=np.uint8)
+            index.add(name, fp, entry.get("signature"))
+        return index
+
+
+def get_paths():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    data_dir = os.path.abspath(os.path.join(script_dir, '..', '..', '..', 'data'))
+    return {
+        "audio_chunks": os.path.join(data_dir, "audio_chunks"),
+        "index": os.path.join(data_dir, "fingerprints.json"),
+        "duplicates": os.path.join(data_dir, "duplicates.json"),
+        "manual_labels": os.path.join(data_dir, "manual_labels.json"),
+    }
+
+
+def load_duplicates(path=None):
+    """duplicate chunk -> the chunk it was collapsed into (empty if no scan has been run)"""
+    try:
+        with open(path or get_paths()["duplicates"], "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def scan_directory(audio_dir, index_path, max_distance=MAX_DISTANCE, prefer=(), store=None):
+    """Fingerprint every chunk in audio_dir and store (reusing the saved index) and map duplicates to representatives.
+
+    Chunks in `prefer` (e.g. already labeled ones) are chosen as representatives first.
+    """
+    old = FingerprintIndex.load(index_path, max_distance)
+    old_rows = {name: row for row, name in enumerate(old.names)}
+
+    files = set(f for f in os.listdir(audio_dir) if f.endswith(".wav")) if os.path.isdir(audio_dir) else set()
+    if store is not None:
+        files |= set(store.names())
+    files = sorted(files)
+    files.sort(key=lambda f: f not in prefer)  # stable: preferred chunks first
+
+    index = FingerprintIndex(max_distance)
+    duplicates = {}
+    for chunk_file in files:
+        signature = chunk_signature(audio_dir, chunk_file, store)
+        row = old_rows.get(chunk_file)
+        if row is not None and old.signatures[chunk_file] == signature:
+            fp = old.fingerprints[row]
+        else:
+            fp = fingerprint_waveform(load_chunk(audio_dir, chunk_file, store).mean(axis=0))
+
+        matches = [m for m in index.query(fp) if m[0] not in duplicates]
+        if matches:
+            duplicates[chunk_file] = matches[0][0]
+        index.add(chunk_file, fp, signature)
+
+    index.save(index_path)
+    return index, duplicates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate audio chunks by spectral fingerprint.")
+    parser.add_argument("--max_distance", type=int, default=MAX_DISTANCE, help="Max differing bits (of 256).")
+    parser.add_argument("--collapse", action="store_true",
+                        help="Write data/duplicates.json so labeling and training skip the duplicates.")
+    args = parser.parse_args()
+
+    paths = get_paths()
+    try:
+        with open(paths["manual_labels"], "r") as f:
+            labeled = set(json.load(f))
+    except FileNotFoundError:
+        labeled = set()
+
+    index, duplicates = scan_directory(paths["audio_chunks"], paths["index"], args.max_distance,
+                                       prefer=labeled, store=open_store())
+
+    clusters = {}
+    for dup, rep in duplicates.items():
+        clusters.setdefault(rep, []).append(dup)
+    for rep, dups in sorted(clusters.items(), key=lambda c: -len(c[1]))[:20]:
+        print(f"{rep}: {len(dups)} near-duplicates")
+
+    print(f"\n📊 {len(duplicates)} of {len(index)} chunks are near-duplicates "
+          f"({len(clusters)} clusters).")
+    if args.collapse:
+        with open(paths["duplicates"], "w") as f:
+            json.dump(duplicates, f, indent=2)
+        print(f"Saved to {paths['duplicates']}")
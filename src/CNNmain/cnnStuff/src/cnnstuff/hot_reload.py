@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+import torch
+from .audio_model import SAMPLE_RATE, CLIP_SECONDS, metadata_path, waveform_to_spectrogram
+from .predict import classify, classify_spectrogram, classify_waveform, default_paths, load_model
+
+
+def warm_up(model, labels):
+    """Run one dummy window through the model and check the output fits the label list"""
+    silence = torch.zeros(int(SAMPLE_RATE * CLIP_SECONDS))
+    with torch.no_grad():
+        logits = model(waveform_to_spectrogram(silence).unsqueeze(0))
+    if logits.shape != (1, len(labels)):
+        raise ValueError(f"Model outputs {tuple(logits.shape)} but labels.json has {len(labels)} labels")
+    if not torch.isfinite(logits).all():
+        raise ValueError("Model produced non-finite outputs on the warm-up window")
+
+
+class HotReloadingModel:
+    """AudioCNN for the live path that follows audio_model.pth and labels.json on disk.
+
+    A background thread polls both files and the checkpoint's audio_model.json.
+    Once a change has been stable for one poll, the new version is loaded and
+    warmed up off the capture thread and then swapped in with a single reference
+    assignment, so a window in flight always sees a matching (model, labels) pair. If loading or validation fails the
+    current version stays active.
+    """
+
+    def __init__(self, model_path=None, labels_path=None, poll_interval=2.0):
+        default_model, default_labels = default_paths()
+        self.model_path = model_path or default_model
+        self.labels_path = labels_path or default_labels
+        self.poll_interval = poll_interval
+
+        self.version = 0
+        self.last_error = None
+        self._active = None
+        self._failed_signature = None
+
+        # the first load happens in the caller so startup fails loudly
+        signature = self._signature()
+        self._active = self._load(signature)
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def _signature(self):
+        stats = [os.stat(p) for p in (self.model_path, self.labels_path)]
+        signature = tuple((s.st_mtime_ns, s.st_size) for s in stats)
+        # the variant comes from audio_model.json, written just after the weights;
+        # without it here, weights caught ahead of their metadata could never be retried
+        meta = metadata_path(self.model_path)
+        if os.path.exists(meta):
+            st = os.stat(meta)
+            signature += ((st.st_mtime_ns, st.st_size),)
+        return signature
+
+    def _load(self, signature):
+        model, labels = load_model(self.model_path, self.labels_path)
+        warm_up(model, labels)
+        self.version += 1
+        info = {
+            "version": self.version,
+            "loaded_at": time.time(),
+            "model_mtime": signature[0][0] / 1e9,
+            "labels_mtime": signature[1][0] / 1e9,
+        }
+        return model, labels, info, signature
+
+    def _watch(self):
+        pending = None
+        while not self._stop.wait(self.poll_interval):
+            try:
+                signature = self._signature()
+            except FileNotFoundError:
+                # mid-replace or deleted; keep serving the current version
+                continue
+
+            if signature == self._active[3] or signature == self._failed_signature:
+                pending = None
+                continue
+            if signature != pending:
+                # wait one more poll so a file still being written isn't picked up
+                pending = signature
+                continue
+
+            try:
+                new_active = self._load(signature)
+            except Exception as e:
+                self.last_error = str(e)
+                self._failed_signature = signature
+                print(f"WARNING: Model reload failed, keeping version {self.info['version']}: {e}")
+                continue
+
+            self._active = new_active
+            self.last_error = None
+            pending = None
+            print(f"Model reloaded: now using version {self.info['version']}")
+
+    @property
+    def info(self):
+        """Metadata of the version currently in use"""
+        return self._active[2]
+
+    def current(self):
+        """(model, labels) snapshot; use one snapshot for a whole window"""
+        model, labels, _, _ = self._active
+        return model, labels
+
+    def classify(self, audio_file, threshold=0.5):
+        model, labels = self.current()
+        return classify(model, audio_file, labels, threshold)
+
+    def classify_waveform(self, audio, sr, threshold=0.5):
+        model, labels = self.current()
+        return classify_waveform(model, audio, sr, labels, threshold)
+
+    def classify_spectrogram(self, spectrogram, threshold=0.5):
+        model, labels = self.current()
+        return classify_spectrogram(model, spectrogram, labels, threshold)
+
+    def stop(self):
+        self._stop.set()
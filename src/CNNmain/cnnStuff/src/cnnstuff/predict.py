@@ -1,7 +1,7 @@
 import torch
 import json
 import os
-from .audio_model import AudioCNN, audio_to_spectrogram
+from .audio_model import audio_to_spectrogram, load_model_weights, prepare_waveform, waveform_to_spectrogram
 
 # -------------------------------------------------------------
 # INTERNAL: classify audio given a loaded model and labels
@@ -12,6 +12,15 @@ def classify(model, audio_file, labels, threshold=0.5):
 
     # Convert audio → spectrogram
     spectrogram = audio_to_spectrogram(audio_file)
+    return classify_spectrogram(model, spectrogram, labels, threshold)
+
+def classify_waveform(model, audio, sr, labels, threshold=0.5):
+    """Like classify, but for audio already in memory (e.g. straight from the capture device)"""
+    model.eval()
+    spectrogram = waveform_to_spectrogram(prepare_waveform(audio, sr))
+    return classify_spectrogram(model, spectrogram, labels, threshold)
+
+def classify_spectrogram(model, spectrogram, labels, threshold=0.5):
     spectrogram = spectrogram.unsqueeze(0)
 
     # Get probabilities
@@ -19,33 +28,47 @@ def classify(model, audio_file, labels, threshold=0.5):
         logits = model(spectrogram)
         probs = torch.sigmoid(logits).squeeze(0)
 
+    return probs_to_labels(probs, labels, threshold)
+
+def probs_to_labels(probs, labels, threshold=0.5):
+    """Turn one row of sigmoid probabilities into (predicted labels, label -> confidence)"""
     predicted = []
     confidence = {}
 
-    for i, p in enumerate(probs):
-        label = labels[i]
-        p_val = float(p.item())
+    for label, p_val in zip(labels, probs.tolist()):
         confidence[label] = p_val
         if p_val > threshold:
             predicted.append(label)
 
     return predicted, confidence
 
-# PUBLIC API: simple function capture.py can call
-def predict(filepath, threshold=0.5):
-
+def default_paths():
+    """Locations of the trained weights and label list inside CNNmain"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     cnnmain_root = os.path.abspath(os.path.join(script_dir, "..", "..", ".."))
 
     model_path  = os.path.join(cnnmain_root, "audio_model.pth")
     labels_path = os.path.join(cnnmain_root, "data", "labels.json")
+    return model_path, labels_path
+
+def load_model(model_path=None, labels_path=None):
+    """Load labels.json and audio_model.pth, returning (model, labels) ready for inference"""
+    default_model, default_labels = default_paths()
+    model_path = model_path or default_model
+    labels_path = labels_path or default_labels
 
     with open(labels_path, "r") as f:
         labels = json.load(f)
 
+    model = load_model_weights(model_path, num_classes=len(labels))
+    model.eval()
+    return model, labels
+
+# PUBLIC API: simple function capture.py can call
+def predict(filepath, threshold=0.5):
+
     # Load model
-    model = AudioCNN(num_classes=len(labels))
-    model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    model, labels = load_model()
 
     # Classify
     predicted, confidence = classify(model, filepath, labels, threshold)
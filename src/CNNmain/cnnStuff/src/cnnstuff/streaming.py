@@ -0,0 +1,192 @@
+import time
+import argparse
+import torch
+import torch.nn.functional as F
+from .audio_model import SAMPLE_RATE, CLIP_SECONDS, N_MELS, build_model, get_mel_transform
+
+# Streaming inference for causal AudioCNN variants. A causal model (no time
+# padding) computes each conv column from the current and past frames only, so
+# once a column exists it never changes. StreamingAudioCNN keeps the few input
+# frames each layer still needs plus the frequency-averaged output column of
+# every position in the window; new mel frames only cost their own columns, and
+# the logits are the linear head applied to the running mean of the window.
+
+_transform = get_mel_transform()
+HOP = _transform.hop_length
+WINDOW_FRAMES = int(SAMPLE_RATE * CLIP_SECONDS) // HOP // 2 * 2  # ~3 s of frames, kept even for the pooling
+
+
+class StreamingAudioCNN:
+    """Incremental inference over the last window_frames mel frames.
+
+    push() returns logits that match model(spectrogram) on the window_frames
+    frames ending at frames_consumed (up to float rounding). Frames are consumed
+    in pairs so the max-pool stays aligned; an odd trailing frame waits for its
+    partner, so after an odd total the logits lag the newest frame by one.
+    """
+
+    def __init__(self, model, window_frames=WINDOW_FRAMES):
+        if not getattr(model, "causal", False):
+            raise ValueError("Streaming needs a causal model (e.g. build_model('causal'))")
+        conv1, _, pool, second, _, _ = model.features
+        if conv1.stride != (1, 1):
+            raise ValueError("Streaming does not support stem_stride > 1")
+        if window_frames % 2:
+            raise ValueError("window_frames must be even")
+
+        self.model = model.eval()
+        self.conv1 = conv1
+        self.pool = pool
+        self.second = second
+        self.window_frames = window_frames
+        # conv1 eats 2 frames of context, the pool halves, the second conv eats 2 pooled columns
+        self.columns = (window_frames - 2) // 2 - 2
+        if self.columns < 1:
+            raise ValueError(f"window_frames={window_frames} is too short for the model")
+        self.reset()
+
+    def reset(self):
+        self.mel_tail = None      # last 2 mel frames (conv1 context)
+        self.conv1_odd = None     # a conv1 column waiting for its pooling partner
+        self.pooled_tail = None   # last 2 pooled columns (second conv context)
+        channels = self.model.classifier.in_features
+        self.ring = torch.zeros(channels, self.columns)
+        self.filled = 0
+        self.write = 0
+        self.frames_seen = 0
+
+    @property
+    def ready(self):
+        """True once a whole window has been seen"""
+        return self.filled == self.columns
+
+    @property
+    def frames_consumed(self):
+        """Frames pushed so far that the logits cover; one less than pushed while a frame waits"""
+        return self.frames_seen - (self.conv1_odd is not None)
+
+    def push(self, mel):
+        """Add new mel frames, (n_mels, frames) or (1, n_mels, frames); returns logits (num_classes,)
+
+        The logits are for the window ending at frames_consumed, not necessarily the newest frame.
+        """
+        if mel.dim() == 2:
+            mel = mel.unsqueeze(0)
+        self.frames_seen += mel.shape[-1]
+
+        with torch.no_grad():
+            x = mel.unsqueeze(0)  # (1, 1, n_mels, frames)
+            if self.mel_tail is not None:
+                x = torch.cat([self.mel_tail, x], dim=-1)
+            self.mel_tail = x[..., -2:]
+            if x.shape[-1] < 3:
+                return self.logits()
+
+            cols = F.relu(self.conv1(x))
+            if self.conv1_odd is not None:
+                cols = torch.cat([self.conv1_odd, cols], dim=-1)
+            even = cols.shape[-1] // 2 * 2
+            self.conv1_odd = cols[..., even:] if even < cols.shape[-1] else None
+            if even == 0:
+                return self.logits()
+
+            pooled = self.pool(cols[..., :even])
+            if self.pooled_tail is not None:
+                pooled = torch.cat([self.pooled_tail, pooled], dim=-1)
+            self.pooled_tail = pooled[..., -2:]
+            if pooled.shape[-1] < 3:
+                return self.logits()
+
+            out = F.relu(self.second(pooled)).mean(dim=-2)[0]  # (channels, new columns), freq-averaged
+            self._append(out[:, -self.columns:])
+        return self.logits()
+
+    def _append(self, cols):
+        n = cols.shape[1]
+        first = min(n, self.columns - self.write)
+        self.ring[:, self.write:self.write + first] = cols[:, :first]
+        self.ring[:, :n - first] = cols[:, first:]
+        self.write = (self.write + n) % self.columns
+        self.filled = min(self.columns, self.filled + n)
+
+    def logits(self):
+        if self.filled == 0:
+            return self.model.classifier.bias.detach().clone()
+        with torch.no_grad():
+            mean = self.ring.sum(dim=1) / self.filled
+            return self.model.classifier(mean)
+
+
+class StreamingMel:
+    """Mel frames for audio arriving in arbitrary blocks, same filterbank as waveform_to_spectrogram.
+
+    Frames are uncentered (frame i covers samples i*hop .. i*hop+n_fft), so
+    only the first and last frames of a clip differ from the centered
+    full-clip transform.
+    """
+
+    def __init__(self):
+        spectrogram = _transform.spectrogram
+        self.n_fft = spectrogram.n_fft
+        self.hop = spectrogram.hop_length
+        self.window = spectrogram.window
+        self.fb = _transform.mel_scale.fb  # (freqs, n_mels)
+        self.buffer = torch.zeros(0)
+
+    def push(self, audio):
+        """Mono float audio at SAMPLE_RATE -> (n_mels, new frames)"""
+        self.buffer = torch.cat([self.buffer, torch.as_tensor(audio, dtype=torch.float32)])
+        n_frames = 0 if len(self.buffer) < self.n_fft else 1 + (len(self.buffer) - self.n_fft) // self.hop
+        if n_frames == 0:
+            return torch.zeros(self.fb.shape[1], 0)
+        used = (n_frames - 1) * self.hop + self.n_fft
+        spec = torch.stft(self.buffer[:used], self.n_fft, self.hop, window=self.window,
+                          center=False, return_complex=True)
+        self.buffer = self.buffer[n_frames * self.hop:]
+        return self.fb.T @ spec.abs().pow(2)
+
+
+def check(variant="causal", num_classes=7, update_frames=4, updates=200, seed=0):
+    """Max logit difference vs full-window inference and per-update vs full-window latency"""
+    torch.manual_seed(seed)
+    model = build_model(variant, num_classes).eval()
+    stream = StreamingAudioCNN(model)
+    mel = torch.rand(N_MELS, WINDOW_FRAMES + update_frames * updates)
+
+    stream.push(mel[:, :WINDOW_FRAMES])
+    max_diff = 0.0
+    stream_ms = []
+    full_ms = []
+    for i in range(updates):
+        end = WINDOW_FRAMES + (i + 1) * update_frames
+        start = time.perf_counter()
+        logits = stream.push(mel[:, end - update_frames:end])
+        stream_ms.append((time.perf_counter() - start) * 1000.0)
+        end = stream.frames_consumed  # odd updates leave a frame for the next push
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            full = model(mel[:, end - WINDOW_FRAMES:end].reshape(1, 1, N_MELS, -1))[0]
+        full_ms.append((time.perf_counter() - start) * 1000.0)
+        max_diff = max(max_diff, float((logits - full).abs().max()))
+
+    stream_ms.sort()
+    full_ms.sort()
+    return {
+        "max_logit_diff": max_diff,
+        "update_ms": stream_ms[len(stream_ms) // 2],
+        "full_window_ms": full_ms[len(full_ms) // 2],
+        "update_seconds": update_frames * HOP / SAMPLE_RATE,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check streaming AudioCNN against full-window inference.")
+    parser.add_argument("--variant", default="causal", choices=["causal", "causal_dsconv"])
+    parser.add_argument("--update_frames", type=int, default=4, help="Mel frames per update (4 frames is ~36 ms)")
+    args = parser.parse_args()
+
+    result = check(args.variant, update_frames=args.update_frames)
+    print(f"Max logit difference vs full window: {result['max_logit_diff']:.2e}")
+    print(f"Update every {result['update_seconds'] * 1000:.0f} ms: {result['update_ms']:.3f} ms per update "
+          f"vs {result['full_window_ms']:.3f} ms for the full window")
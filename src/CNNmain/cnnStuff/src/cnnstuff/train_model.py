@@ -1,16 +1,25 @@
 import torch
 import torch.nn as nn
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, Subset
 import json
 import os
-from .audio_model import AudioCNN, audio_to_spectrogram
+import copy
+import random
+import numpy as np
+from .audio_model import build_model, save_model, load_metadata, load_model_weights, waveform_to_spectrogram
+from .waveform_bank import WaveformBank
+from .chunk_store import open_store
+from .fingerprint import load_duplicates
 
 class SimpleAudioDataset(Dataset):
-    def __init__(self, labels_file, audio_dir, all_labels):
+    """Labeled clips as raw fixed-length waveforms; spectrograms are made per batch in SpectrogramCollate"""
+    def __init__(self, labels_file, audio_dir, all_labels, bank_path=None, exclude=(), store=None):
         with open(labels_file, 'r') as f:
             self.labels_data = json.load(f)
         self.audio_dir = audio_dir
-        self.files = list(self.labels_data.keys())
+        self.files = [f for f in self.labels_data.keys() if f not in exclude]
+        # chunks packed by `python -m cnnstuff.chunk_store --migrate` are read from the store
+        self.bank = WaveformBank(audio_dir, self.files, bank_path, store if store is not None else open_store())
         
         # Create a mapping from label string to index
         self.label_to_idx = {label: i for i, label in enumerate(all_labels)}
@@ -30,21 +39,96 @@ class SimpleAudioDataset(Dataset):
             label_idx = self.label_to_idx[label]
             label_tensor[label_idx] = 1.0
         
-        # Convert audio to spectrogram
-        audio_path = os.path.join(self.audio_dir, filename)
-        spectrogram = audio_to_spectrogram(audio_path)
+        # (channels, samples) waveform straight from the preloaded bank
+        waveform = torch.from_numpy(np.array(self.bank[filename]))
         
-        return spectrogram, label_tensor
+        return waveform, label_tensor
 
-def train_simple_model(epochs=20):
+class SpectrogramCollate:
+    """Stack a batch of waveforms, optionally augment, and compute all mel spectrograms in one call"""
+    def __init__(self, augment=False, max_gain_db=6.0, max_shift=0.25, channel_mix=True):
+        self.augment = augment
+        self.max_gain_db = max_gain_db
+        self.max_shift = max_shift      # fraction of the clip
+        self.channel_mix = channel_mix
+
+    def __call__(self, batch):
+        waveforms = torch.stack([w for w, _ in batch])  # (B, channels, samples)
+        targets = torch.stack([t for _, t in batch])
+        B, C, L = waveforms.shape
+
+        if self.augment and self.channel_mix:
+            # random convex mix of the channels per example
+            weights = torch.rand(B, C, 1)
+            audio = (waveforms * weights).sum(dim=1) / weights.sum(dim=1)
+        else:
+            audio = waveforms.mean(dim=1)
+
+        if self.augment:
+            gain_db = (torch.rand(B, 1) * 2 - 1) * self.max_gain_db
+            audio = audio * torch.pow(10.0, gain_db / 20.0)
+
+            # circular time shift, different per example, as a single gather
+            max_shift = int(L * self.max_shift)
+            shifts = torch.randint(-max_shift, max_shift + 1, (B, 1))
+            idx = (torch.arange(L).unsqueeze(0) - shifts) % L
+            audio = audio.gather(1, idx)
+
+        return waveform_to_spectrogram(audio), targets
+
+def train_epoch(model, dataloader, criterion, optimizer):
+    """One pass over the dataloader; returns the mean batch loss"""
+    model.train()
+    total_loss = 0
+    for batch_idx, (data, target) in enumerate(dataloader):
+        optimizer.zero_grad()
+        output = model(data)
+        loss = criterion(output, target)
+        loss.backward()
+        optimizer.step()
+        total_loss += loss.item()
+    return total_loss / len(dataloader)
+
+def evaluate_loss(model, dataloader, criterion):
+    model.eval()
+    total_loss = 0
+    with torch.no_grad():
+        for data, target in dataloader:
+            total_loss += criterion(model(data), target).item()
+    return total_loss / len(dataloader)
+
+def fit(model, dataloader, epochs, lr=0.001, verbose=True):
+    """Train model in place on a multi-label dataloader"""
+    # Use BCEWithLogitsLoss for multi-label classification
+    criterion = nn.BCEWithLogitsLoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    
+    # Train
+    for epoch in range(epochs):
+        loss = train_epoch(model, dataloader, criterion, optimizer)
+        if verbose:
+            print(f'Epoch {epoch+1}/{epochs}, Loss: {loss:.4f}')
+    model.eval()
+    return model
+
+def get_data_paths():
     # Dynamically get the project root
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.abspath(os.path.join(script_dir, '..', '..', '..'))
     data_dir = os.path.join(project_root, 'data')
 
-    labels_json_path = os.path.join(data_dir, "labels.json")
-    manual_labels_json_path = os.path.join(data_dir, "manual_labels.json")
-    audio_chunks_dir = os.path.join(data_dir, "audio_chunks")
+    return {
+        "project_root": project_root,
+        "labels": os.path.join(data_dir, "labels.json"),
+        "manual_labels": os.path.join(data_dir, "manual_labels.json"),
+        "audio_chunks": os.path.join(data_dir, "audio_chunks"),
+        "model": os.path.join(project_root, 'audio_model.pth'),
+        "waveform_bank": os.path.join(data_dir, "waveform_bank.npy"),
+    }
+
+def train_simple_model(epochs=20, variant="simple", augment=False, dedupe=False):
+    paths = get_data_paths()
+    labels_json_path = paths["labels"]
 
     # Load all possible labels from the config file
     try:
@@ -55,34 +139,129 @@ def train_simple_model(epochs=20):
         return
 
     # Create dataset
-    dataset = SimpleAudioDataset(manual_labels_json_path, audio_chunks_dir, all_labels)
-    dataloader = DataLoader(dataset, batch_size=8, shuffle=True)
+    # near-duplicates found by `python -m cnnstuff.fingerprint --collapse` add epoch time, not information
+    exclude = set(load_duplicates()) if dedupe else ()
+    dataset = SimpleAudioDataset(paths["manual_labels"], paths["audio_chunks"], all_labels, paths["waveform_bank"], exclude)
+    if exclude:
+        print(f"Training on {len(dataset)} clips ({len(exclude)} near-duplicates skipped).")
+    dataloader = DataLoader(dataset, batch_size=8, shuffle=True, collate_fn=SpectrogramCollate(augment=augment))
     
     # Create model
-    model = AudioCNN(num_classes=len(all_labels))
-    # Use BCEWithLogitsLoss for multi-label classification
-    criterion = nn.BCEWithLogitsLoss()
-    optimizer = torch.optim.Adam(model.parameters(), lr=0.001)
+    model = build_model(variant, num_classes=len(all_labels))
+    fit(model, dataloader, epochs)
     
-    # Train
-    model.train()
-    for epoch in range(epochs):
-        total_loss = 0
-        for batch_idx, (data, target) in enumerate(dataloader):
-            optimizer.zero_grad()
-            output = model(data)
-            loss = criterion(output, target)
-            loss.backward()
-            optimizer.step()
-            total_loss += loss.item()
-        
-        print(f'Epoch {epoch+1}/{epochs}, Loss: {total_loss/len(dataloader):.4f}')
-    
-    # Save model
-    torch.save(model.state_dict(), os.path.join(project_root, 'audio_model.pth'))
-    print(f"Model saved as {os.path.join(project_root, 'audio_model.pth')}")
+    # Save model alongside its variant metadata and what it was trained on
+    trained_on = {f: dataset.labels_data[f] for f in dataset.files}
+    save_model(model, paths["model"], variant, all_labels, trained_on)
+    print(f"Model saved as {paths['model']} (variant: {variant})")
     
     return model
 
+def fine_tune_model(max_epochs=10, replay_ratio=2.0, val_fraction=0.2, patience=2, lr=3e-4,
+                    augment=False, dedupe=False, seed=0, full_epochs=20):
+    """Warm-start from audio_model.pth and train only on labels added or changed since it was saved.
+
+    New clips are mixed with a random replay sample of old ones (replay_ratio
+    old per new) so the model doesn't forget, and training stops once the loss
+    on a held-out mix of new and old clips stops improving. Falls back to a
+    full train (full_epochs) when there is no checkpoint to start from or
+    labels.json has changed. If no epoch beats the starting held-out loss, the
+    checkpoint is left as it was, so the new labels stay new for the next run.
+    """
+    paths = get_data_paths()
+    with open(paths["labels"], "r") as f:
+        all_labels = json.load(f)
+
+    metadata = load_metadata(paths["model"])
+    if not os.path.exists(paths["model"]) or metadata.get("labels", all_labels) != all_labels:
+        print("No compatible checkpoint (missing, or labels.json changed); running a full train instead.")
+        return train_simple_model(epochs=full_epochs, variant=metadata.get("variant", "simple"),
+                                  augment=augment, dedupe=dedupe)
+    if "trained_on" not in metadata:
+        print("Checkpoint doesn't record what it was trained on; treating every label as new.")
+    trained_on = metadata.get("trained_on", {})
+    variant = metadata.get("variant", "simple")
+
+    exclude = set(load_duplicates()) if dedupe else ()
+    dataset = SimpleAudioDataset(paths["manual_labels"], paths["audio_chunks"], all_labels, paths["waveform_bank"], exclude)
+    new = [i for i, f in enumerate(dataset.files) if trained_on.get(f) != dataset.labels_data[f]]
+    old = [i for i, f in enumerate(dataset.files) if trained_on.get(f) == dataset.labels_data[f]]
+    if not new:
+        print("No new or changed labels since the last checkpoint; nothing to do.")
+        return None
+
+    rng = random.Random(seed)
+    rng.shuffle(new)
+    rng.shuffle(old)
+    n_val_new = int(len(new) * val_fraction)
+    n_val_old = min(len(old) // 5, max(n_val_new, 8))
+    val = new[:n_val_new] + old[:n_val_old]
+    train_new = new[n_val_new:]
+    replay = old[n_val_old:][:int(len(train_new) * replay_ratio)]
+    print(f"Fine-tuning on {len(train_new)} new + {len(replay)} replayed clips "
+          f"({len(val)} held out, {len(old)} unchanged).")
+
+    train_loader = DataLoader(Subset(dataset, train_new + replay), batch_size=8, shuffle=True,
+                              collate_fn=SpectrogramCollate(augment=augment))
+    val_loader = DataLoader(Subset(dataset, val), batch_size=8, collate_fn=SpectrogramCollate()) if val else None
+
+    model = load_model_weights(paths["model"], num_classes=len(all_labels))
+    criterion = nn.BCEWithLogitsLoss()
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+
+    best_loss = evaluate_loss(model, val_loader, criterion) if val_loader else float("inf")
+    best_state = copy.deepcopy(model.state_dict())
+    print(f"Starting held-out loss: {best_loss:.4f}")
+    improved = False
+    stale = 0
+    for epoch in range(max_epochs):
+        train_loss = train_epoch(model, train_loader, criterion, optimizer)
+        if val_loader is None:
+            best_state, improved = copy.deepcopy(model.state_dict()), True
+            print(f"Epoch {epoch+1}/{max_epochs}, Loss: {train_loss:.4f}")
+            continue
+        val_loss = evaluate_loss(model, val_loader, criterion)
+        print(f"Epoch {epoch+1}/{max_epochs}, Loss: {train_loss:.4f}, Held-out: {val_loss:.4f}")
+        if val_loss < best_loss:
+            best_loss, best_state, stale = val_loss, copy.deepcopy(model.state_dict()), 0
+            improved = True
+        else:
+            stale += 1
+            if stale >= patience:
+                print("Held-out loss stopped improving; stopping early.")
+                break
+
+    if not improved:
+        print("No epoch beat the starting held-out loss; leaving the checkpoint and its metadata unchanged.")
+        return None
+
+    model.load_state_dict(best_state)
+    model.eval()
+
+    # held-out new clips weren't learned from, so they stay "new" for the next run
+    held_out = {dataset.files[i] for i in new[:n_val_new]}
+    trained_on = {f: dataset.labels_data[f] for f in dataset.files if f not in held_out}
+    save_model(model, paths["model"], variant, all_labels, trained_on)
+    print(f"Model saved as {paths['model']} (variant: {variant}, fine-tuned)")
+    return model
+
 if __name__ == "__main__":
-    train_simple_model()
\ No newline at end of file
+    import argparse
+    from .audio_model import MODEL_VARIANTS
+
+    parser = argparse.ArgumentParser(description="Train the AudioCNN on data/manual_labels.json.")
+    parser.add_argument("--epochs", type=int, default=None, help="Defaults to 20, or at most 10 with --incremental.")
+    parser.add_argument("--variant", choices=list(MODEL_VARIANTS), default="simple")
+    parser.add_argument("--augment", action="store_true", help="Random gain, time shift and channel mix per batch.")
+    parser.add_argument("--dedupe", action="store_true", help="Skip chunks listed in data/duplicates.json.")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fine-tune audio_model.pth on labels added since it was saved instead of retraining.")
+    parser.add_argument("--replay_ratio", type=float, default=2.0, help="Old clips replayed per new clip (--incremental).")
+    parser.add_argument("--patience", type=int, default=2, help="Epochs without held-out improvement before stopping (--incremental).")
+    args = parser.parse_args()
+
+    if args.incremental:
+        fine_tune_model(max_epochs=args.epochs or 10, full_epochs=args.epochs or 20, replay_ratio=args.replay_ratio,
+                        patience=args.patience, augment=args.augment, dedupe=args.dedupe)
+    else:
+        train_simple_model(epochs=args.epochs or 20, variant=args.variant, augment=args.augment, dedupe=args.dedupe)
@@ -0,0 +1,122 @@
+import os
+import json
+import librosa
+import numpy as np
+from .audio_model import SAMPLE_RATE, CLIP_SECONDS
+
+# Two channels are kept per clip so training can randomize the stereo mix.
+# Even-indexed source channels are averaged into channel 0 and odd ones into
+# channel 1, so the mean of the two equals librosa's mono downmix.
+BANK_CHANNELS = 2
+CLIP_SAMPLES = int(SAMPLE_RATE * CLIP_SECONDS)
+
+
+def load_clip(audio_path):
+    """(BANK_CHANNELS, CLIP_SAMPLES) float32 clip at the model sample rate, zero padded"""
+    audio, _ = librosa.load(audio_path, sr=SAMPLE_RATE, mono=False, duration=CLIP_SECONDS)
+    return _to_clip(audio)
+
+
+def load_stored_clip(store, name):
+    """load_clip for a chunk in a ChunkStore"""
+    audio, sr = store.load(name)
+    audio = audio[:int(sr * CLIP_SECONDS)].T  # (channels, samples) like librosa.load(mono=False)
+    if sr != SAMPLE_RATE:
+        audio = librosa.resample(np.ascontiguousarray(audio), orig_sr=sr, target_sr=SAMPLE_RATE)
+    return _to_clip(audio)
+
+
+def load_chunk(audio_dir, name, store=None):
+    """Clip for a chunk name, from the store when it holds it, else from audio_dir"""
+    if store is not None and name in store:
+        return load_stored_clip(store, name)
+    return load_clip(os.path.join(audio_dir, name))
+
+
+def chunk_signature(audio_dir, name, store=None):
+    if store is not None and name in store:
+        return store.signature(name)
+    st = os.stat(os.path.join(audio_dir, name))
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _to_clip(audio):
+    if audio.ndim == 1:
+        pair = np.stack([audio, audio])
+    elif audio.shape[0] == 1:
+        pair = np.concatenate([audio, audio])
+    else:
+        pair = np.stack([audio[0::2].mean(axis=0), audio[1::2].mean(axis=0)])
+
+    clip = np.zeros((BANK_CHANNELS, CLIP_SAMPLES), dtype=np.float32)
+    n = min(CLIP_SAMPLES, pair.shape[1])
+    clip[:, :n] = pair[:, :n]
+    return clip
+
+
+class WaveformBank:
+    """Every labeled clip decoded once into one (n_clips, channels, samples) array.
+
+    With bank_path the array is stored as .npy next to a small index and
+    memory-mapped on later runs; it is rebuilt when the file list or any
+    file's mtime/size changes. Chunks held in store (a ChunkStore) are read
+    from it in shard order rather than from audio_dir.
+    """
+
+    def __init__(self, audio_dir, files, bank_path=None, store=None):
+        self.audio_dir = audio_dir
+        self.store = store
+        self.files = list(files)
+        self.row = {f: i for i, f in enumerate(self.files)}
+
+        signatures = [self._signature(f) for f in self.files]
+        if bank_path and self._index_matches(bank_path, signatures):
+            self.data = np.load(bank_path, mmap_mode="r")
+            print(f"Loaded waveform bank ({len(self.files)} clips) from {bank_path}")
+            return
+
+        print(f"Building waveform bank for {len(self.files)} clips...")
+        shape = (len(self.files), BANK_CHANNELS, CLIP_SAMPLES)
+        if bank_path:
+            self.data = np.lib.format.open_memmap(bank_path + ".tmp", mode="w+", dtype=np.float32, shape=shape)
+        else:
+            self.data = np.zeros(shape, dtype=np.float32)
+
+        if store is not None:
+            # stored chunks first, in the order they sit in the shards
+            order = sorted(range(len(self.files)), key=lambda i: (
+                (0, *store.signature(self.files[i])) if self.files[i] in store else (1, 0, i)))
+        else:
+            order = range(len(self.files))
+        for i in order:
+            self.data[i] = load_chunk(audio_dir, self.files[i], store)
+
+        if bank_path:
+            self.data.flush()
+            del self.data
+            os.replace(bank_path + ".tmp", bank_path)
+            with open(self._index_path(bank_path), "w") as f:
+                json.dump({"files": self.files, "signatures": signatures}, f)
+            self.data = np.load(bank_path, mmap_mode="r")
+
+    def _signature(self, filename):
+        return chunk_signature(self.audio_dir, filename, self.store)
+
+    @staticmethod
+    def _index_path(bank_path):
+        return os.path.splitext(bank_path)[0] + ".json"
+
+    def _index_matches(self, bank_path, signatures):
+        try:
+            with open(self._index_path(bank_path), "r") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            return False
+        return (os.path.exists(bank_path) and index.get("files") == self.files
+                and index.get("signatures") == signatures)
+
+    def __len__(self):
+        return len(self.files)
+
+    def __getitem__(self, filename):
+        return self.data[self.row[filename]]
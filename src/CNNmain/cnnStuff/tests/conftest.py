@@ -0,0 +1,12 @@
+import os
+import sys
+
+# cnnstuff, the live-path scripts in src/audio (imported bare, as they import
+# each other) and src/ itself for the overlay package
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.abspath(os.path.join(TESTS_DIR, "..", "..", ".."))
+for path in (os.path.join(SRC_DIR, "CNNmain", "cnnStuff", "src"),
+             os.path.join(SRC_DIR, "audio"),
+             SRC_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
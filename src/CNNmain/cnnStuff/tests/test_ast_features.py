@@ -0,0 +1,29 @@
+"""The batched fbank front-end must match torchaudio's kaldi.fbank."""
+import types
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchaudio")
+
+
+def test_batched_fbank_matches_kaldi():
+    import torchaudio.compliance.kaldi as kaldi
+    from ast_features import KaldiFbank
+    # the ASTFeatureExtractor attributes KaldiFbank reads, at the AST defaults
+    extractor = types.SimpleNamespace(sampling_rate=16000, num_mel_bins=128, max_length=1024,
+                                      do_normalize=True, mean=-4.2677393, std=4.5689974)
+    fbank = KaldiFbank(extractor)
+    rng = np.random.default_rng(0)
+    chunks = [(0.1 * rng.standard_normal(n)).astype(np.float32) for n in (32000, 16000, 8000)]
+
+    for chunk, frames in zip(chunks, fbank.frames(chunks)):
+        expected = kaldi.fbank(torch.from_numpy(chunk).unsqueeze(0), sample_frequency=16000, htk_compat=True,
+                               window_type="hanning", num_mel_bins=128, dither=0.0, frame_shift=10)
+        assert frames.shape == expected.shape
+        torch.testing.assert_close(frames, expected, rtol=1e-3, atol=1e-3)
+
+    finished = fbank(chunks)
+    assert finished.shape == (3, 1024, 128)
+    # padding rows normalize from zero, like the extractor's zero padding
+    assert torch.allclose(finished[2, -1], torch.full((128,), (0 - extractor.mean) / (extractor.std * 2)))
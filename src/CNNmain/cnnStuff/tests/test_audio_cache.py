@@ -0,0 +1,23 @@
+"""CacheWriter and get_cached round trips for framed features."""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def test_cache_writer_round_trip(tmp_path):
+    from cnnstuff.audio_cache import CacheWriter, get_cached
+    source = tmp_path / "source.wav"
+    source.write_bytes(b"not really audio")
+    cache_dir = str(tmp_path / "cache")
+
+    writer = CacheWriter(str(source), 16000, cache_dir, frame_shape=(4, 3))
+    blocks = [np.random.default_rng(i).standard_normal((2, 4, 3)).astype(np.float32) for i in range(3)]
+    for block in blocks:
+        writer.append(block)
+    writer.commit()
+
+    cached = get_cached(str(source), 16000, cache_dir)
+    assert cached.shape == (6, 4, 3)
+    np.testing.assert_array_equal(cached, np.concatenate(blocks))
+    # a different target rate is a different entry
+    assert get_cached(str(source), 22050, cache_dir) is None
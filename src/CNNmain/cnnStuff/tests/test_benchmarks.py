@@ -0,0 +1,195 @@
+"""Micro-benchmarks for the functions that run on every live window.
+
+Each benchmark times several repeats of many calls and gates on the best
+(lowest) repeat median, which is far less sensitive to scheduler noise than a
+single median. Benchmarks of numpy/Python code also record the peak memory
+tracemalloc sees for one call; torch allocations are invisible to tracemalloc,
+so torch paths are gated on time only. Results are compared with
+tests/benchmark_baseline.json. Baselines are machine-specific: record them with
+BENCH_UPDATE=1, then later runs fail when a function is slower than the
+baseline by more than BENCH_TOLERANCE (default 0.25 = 25%) plus BENCH_SLACK_MS
+(default 0.1 ms, so sub-millisecond functions don't fail on jitter), or uses
+more traced memory by more than BENCH_TOLERANCE.
+
+No baseline is committed, so on a fresh checkout every benchmark only reports
+its numbers and skips; the gate starts working after the first local
+BENCH_UPDATE=1 run.
+
+    BENCH_UPDATE=1 pytest src/CNNmain/cnnStuff/tests/test_benchmarks.py
+    pytest src/CNNmain/cnnStuff/tests/test_benchmarks.py
+"""
+import os
+import json
+import time
+import tracemalloc
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+sf = pytest.importorskip("soundfile")
+
+# import paths (cnnstuff, src/audio, src/) are set up in conftest.py
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(TESTS_DIR, "benchmark_baseline.json")
+UPDATE = os.environ.get("BENCH_UPDATE") == "1"
+TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", 0.25))
+SLACK_MS = float(os.environ.get("BENCH_SLACK_MS", 0.1))
+CAPTURE_RATE = 48000
+NUM_CLASSES = 7
+
+
+def measure(fn, runs=30, repeats=5, warmup=3, trace_memory=True):
+    """Best repeat median / overall p95 / max ms, plus peak traced KB of one call (None if not traced)"""
+    for _ in range(warmup):
+        fn()
+    medians = []
+    times = []
+    for _ in range(repeats):
+        repeat = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            fn()
+            repeat.append((time.perf_counter() - start) * 1000.0)
+        medians.append(float(np.median(repeat)))
+        times.extend(repeat)
+
+    peak_kb = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_kb = peak / 1024.0
+
+    return {
+        "median_ms": min(medians),
+        "p95_ms": float(np.percentile(times, 95)),
+        "max_ms": float(np.max(times)),
+        "peak_kb": peak_kb,
+        "runs": runs * repeats,
+    }
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    try:
+        with open(BASELINE_PATH, "r") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        data = {}
+    yield data
+    if UPDATE:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture
+def check(baseline):
+    """check(name, result): record the result (BENCH_UPDATE=1) or compare it with the baseline"""
+    def _check(name, result):
+        peak = "untraced" if result["peak_kb"] is None else f"{result['peak_kb']:.1f} KB"
+        print(f"\n{name}: median {result['median_ms']:.3f} ms, p95 {result['p95_ms']:.3f} ms, peak {peak}")
+        if UPDATE:
+            baseline[name] = result
+            return
+        expected = baseline.get(name)
+        if expected is None:
+            pytest.skip(f"no baseline for {name}, so it is not gated; record one with BENCH_UPDATE=1")
+        limit = 1.0 + TOLERANCE
+        assert result["median_ms"] <= expected["median_ms"] * limit + SLACK_MS, (
+            f"{name} median {result['median_ms']:.3f} ms vs baseline {expected['median_ms']:.3f} ms")
+        if result["peak_kb"] is None or expected.get("peak_kb") is None:
+            return
+        # small absolute slack so a few hundred bytes of noise don't fail tiny allocations
+        assert result["peak_kb"] <= expected["peak_kb"] * limit + 4.0, (
+            f"{name} peak {result['peak_kb']:.1f} KB vs baseline {expected['peak_kb']:.1f} KB")
+    return _check
+
+
+def synthetic_audio(channels, seconds=1.0, sr=CAPTURE_RATE, seed=0):
+    """(samples, channels) noise with a different level per channel, so direction isn't degenerate"""
+    rng = np.random.default_rng(seed)
+    gains = np.linspace(0.05, 0.3, channels, dtype=np.float32)
+    return (rng.standard_normal((int(seconds * sr), channels)).astype(np.float32) * gains)
+
+
+@pytest.fixture(scope="session")
+def model():
+    from cnnstuff.audio_model import build_model
+    torch.manual_seed(0)
+    model = build_model("simple", num_classes=NUM_CLASSES)
+    model.eval()
+    return model
+
+
+@pytest.fixture(scope="session")
+def clip_path(tmp_path_factory):
+    from cnnstuff.audio_model import SAMPLE_RATE, CLIP_SECONDS
+    path = tmp_path_factory.mktemp("bench") / "clip.wav"
+    sf.write(path, synthetic_audio(2, CLIP_SECONDS, SAMPLE_RATE), SAMPLE_RATE)
+    return str(path)
+
+
+@pytest.mark.parametrize("channels", [2, 6, 8])
+def test_detect_direction(check, channels):
+    from direction import detect_direction
+    audio = synthetic_audio(channels)
+    check(f"detect_direction[{channels}ch]", measure(lambda: detect_direction(audio, verbose=False)))
+
+
+def test_audio_to_spectrogram(check, clip_path):
+    from cnnstuff.audio_model import audio_to_spectrogram
+    check("audio_to_spectrogram", measure(lambda: audio_to_spectrogram(clip_path), trace_memory=False))
+
+
+def test_classify(check, model, clip_path):
+    from cnnstuff.predict import classify
+    labels = [f"label_{i}" for i in range(NUM_CLASSES)]
+    check("classify", measure(lambda: classify(model, clip_path, labels, threshold=0.5), trace_memory=False))
+
+
+def test_ast_classify_chunk(check):
+    pytest.importorskip("transformers")
+    from classifier import AudioClassifier
+    try:
+        classifier = AudioClassifier()
+    except OSError as e:
+        pytest.skip(f"AST model not available: {e}")
+    chunk = synthetic_audio(1, 2.0, classifier.sampling_rate)[:, 0]
+    check("AudioClassifier.classify_chunk", measure(lambda: classifier.classify_chunk(chunk), runs=3, repeats=3, warmup=1, trace_memory=False))
+
+
+@pytest.fixture(scope="session")
+def overlay():
+    tk = pytest.importorskip("tkinter")
+    from overlay.overlay import Overlay
+    try:
+        ov = Overlay()
+    except (tk.TclError, FileNotFoundError) as e:
+        # needs a display, Windows' -transparentcolor and data/labels.json
+        pytest.skip(f"Overlay unavailable here: {e}")
+    ov.withdraw()
+    yield ov
+    ov.destroy()
+
+
+def test_overlay_spawn_particles(check, overlay):
+    def spawn():
+        overlay.spawn_particles(90.0, 0.8)
+        overlay.active_particles.clear()
+    check("Overlay.spawn_particles", measure(spawn))
+
+
+def test_overlay_frame(check, overlay):
+    # steady state: a detection arrives every few frames, like update_overlay vs animate
+    overlay.active_particles.clear()
+    frame = {"i": 0}
+
+    def tick():
+        if frame["i"] % 2 == 0:
+            overlay.spawn_particles(45.0, 0.7)
+        frame["i"] += 1
+        overlay.draw_frame()
+    check("Overlay.draw_frame", measure(tick, runs=60, repeats=5, warmup=10))
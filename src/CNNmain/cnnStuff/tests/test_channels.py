@@ -0,0 +1,46 @@
+"""ActiveChannels: widening, hold-off and column selection, and flight recorder columns."""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def block(active, n=480, level=0.1):
+    out = np.zeros((n, 8), dtype=np.float32)
+    out[:, list(active)] = level
+    return out
+
+
+def test_active_channels_widen_at_once_and_narrow_after_hold():
+    from channels import ActiveChannels
+    active = ActiveChannels(48000, hold_seconds=0.05)  # hold = 2400 samples = 5 blocks
+    assert active.update(block([0, 1])).tolist() == [0, 1]
+    assert active.update(block([0, 1, 2, 3, 6, 7])).tolist() == [0, 1, 2, 3, 6, 7]
+    assert active.update(block(range(8))).tolist() == list(range(8))
+
+    for _ in range(5):
+        assert active.layout == len(active.update(block([0, 1]))) == 8
+    assert active.update(block([0, 1])).tolist() == [0, 1]
+
+
+def test_active_channels_select_returns_only_active_columns():
+    from channels import ActiveChannels
+    active = ActiveChannels(48000)
+    data = block([0, 1, 2, 3, 4, 5])
+    data[:, 4] = 0.3
+    selected = active.select(data)
+    assert selected.shape == (480, 6)
+    np.testing.assert_array_equal(selected[:, 4], data[:, 4])
+
+
+def test_flight_recorder_keeps_device_columns_across_layouts():
+    from flight_recorder import FlightRecorder
+    recorder = FlightRecorder(1.0, 1000, 8)
+    side = np.full((100, 6), 0.5, dtype=np.float32)
+    recorder.push(side, np.array([0, 1, 2, 3, 6, 7]))
+    recorder.push(np.full((100, 8), 0.25, dtype=np.float32))
+
+    audio, start, _ = recorder.snapshot()
+    assert start == 0 and audio.shape == (200, 8)
+    assert (audio[:100, 4:6] == 0).all()
+    assert (audio[:100, 6:] == int(0.5 * 32767)).all()
+    assert (audio[100:] == int(0.25 * 32767)).all()
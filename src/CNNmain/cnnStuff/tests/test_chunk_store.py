@@ -0,0 +1,118 @@
+"""ChunkStore: round trips, replacement, crash recovery, shard rotation, migrate and export."""
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+sf = pytest.importorskip("soundfile")
+
+from cnnstuff.chunk_store import ChunkStore, export, migrate, open_store
+
+
+def tone(n, channels=1, seed=0):
+    rng = np.random.default_rng(seed)
+    audio = (0.5 * rng.uniform(-1, 1, (n, channels))).astype(np.float32)
+    return audio[:, 0] if channels == 1 else audio
+
+
+def test_append_and_reopen(tmp_path):
+    mono = tone(1000)
+    stereo = tone(500, channels=2, seed=1)
+    with ChunkStore(str(tmp_path)) as store:
+        store.append("mono.wav", mono, 22050, source="game.mp4", start=3.0)
+        store.append("stereo.wav", stereo, 48000, dtype="float32")
+
+    store = ChunkStore(str(tmp_path))
+    assert store.names() == ["mono.wav", "stereo.wav"]
+    audio, sr = store.load("mono.wav")
+    assert sr == 22050 and audio.shape == (1000,)
+    np.testing.assert_allclose(audio, mono, atol=1 / 32768)
+    assert store.info("mono.wav")["source"] == "game.mp4"
+    assert store.info("mono.wav")["start"] == 3.0
+
+    audio, sr = store.load("stereo.wav")
+    assert sr == 48000
+    np.testing.assert_array_equal(audio, stereo)
+
+
+def test_append_replaces_and_changes_signature(tmp_path):
+    with ChunkStore(str(tmp_path)) as store:
+        store.append("a.wav", tone(100), 22050)
+        before = store.signature("a.wav")
+        store.append("a.wav", tone(200, seed=5), 22050)
+        assert store.signature("a.wav") != before
+
+    store = ChunkStore(str(tmp_path))
+    assert len(store) == 1
+    assert store.load("a.wav")[0].shape == (200,)
+
+
+def test_partial_index_line_does_not_swallow_next_append(tmp_path):
+    with ChunkStore(str(tmp_path)) as store:
+        store.append("a.wav", tone(100), 22050)
+        store.append("b.wav", tone(100, seed=1), 22050)
+    index = tmp_path / "index.jsonl"
+    index.write_bytes(index.read_bytes()[:-20])  # crash in the middle of b's line
+
+    with ChunkStore(str(tmp_path)) as store:
+        assert store.names() == ["a.wav"]
+        store.append("c.wav", tone(50, seed=2), 22050)
+
+    assert ChunkStore(str(tmp_path)).names() == ["a.wav", "c.wav"]
+
+
+def test_entries_past_the_end_of_a_shard_are_ignored(tmp_path):
+    with ChunkStore(str(tmp_path)) as store:
+        store.append("a.wav", tone(100), 22050)
+        store.append("b.wav", tone(100, seed=1), 22050)
+    shard = tmp_path / "shard_00000.pcm"
+    shard.write_bytes(shard.read_bytes()[:-10])
+
+    assert ChunkStore(str(tmp_path)).names() == ["a.wav"]
+
+
+def test_shards_rotate_and_read_in_storage_order(tmp_path):
+    chunk_bytes = 1000 * 2
+    with ChunkStore(str(tmp_path), shard_bytes=3 * chunk_bytes) as store:
+        for i in range(7):
+            store.append(f"{6 - i}.wav", tone(1000, seed=i), 22050)
+        # reads while appending see the latest data
+        np.testing.assert_allclose(store.load("0.wav")[0], tone(1000, seed=6), atol=1 / 32768)
+
+    store = ChunkStore(str(tmp_path))
+    assert len({store.info(n)["shard"] for n in store.names()}) == 3
+    assert store.names() == [f"{6 - i}.wav" for i in range(7)]
+
+
+def test_open_store_only_when_created(tmp_path):
+    assert open_store(str(tmp_path / "missing")) is None
+    with ChunkStore(str(tmp_path)) as store:
+        store.append("a.wav", tone(10), 22050)
+    assert len(open_store(str(tmp_path))) == 1
+
+
+def test_migrate_and_export_round_trip(tmp_path):
+    audio_dir = tmp_path / "audio_chunks"
+    audio_dir.mkdir()
+    pcm = tone(2205)
+    sf.write(str(audio_dir / "pcm.wav"), pcm, 22050)  # PCM_16
+    wide = tone(480, channels=8, seed=3)
+    sf.write(str(audio_dir / "flight.wav"), wide, 48000, subtype="FLOAT")
+
+    store_dir = str(tmp_path / "store")
+    assert sorted(migrate(str(audio_dir), store_dir, remove=True)) == ["flight.wav", "pcm.wav"]
+    assert os.listdir(audio_dir) == []
+    assert migrate(str(audio_dir), store_dir) == []
+
+    store = ChunkStore(store_dir)
+    assert store.info("pcm.wav")["dtype"] == "int16"
+    assert store.info("flight.wav")["dtype"] == "float32"
+    assert store.info("flight.wav")["channels"] == 8
+
+    out_dir = tmp_path / "exported"
+    export(str(out_dir), store_dir)
+    audio, sr = sf.read(str(out_dir / "pcm.wav"), dtype="float32")
+    assert sr == 22050
+    np.testing.assert_allclose(audio, pcm, atol=1 / 32768)
+    audio, sr = sf.read(str(out_dir / "flight.wav"), dtype="float32")
+    assert sr == 48000
+    np.testing.assert_array_equal(audio, wide)
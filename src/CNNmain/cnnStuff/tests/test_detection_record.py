@@ -0,0 +1,55 @@
+"""DetectionCodec and the latest-detection file: round trips and rejected input."""
+import pytest
+
+pytest.importorskip("numpy")
+
+LABELS = ["footsteps", "gunshot", "gun_handling", "explosion", "knife", "interface", "background"]
+
+
+def result(angle=90.0, intensity=0.5, predicted=("gunshot",), scores=None):
+    scores = scores or {"gunshot": 0.9, "footsteps": 0.2}
+    return {"angle": angle, "intensity": intensity, "label": list(predicted), "confidence": dict(scores)}
+
+
+def test_detection_record_round_trip():
+    from cnnstuff.detection_record import DetectionCodec, RECORD_SIZE
+    codec = DetectionCodec(LABELS)
+    data = bytes(codec.encode_result(7, result(), timestamp=123.25))
+    assert len(data) == RECORD_SIZE
+
+    decoded = codec.decode(data)
+    assert decoded["sequence"] == 7
+    assert decoded["timestamp"] == 123.25
+    assert decoded["angle"] == pytest.approx(90.0)
+    assert decoded["intensity"] == pytest.approx(0.5)
+    assert decoded["label"] == ["gunshot"]
+    # confidences are quantized to 1/255
+    assert decoded["confidence"]["gunshot"] == pytest.approx(0.9, abs=1 / 255)
+    assert decoded["confidence"]["footsteps"] == pytest.approx(0.2, abs=1 / 255)
+    assert decoded["confidence"]["knife"] == 0.0
+
+
+def test_detection_record_rejects_bad_input():
+    from cnnstuff.detection_record import DetectionCodec
+    data = bytes(DetectionCodec(LABELS).encode_result(1, result(), timestamp=0.0))
+
+    with pytest.raises(ValueError):
+        DetectionCodec(LABELS).decode(data[:-1])
+    with pytest.raises(ValueError):
+        DetectionCodec(LABELS[::-1]).decode(data)
+    with pytest.raises(ValueError):
+        DetectionCodec(LABELS).decode(b"\x02" + data[1:])
+
+
+def test_write_and_read_record(tmp_path):
+    from cnnstuff.detection_record import DetectionCodec, write_record, read_record
+    path = str(tmp_path / "latest_detection.bin")
+    assert read_record(path) is None
+
+    data = bytes(DetectionCodec(LABELS).encode_result(3, result(), timestamp=1.0))
+    assert write_record(data, path)
+    assert read_record(path) == data
+
+    with open(path, "wb") as f:
+        f.write(data[:10])
+    assert read_record(path) is None
@@ -0,0 +1,26 @@
+"""The live-path modules must import the way their entry points import them."""
+import os
+import sys
+import subprocess
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("librosa")
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", ".."))
+
+# a fresh interpreter, so conftest's sys.path entries can't hide a missing one;
+# transformers is only needed once AudioClassifier loads the hub model
+IMPORT_AS_MAIN = """
+import sys, types
+try:
+    import transformers
+except ImportError:
+    sys.modules["transformers"] = types.SimpleNamespace(AutoFeatureExtractor=None, AutoModelForAudioClassification=None)
+from src.audio.classifier import AudioClassifier
+"""
+
+
+def test_classifier_imports_as_main_does():
+    result = subprocess.run([sys.executable, "-c", IMPORT_AS_MAIN], cwd=REPO_ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
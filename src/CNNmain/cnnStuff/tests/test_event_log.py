@@ -0,0 +1,81 @@
+"""DetectionLog segments, torn tails and LogReplay timing."""
+import pytest
+
+pytest.importorskip("numpy")
+
+LABELS = ["footsteps", "gunshot", "gun_handling", "explosion", "knife", "interface", "background"]
+
+
+def result(angle=90.0, intensity=0.5, predicted=("gunshot",), scores=None):
+    scores = scores or {"gunshot": 0.9, "footsteps": 0.2}
+    return {"angle": angle, "intensity": intensity, "label": list(predicted), "confidence": dict(scores)}
+
+
+def test_detection_log_round_trip_and_rotation(tmp_path):
+    from cnnstuff.detection_record import DetectionCodec, RECORD_SIZE
+    from cnnstuff.event_log import DetectionLog, list_segments, read_log
+    codec = DetectionCodec(LABELS)
+    # room for a header and a few records per segment
+    log = DetectionLog(str(tmp_path), LABELS, max_bytes=512 + 4 * RECORD_SIZE)
+    for seq in range(20):
+        log.append(bytes(codec.encode_result(seq, result(angle=float(seq)), timestamp=float(seq))))
+    log.close()
+
+    assert len(list_segments(str(tmp_path))) > 1
+    events = list(read_log(str(tmp_path)))
+    assert [e["sequence"] for e in events] == list(range(20))
+    assert [e["angle"] for e in events] == [float(s) for s in range(20)]
+
+
+def test_detection_log_ignores_torn_tail(tmp_path):
+    from cnnstuff.detection_record import DetectionCodec
+    from cnnstuff.event_log import DetectionLog, read_segment
+    codec = DetectionCodec(LABELS)
+    log = DetectionLog(str(tmp_path), LABELS)
+    for seq in range(3):
+        log.append(bytes(codec.encode_result(seq, result(), timestamp=float(seq))))
+    log.close()
+    with open(log.path, "ab") as f:
+        f.write(b"\x01\x07partial")
+
+    assert [e["sequence"] for e in read_segment(log.path)] == [0, 1, 2]
+
+
+def test_log_replay_follows_clock_and_shortens_gaps():
+    from cnnstuff.event_log import LogReplay
+    events = [{"timestamp": t, "sequence": i} for i, t in enumerate([100.0, 101.0, 200.0])]
+    now = {"t": 0.0}
+    replay = LogReplay(events, speed=2.0, max_gap=5.0, hold=1.0, clock=lambda: now["t"])
+
+    assert replay.current()["sequence"] == 0
+    now["t"] = 0.4  # 0.8 s of log time
+    assert replay.current()["sequence"] == 0
+    now["t"] = 0.5
+    assert replay.current()["sequence"] == 1
+    # the 99 s gap is played as max_gap: event 2 is due 1 + 5 = 6 log seconds in
+    now["t"] = 2.9
+    assert replay.current()["sequence"] == 1
+    now["t"] = 3.0
+    assert replay.current()["sequence"] == 2
+    assert replay.finished
+    now["t"] = 4.0  # past hold
+    assert replay.current() is None
+
+
+def test_detection_log_starts_a_segment_when_labels_change(tmp_path):
+    from cnnstuff.detection_record import DetectionCodec
+    from cnnstuff.event_log import DetectionLog, list_segments, read_log
+    log = DetectionLog(str(tmp_path), LABELS)
+    log.append(bytes(DetectionCodec(LABELS).encode_result(0, result(), timestamp=0.0)))
+    log.set_labels(LABELS)  # same list keeps the segment
+    log.append(bytes(DetectionCodec(LABELS).encode_result(1, result(), timestamp=1.0)))
+
+    relabeled = LABELS + ["vehicle"]
+    log.set_labels(relabeled)
+    log.append(bytes(DetectionCodec(relabeled).encode_result(2, result(scores={"vehicle": 0.8}), timestamp=2.0)))
+    log.close()
+
+    assert len(list_segments(str(tmp_path))) == 2
+    events = list(read_log(str(tmp_path)))
+    assert [e["sequence"] for e in events] == [0, 1, 2]
+    assert events[2]["confidence"]["vehicle"] == pytest.approx(0.8, abs=1 / 255)
@@ -0,0 +1,64 @@
+"""EventAssembler: hysteresis, minimum separation, per-label thresholds and event order."""
+import pytest
+
+from events import EventAssembler
+
+
+def run(assembler, windows, hop=0.5, length=1.0):
+    """Feed {label: score} windows hop seconds apart; returns every finished event"""
+    events = []
+    for i, scores in enumerate(windows):
+        events.extend(assembler.update(i * hop, i * hop + length, scores))
+    return events + assembler.flush()
+
+
+def test_hysteresis_keeps_one_event_between_thresholds():
+    scores = [0.1, 0.6, 0.4, 0.35, 0.45, 0.7, 0.1]
+    events = run(EventAssembler(0.5, 0.3, min_separation=0.0), [{"gunshot": s} for s in scores])
+    assert len(events) == 1
+    event = events[0]
+    assert event["windows"] == 5
+    assert event["peak_confidence"] == pytest.approx(0.7)
+    assert (event["onset"], event["offset"]) == (0.5, 3.5)
+
+
+def test_never_reaching_on_threshold_makes_no_event():
+    events = run(EventAssembler(0.5, 0.3), [{"gunshot": s} for s in [0.4, 0.45, 0.49]])
+    assert events == []
+
+
+def test_min_separation_merges_close_repeats_only():
+    windows = [{"gunshot": s} for s in [0.8, 0.1, 0.8]]
+    # gap between the first event's offset (1.0) and the next onset (1.0) is 0
+    assert len(run(EventAssembler(0.5, 0.3, min_separation=0.25), windows)) == 1
+
+    spaced = [{"gunshot": 0.8}, {}, {}, {}, {"gunshot": 0.8}]
+    assert len(run(EventAssembler(0.5, 0.3, min_separation=0.25), spaced)) == 2
+
+
+def test_missing_label_closes_its_event():
+    windows = [{"gunshot": 0.8, "footsteps": 0.9}, {"footsteps": 0.9}, {"footsteps": 0.9}]
+    events = run(EventAssembler(0.5, 0.3, min_separation=0.0), windows)
+    by_label = {e["label"]: e for e in events}
+    assert by_label["gunshot"]["windows"] == 1
+    assert by_label["footsteps"]["windows"] == 3
+
+
+def test_per_label_thresholds_and_event_order():
+    assembler = EventAssembler(0.5, 0.3, min_separation=0.0, label_thresholds={"footsteps": (0.2, 0.1)})
+    events = run(assembler, [{"footsteps": 0.25, "gunshot": 0.25}, {"gunshot": 0.9}])
+    assert [e["label"] for e in events] == ["footsteps", "gunshot"]
+    assert all(a["onset"] <= b["onset"] for a, b in zip(events, events[1:]))
+
+
+def test_events_carry_direction_of_peak_window():
+    assembler = EventAssembler(0.5, 0.3, min_separation=0.0)
+    assembler.update(0.0, 1.0, {"gunshot": 0.6}, {"angle": 10.0, "intensity": 0.2})
+    assembler.update(0.5, 1.5, {"gunshot": 0.9}, {"angle": 200.0, "intensity": 0.8})
+    (event,) = assembler.flush()
+    assert event["angle"] == 200.0 and event["intensity"] == 0.8
+
+
+def test_off_above_on_is_rejected():
+    with pytest.raises(ValueError):
+        EventAssembler(0.3, 0.5)
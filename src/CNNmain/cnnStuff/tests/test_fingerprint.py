@@ -0,0 +1,61 @@
+"""FingerprintIndex: near-duplicate queries and save/load."""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("torchaudio")
+
+
+def test_fingerprint_index_finds_near_duplicates(tmp_path):
+    from cnnstuff.audio_model import SAMPLE_RATE, CLIP_SECONDS
+    from cnnstuff.fingerprint import FingerprintIndex, fingerprint_waveform
+    rng = np.random.default_rng(0)
+    n = int(SAMPLE_RATE * CLIP_SECONDS)
+    t = np.arange(n) / SAMPLE_RATE
+    clip = (np.sin(2 * np.pi * 440 * t * (1 + t)) * np.exp(-t) + 0.05 * rng.standard_normal(n)).astype(np.float32)
+    other = (0.3 * rng.standard_normal(n)).astype(np.float32)
+
+    index = FingerprintIndex()
+    index.add("clip.wav", fingerprint_waveform(clip))
+    index.add("other.wav", fingerprint_waveform(other))
+
+    # same sound, quieter and with a little different noise
+    near = (0.5 * clip + 0.005 * rng.standard_normal(n)).astype(np.float32)
+    matches = index.query(fingerprint_waveform(near))
+    assert matches and matches[0][0] == "clip.wav"
+    assert all(name != "other.wav" for name, _ in matches)
+
+    path = str(tmp_path / "fingerprints.json")
+    index.save(path)
+    loaded = FingerprintIndex.load(path)
+    assert len(loaded) == 2 and "clip.wav" in loaded
+    assert loaded.query(fingerprint_waveform(near))[0][0] == "clip.wav"
+
+
+def test_scan_directory_covers_wavs_and_stored_chunks(tmp_path):
+    sf = pytest.importorskip("soundfile")
+    from cnnstuff.audio_model import SAMPLE_RATE, CLIP_SECONDS
+    from cnnstuff.chunk_store import ChunkStore
+    from cnnstuff.fingerprint import scan_directory
+    rng = np.random.default_rng(0)
+    n = int(SAMPLE_RATE * CLIP_SECONDS)
+    t = np.arange(n) / SAMPLE_RATE
+    clip = (np.sin(2 * np.pi * 440 * t * (1 + t)) * np.exp(-t) + 0.05 * rng.standard_normal(n)).astype(np.float32)
+
+    audio_dir = tmp_path / "audio_chunks"
+    audio_dir.mkdir()
+    sf.write(str(audio_dir / "a.wav"), clip, SAMPLE_RATE)
+    store = ChunkStore(str(tmp_path / "store"))
+    store.append("b.wav", 0.5 * clip, SAMPLE_RATE)
+    store.append("c.wav", (0.3 * rng.standard_normal(n)).astype(np.float32), SAMPLE_RATE)
+
+    index_path = str(tmp_path / "fingerprints.json")
+    index, duplicates = scan_directory(str(audio_dir), index_path, prefer={"a.wav"}, store=store)
+    assert sorted(index.names) == ["a.wav", "b.wav", "c.wav"]
+    assert duplicates == {"b.wav": "a.wav"}
+    assert index.signatures["b.wav"] == store.signature("b.wav")
+
+    # unchanged chunks are not fingerprinted again
+    index, _ = scan_directory(str(audio_dir), index_path, prefer={"a.wav"}, store=store)
+    assert index.signatures["b.wav"] == store.signature("b.wav")
+    store.close()
@@ -0,0 +1,42 @@
+"""HotReloadingModel picks up a checkpoint once its weights and metadata agree."""
+import json
+import time
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchaudio")
+
+LABELS = ["footsteps", "gunshot", "gun_handling", "explosion", "knife", "interface", "background"]
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_weights_ahead_of_metadata_are_retried(tmp_path):
+    from cnnstuff.audio_model import MODEL_VARIANTS, build_model, metadata_path, save_model
+    from cnnstuff.hot_reload import HotReloadingModel
+    model_path = str(tmp_path / "audio_model.pth")
+    labels_path = str(tmp_path / "labels.json")
+    with open(labels_path, "w") as f:
+        json.dump(LABELS, f)
+    save_model(build_model("simple", len(LABELS)), model_path, "simple", LABELS)
+
+    live = HotReloadingModel(model_path, labels_path, poll_interval=0.02)
+    try:
+        # a save caught between its two renames: dsconv weights, simple metadata
+        torch.save(build_model("dsconv", len(LABELS)).state_dict(), model_path)
+        assert wait_for(lambda: live.last_error is not None)
+        assert live.info["version"] == 1
+
+        with open(metadata_path(model_path), "w") as f:
+            json.dump({"variant": "dsconv", "config": MODEL_VARIANTS["dsconv"], "labels": LABELS}, f)
+        assert wait_for(lambda: live.info["version"] == 2)
+        assert live.last_error is None
+    finally:
+        live.stop()
@@ -0,0 +1,45 @@
+"""Streaming inference must match the full-window computations it replaces."""
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("torchaudio")
+
+
+def test_streaming_cnn_matches_full_window():
+    from cnnstuff.streaming import check
+    for variant in ("causal", "causal_dsconv"):
+        result = check(variant, update_frames=4, updates=20)
+        assert result["max_logit_diff"] < 1e-4, variant
+
+
+def test_odd_updates_report_the_frames_their_logits_cover():
+    from cnnstuff.audio_model import N_MELS, build_model
+    from cnnstuff.streaming import StreamingAudioCNN, check
+    assert check("causal", update_frames=1, updates=20)["max_logit_diff"] < 1e-4
+    assert check("causal", update_frames=3, updates=20)["max_logit_diff"] < 1e-4
+
+    stream = StreamingAudioCNN(build_model("causal", 7))
+    stream.push(torch.rand(N_MELS, 301))
+    assert stream.frames_consumed == 300
+    stream.push(torch.rand(N_MELS, 1))
+    assert stream.frames_consumed == 302
+
+
+def test_streaming_rejects_non_causal_model():
+    from cnnstuff.audio_model import build_model
+    from cnnstuff.streaming import StreamingAudioCNN
+    with pytest.raises(ValueError):
+        StreamingAudioCNN(build_model("simple", 7))
+
+
+def test_streaming_mel_matches_uncentered_stft():
+    from cnnstuff.streaming import StreamingMel
+    audio = torch.rand(5000) * 2 - 1
+    mel = StreamingMel()
+    # arbitrary block sizes, including ones shorter than a frame
+    frames = torch.cat([mel.push(audio[a:b]) for a, b in [(0, 100), (100, 1300), (1300, 1301), (1301, 5000)]], dim=1)
+
+    spec = torch.stft(audio, mel.n_fft, mel.hop, window=mel.window, center=False, return_complex=True)
+    expected = mel.fb.T @ spec.abs().pow(2)
+    assert frames.shape == expected.shape
+    torch.testing.assert_close(frames, expected, rtol=1e-4, atol=1e-4)
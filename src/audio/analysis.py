@@ -0,0 +1,108 @@
+import sys
+import os
+import numpy as np
+import torch
+import torchaudio.functional as F
+
+CNN_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "CNNmain", "cnnStuff", "src")
+)
+sys.path.insert(0, CNN_PATH)
+
+from cnnstuff.audio_model import SAMPLE_RATE as MODEL_SAMPLE_RATE, CLIP_SECONDS, N_MELS
+from direction import channel_layout, direction_from_energies
+
+# AudioCNN's mel front-end (torchaudio MelSpectrogram defaults at MODEL_SAMPLE_RATE)
+MODEL_N_FFT = 400
+MODEL_HOP = 200
+
+DIRECTION_BAND = (100.0, 8000.0)  # Hz used for directional energy; skips rumble and hiss
+IPD_MAX_FREQ = 1500.0             # phase differences are only meaningful at low frequencies
+GATE_DB = -55.0                   # loudest frame below this (dBFS) counts as silence
+
+
+class WindowAnalyzer:
+    """One multichannel STFT per window, shared by direction, gating and the CNN input.
+
+    The STFT runs at the capture rate with the same window length and hop in
+    seconds as AudioCNN's front-end, so the downmixed mel spectrogram built from
+    it closely matches the resample-then-MelSpectrogram path the model was
+    trained on without resampling or transforming the audio a second time.
+    """
+
+    def __init__(self, sample_rate, n_mels=N_MELS, gate_db=GATE_DB):
+        self.sample_rate = sample_rate
+        self.gate_db = gate_db
+
+        ratio = sample_rate / MODEL_SAMPLE_RATE
+        self.n_fft = int(round(MODEL_N_FFT * ratio))
+        self.hop = int(round(MODEL_HOP * ratio))
+        self.window = torch.hann_window(self.n_fft)
+        self.max_samples = int(CLIP_SECONDS * sample_rate)
+
+        freqs = torch.linspace(0, sample_rate / 2, self.n_fft // 2 + 1)
+        self.direction_bins = (freqs >= DIRECTION_BAND[0]) & (freqs <= DIRECTION_BAND[1])
+        self.ipd_bins = (freqs > 0) & (freqs <= IPD_MAX_FREQ)
+
+        # filterbank only spans the model's bandwidth; power scales with n_fft^2, so rescale to match
+        self.mel_fb = F.melscale_fbanks(
+            n_freqs=self.n_fft // 2 + 1, f_min=0.0, f_max=MODEL_SAMPLE_RATE / 2,
+            n_mels=n_mels, sample_rate=sample_rate, norm=None, mel_scale="htk",
+        )
+        self.mel_scale = (MODEL_N_FFT / self.n_fft) ** 2
+
+        # mean square of a frame from its one-sided power spectrum (Parseval)
+        self.frame_norm = 2.0 / (self.n_fft * float((self.window ** 2).sum()))
+
+    def stft(self, audio):
+        """Complex STFT of a (samples, channels) window, shape (channels, freqs, frames)"""
+        audio = torch.as_tensor(np.asarray(audio, dtype=np.float32))
+        if audio.ndim == 1:
+            audio = audio[:, None]
+        return torch.stft(
+            audio.T.contiguous(), n_fft=self.n_fft, hop_length=self.hop, window=self.window,
+            center=True, pad_mode="reflect", return_complex=True,
+        )
+
+    def analyze(self, audio, downmix_channels=None):
+        """downmix_channels: divisor for the mono downmix when audio is only the active
+        columns of a wider device, so levels match the full-width mean the model was trained on"""
+        spec = self.stft(audio)
+        power = spec.real ** 2 + spec.imag ** 2
+
+        # mono downmix: the STFT is linear, so averaging the complex spectra
+        # is the same as averaging the channels first
+        model_frames = 1 + self.max_samples // self.hop
+        mono = spec[:, :, :model_frames].sum(dim=0) / (downmix_channels or spec.shape[0])
+        mono_power = mono.real ** 2 + mono.imag ** 2
+
+        frame_ms = mono_power.sum(dim=0) * self.frame_norm
+        level_db = float(10 * torch.log10(frame_ms.max() + 1e-12)) if frame_ms.numel() else -120.0
+
+        mel = (self.mel_fb.T @ mono_power) * self.mel_scale
+
+        return {
+            "active": level_db >= self.gate_db,
+            "level_db": level_db,
+            "mel": mel.unsqueeze(0),  # (1, n_mels, frames), same layout as audio_to_spectrogram
+            "direction": self._direction(spec, power),
+        }
+
+    def _direction(self, spec, power):
+        if spec.shape[0] == 1:
+            # mono: every channel equal, which is what detect_direction does too
+            spec = spec.expand(8, -1, -1)
+            power = power.expand(8, -1, -1)
+
+        layout = channel_layout(spec.shape[0])
+        band_energy = power[:len(layout), self.direction_bins, :].sum(dim=(1, 2)).tolist()
+        energies = dict(zip(layout, band_energy))
+        direction = direction_from_energies(energies)
+
+        # inter-channel cues between the front pair
+        fl, fr = spec[0], spec[1]
+        ild_db = 10 * np.log10((energies["FL"] + 1e-12) / (energies["FR"] + 1e-12))
+        cross = (fl[self.ipd_bins] * fr[self.ipd_bins].conj()).sum()
+        direction["raw_energies"]["ild_db"] = float(ild_db)
+        direction["raw_energies"]["ipd"] = float(torch.angle(cross))
+        return direction
@@ -0,0 +1,137 @@
+import math
+import time
+import argparse
+import numpy as np
+import torch
+
+# Batched replacement for ASTFeatureExtractor's Kaldi fbank front-end. The
+# extractor computes torchaudio.compliance.kaldi.fbank one example at a time;
+# here every frame of every chunk goes through one DC-removal / pre-emphasis /
+# window / FFT / mel matmul, with the window and mel matrix built once.
+# Settings are Kaldi's fbank defaults as the extractor uses them: 25 ms
+# "hanning" frames every 10 ms, snip_edges, 0.97 pre-emphasis, power spectrum,
+# mel bins from 20 Hz to Nyquist, log with a float32-eps floor.
+
+FRAME_SECONDS = 0.025
+SHIFT_SECONDS = 0.010
+PREEMPHASIS = 0.97
+LOW_FREQ = 20.0
+
+
+def _mel(freq):
+    return 1127.0 * torch.log(1.0 + freq / 700.0)
+
+
+def kaldi_mel_banks(num_bins, n_fft, sample_rate, low_freq=LOW_FREQ):
+    """(num_bins, n_fft // 2 + 1) triangular Kaldi mel filters, Nyquist column zero as in torchaudio"""
+    num_fft_bins = n_fft // 2
+    fft_bin_width = sample_rate / n_fft
+    mel_low = _mel(torch.tensor(low_freq))
+    mel_high = _mel(torch.tensor(sample_rate / 2.0))
+    mel_delta = (mel_high - mel_low) / (num_bins + 1)
+
+    b = torch.arange(num_bins, dtype=torch.float32).unsqueeze(1)
+    left = mel_low + b * mel_delta
+    center = left + mel_delta
+    right = center + mel_delta
+
+    mel = _mel(fft_bin_width * torch.arange(num_fft_bins, dtype=torch.float32)).unsqueeze(0)
+    up = (mel - left) / (center - left)
+    down = (right - mel) / (right - center)
+    banks = torch.clamp(torch.minimum(up, down), min=0.0)
+    return torch.nn.functional.pad(banks, (0, 1))
+
+
+class KaldiFbank:
+    """AST input features for many chunks at once, matching ASTFeatureExtractor(...)["input_values"]
+
+    frames() gives the unpadded log-mel frames of each chunk (what the feature
+    cache stores); finish() pads/truncates them to max_length and normalizes.
+    """
+
+    def __init__(self, extractor):
+        self.sampling_rate = extractor.sampling_rate
+        self.num_mel_bins = extractor.num_mel_bins
+        self.max_length = extractor.max_length
+        self.do_normalize = getattr(extractor, "do_normalize", True)
+        self.mean = extractor.mean
+        self.std = extractor.std
+
+        self.frame_length = int(self.sampling_rate * FRAME_SECONDS)
+        self.shift = int(self.sampling_rate * SHIFT_SECONDS)
+        self.n_fft = 2 ** math.ceil(math.log2(self.frame_length))
+        self.window = torch.hann_window(self.frame_length, periodic=False)
+        self.mel_banks = kaldi_mel_banks(self.num_mel_bins, self.n_fft, self.sampling_rate).T.contiguous()
+        self.floor = torch.finfo(torch.float32).eps
+
+    def num_frames(self, n_samples):
+        if n_samples < self.frame_length:
+            return 0
+        return min(self.max_length, 1 + (n_samples - self.frame_length) // self.shift)
+
+    def frames(self, chunks):
+        """List of (frames, num_mel_bins) log-mel tensors, frames capped at max_length"""
+        strided = []
+        counts = []
+        for chunk in chunks:
+            audio = torch.as_tensor(np.asarray(chunk, dtype=np.float32)).reshape(-1)
+            n = self.num_frames(len(audio))
+            counts.append(n)
+            if n:
+                strided.append(audio.unfold(0, self.frame_length, self.shift)[:n])
+        if not strided:
+            return [torch.zeros(0, self.num_mel_bins) for _ in counts]
+
+        x = torch.cat(strided)  # every frame of every chunk, (total, frame_length)
+        x = x - x.mean(dim=1, keepdim=True)
+        x = torch.cat([x[:, :1] * (1.0 - PREEMPHASIS), x[:, 1:] - PREEMPHASIS * x[:, :-1]], dim=1)
+        x = x * self.window
+        power = torch.fft.rfft(x, n=self.n_fft).abs().pow(2)
+        log_mel = torch.clamp(power @ self.mel_banks, min=self.floor).log()
+        return list(torch.split(log_mel, counts))
+
+    def finish(self, frames):
+        """Pad/truncate to max_length and normalize; frames is a list or a (batch, frames, bins) array"""
+        out = torch.zeros(len(frames), self.max_length, self.num_mel_bins)
+        for i, f in enumerate(frames):
+            f = torch.as_tensor(np.asarray(f, dtype=np.float32))[:self.max_length]
+            out[i, :len(f)] = f
+        if self.do_normalize:
+            out = (out - self.mean) / (self.std * 2)
+        return out
+
+    def __call__(self, chunks):
+        return self.finish(self.frames(chunks))
+
+
+def compare_with_extractor(extractor, chunks):
+    """(max abs difference, extractor ms, batched ms) for the same chunks"""
+    fbank = KaldiFbank(extractor)
+    start = time.perf_counter()
+    expected = extractor(list(chunks), sampling_rate=fbank.sampling_rate, return_tensors="pt", padding=True)
+    extractor_ms = (time.perf_counter() - start) * 1000.0
+    start = time.perf_counter()
+    ours = fbank(chunks)
+    batched_ms = (time.perf_counter() - start) * 1000.0
+    return float((ours - expected["input_values"]).abs().max()), extractor_ms, batched_ms
+
+
+if __name__ == "__main__":
+    from transformers import AutoFeatureExtractor
+
+    parser = argparse.ArgumentParser(description="Check the batched fbank front-end against ASTFeatureExtractor.")
+    parser.add_argument("--model", default="MIT/ast-finetuned-audioset-10-10-0.4593")
+    parser.add_argument("--chunks", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    extractor = AutoFeatureExtractor.from_pretrained(args.model)
+    rng = np.random.default_rng(0)
+    n = int(args.seconds * extractor.sampling_rate)
+    t = np.arange(n) / extractor.sampling_rate
+    chunks = [(0.1 * rng.standard_normal(n) + 0.3 * np.sin(2 * np.pi * (200 + 50 * i) * t)).astype(np.float32)
+              for i in range(args.chunks)]
+
+    diff, extractor_ms, batched_ms = compare_with_extractor(extractor, chunks)
+    print(f"Max difference vs extractor: {diff:.2e}")
+    print(f"{args.chunks} chunks: extractor {extractor_ms:.1f} ms, batched {batched_ms:.1f} ms")
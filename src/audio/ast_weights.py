@@ -0,0 +1,130 @@
+import os
+import re
+import glob
+import argparse
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoModelForAudioClassification
+
+# Shared AST weights: the model is exported once as a plain state_dict and then
+# loaded with torch.load(mmap=True). Parameters point straight into the mapped
+# file, which the OS shares read-only between every process that maps it, so N
+# capture/scanner/server processes hold one copy of the weights instead of N.
+# The bf16 export halves that again at a small, measurable accuracy cost.
+
+DEFAULT_MODEL = "MIT/ast-finetuned-audioset-10-10-0.4593"
+WEIGHTS_DIR = os.environ.get(
+    "AST_WEIGHTS_DIR",
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "CNNmain", "data", "ast_weights")),
+)
+DTYPES = {"fp32": torch.float32, "bf16": torch.bfloat16}
+
+
+def export_dir(model_name=DEFAULT_MODEL, weights_dir=None):
+    return os.path.join(weights_dir or WEIGHTS_DIR, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+
+
+def weights_path(model_name=DEFAULT_MODEL, dtype="fp32", weights_dir=None):
+    return os.path.join(export_dir(model_name, weights_dir), f"weights-{dtype}.pt")
+
+
+def export_weights(model_name=DEFAULT_MODEL, dtype="fp32", weights_dir=None):
+    """Write the hub model's config and state_dict (floating tensors cast to dtype) for mmap loading"""
+    out_dir = export_dir(model_name, weights_dir)
+    path = weights_path(model_name, dtype, weights_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    model = AutoModelForAudioClassification.from_pretrained(model_name)
+    model.config.save_pretrained(out_dir)
+    state = {name: t.to(DTYPES[dtype]) if t.is_floating_point() else t
+             for name, t in model.state_dict().items()}
+
+    tmp = path + ".tmp"
+    torch.save(state, tmp)
+    os.replace(tmp, path)
+    print(f"Exported {model_name} ({dtype}, {os.path.getsize(path) / 1024**2:.0f} MB) to {path}")
+    return path
+
+
+def load_shared_model(model_name=DEFAULT_MODEL, dtype="fp32", weights_dir=None):
+    """AST model whose parameters are backed by the memory-mapped export (exported on first use)"""
+    path = weights_path(model_name, dtype, weights_dir)
+    if not os.path.exists(path):
+        export_weights(model_name, dtype, weights_dir)
+
+    config = AutoConfig.from_pretrained(export_dir(model_name, weights_dir))
+    # mapped copy-on-write; inference never writes the weights, so the pages stay shared
+    state = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+    # build on the meta device so no throwaway fp32 weights are allocated, then
+    # adopt the mapped tensors as the parameters themselves (assign=True, no copy)
+    with torch.device("meta"):
+        model = AutoModelForAudioClassification.from_config(config)
+    model.load_state_dict(state, assign=True)
+    if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+        # a non-persistent buffer isn't in the state_dict; fall back to a normal build
+        model = AutoModelForAudioClassification.from_config(config)
+        model.load_state_dict(state, assign=True)
+
+    model.eval()
+    for p in model.parameters():
+        p.requires_grad_(False)
+    return model
+
+
+def compare_precision(clip_paths, model_name=DEFAULT_MODEL, segment_duration=2.0, max_segments=20):
+    """Accuracy delta of the bf16 export against fp32 over the segments of a reference clip set"""
+    from classifier import AudioClassifier, stream_audio
+
+    fp32 = AudioClassifier(model_name, shared_weights=True, dtype="fp32")
+    bf16 = AudioClassifier(model_name, shared_weights=True, dtype="bf16")
+
+    segments = []
+    for path in clip_paths:
+        for i, (_, chunk) in enumerate(stream_audio(path, fp32.sampling_rate, segment_duration)):
+            if i >= max_segments:
+                break
+            segments.append(chunk)
+    if not segments:
+        raise ValueError("No audio segments found in the reference clips")
+
+    top1_same = 0
+    top5_overlap = []
+    max_logit_diff = 0.0
+    prob_diffs = []
+    for start in range(0, len(segments), 8):
+        batch = segments[start:start + 8]
+        ref = fp32.batch_logits(batch)
+        low = bf16.batch_logits(batch)
+        max_logit_diff = max(max_logit_diff, float((ref - low).abs().max()))
+        prob_diffs.append((torch.softmax(ref, -1) - torch.softmax(low, -1)).abs().max(-1).values)
+        top1_same += int((ref.argmax(-1) == low.argmax(-1)).sum())
+        for a, b in zip(ref.topk(5).indices.tolist(), low.topk(5).indices.tolist()):
+            top5_overlap.append(len(set(a) & set(b)) / 5)
+
+    return {
+        "segments": len(segments),
+        "top1_agreement": top1_same / len(segments),
+        "top5_overlap": float(np.mean(top5_overlap)),
+        "max_logit_diff": max_logit_diff,
+        "max_prob_diff": float(torch.cat(prob_diffs).max()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export AST weights for shared memory-mapped loading.")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--dtype", choices=list(DTYPES), nargs="+", default=["fp32", "bf16"])
+    parser.add_argument("--compare", nargs="*", default=None,
+                        help="Reference clips for the bf16 vs fp32 accuracy check (default: src/tests/*.mp3)")
+    args = parser.parse_args()
+
+    for dtype in args.dtype:
+        export_weights(args.model, dtype)
+
+    if args.compare is not None:
+        clips = args.compare or sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "tests", "*.mp3")))
+        result = compare_precision(clips, args.model)
+        print("\n--- bf16 vs fp32 ---")
+        for key, value in result.items():
+            print(f"{key:16} {value:.4f}" if isinstance(value, float) else f"{key:16} {value}")
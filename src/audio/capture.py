@@ -2,10 +2,9 @@ import sys
 import os
 import sounddevice as sd
 import numpy as np
-from scipy.io.wavfile import write
-import time
-import json
 import time
+import queue
+import threading
 
 CNN_PATH = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "..", "CNNmain", "cnnStuff", "src")
@@ -13,32 +12,86 @@ CNN_PATH = os.path.abspath(
 print("Adding CNN PATH:", CNN_PATH)
 sys.path.insert(0, CNN_PATH)
 
-from cnnstuff.predict import predict
-from direction import detect_direction
+from cnnstuff.hot_reload import HotReloadingModel
+from cnnstuff.audio_model import prepare_waveform
+from cnnstuff.detection_record import DetectionCodec, load_labels, write_record
+from cnnstuff.event_log import DetectionLog
+from analysis import WindowAnalyzer
+from channels import ActiveChannels
+from events import EventAssembler
+from flight_recorder import FlightRecorder
+from inference_server import InferenceClient
+import runtime
 
 SAMPLE_RATE = 48000
 CHUNK_DURATION = 1 # in seconds
-CHANNELS = 8      
+CHANNELS = 8      # device channels; only the active ones are analyzed (see channels.py)
 DEVICE_INDEX = 1  # set automatically later
 
-CHUNKS_DIR = "data/audio_chunks"
+CHUNKS_DIR = "data/audio_chunks"  # flight recorder clips are saved here for the labeling tools
 
-def write_json(json_obj, path="latest_direction.json"):
-        tmp = path + ".tmp"
-        
-        # write temporary
-        with open(tmp, "w") as f:
-            json.dump(json_obj, f)
+# keep the last N seconds in memory instead of writing every chunk to disk
+FLIGHT_RECORDER_SECONDS = 30
+CLIP_SECONDS = 3                 # length of a saved clip, matches the labeling chunk length
+LOW_CONFIDENCE_BAND = (0.15, 0.45)  # top confidence in this band auto-saves a clip
+SAVE_COOLDOWN = 10               # seconds between automatic saves
 
-        # retry replace 10 times if overlay temporarily locks file
-        for _ in range(10):
-            try:
-                os.replace(tmp, path)
-                return
-            except PermissionError:
-                time.sleep(0.01)  # wait 10ms
+# set to (host, port) to share one warm model through inference_server.py
+# instead of loading it in this process, e.g. ("127.0.0.1", 8765)
+INFERENCE_SERVER = None
+inference_client = None
+live_model = None  # HotReloadingModel, picks up retrained weights without a restart
+
+# one STFT per window feeds direction, the activity gate and the CNN input
+analyzer = None  # WindowAnalyzer, built after the torch thread settings are applied
+
+# escalate uncertain windows from AudioCNN to the AST model (see cascade.py)
+USE_CASCADE = False
+cascade = None
+
+# runtime tuning (see runtime.py)
+TORCH_THREADS = 2           # intra-op threads; leaves cores free for the audio callback
+TORCH_INTEROP_THREADS = 1
+CAPTURE_CPUS = None         # e.g. {0} to pin the audio callback thread
+INFERENCE_CPUS = None       # e.g. {1, 2, 3} to pin the inference loop
+WARMUP_WINDOWS = 3
+MAX_QUEUED_CHUNKS = 4       # windows buffered between capture and inference before the oldest is dropped
+
+# consecutive windows hearing the same sound are merged into one event (see events.py)
+EVENT_THRESHOLDS = (0.3, 0.2)  # (open, stay open) confidence
+
+# results go to the overlay as fixed-size binary records (see cnnstuff/detection_record.py)
+DETECTION_PATH = "latest_detection.bin"
+codec = None   # DetectionCodec over the labels in use, rebuilt when a reload changes them
+sequence = 0
+
+# every window's record is also appended here for post-match review and overlay replay
+EVENT_LOG_DIR = "data/event_log"
+event_log = None
+
+def follow_labels():
+    # a hot reload can bring a new labels.json; records and log segments must carry
+    # the list the confidences came from, or the overlay rejects them
+    global codec
+    if live_model is None:
+        return
+    labels = live_model.current()[1]
+    if labels != codec.labels:
+        codec = DetectionCodec(labels)
+        if event_log is not None:
+            event_log.set_labels(labels)
+        print(f"Detection records now use {len(labels)} labels")
 
-        print("WARNING: Could not replace JSON file due to file lock.")
+def publish_result(result, path=DETECTION_PATH):
+    # fixed-size binary record for the overlay; tmp + rename so it never reads half a record
+    global sequence
+    follow_labels()
+    sequence += 1
+    data = codec.encode_result(sequence, result, time.time())
+    if event_log is not None:
+        event_log.append(data)
+    if not write_record(data, path):
+        print("WARNING: Could not replace detection record due to file lock.")
 
 def find_vbcable():
     devices = sd.query_devices()
@@ -48,58 +101,175 @@ def find_vbcable():
             return i
     raise RuntimeError("VB-Cable device not found. Is it installed?")
 
-def record_chunk(filename):
-    print(f"Recording {filename}...")
-    audio = sd.rec(
-        int(CHUNK_DURATION * SAMPLE_RATE),
-        samplerate=SAMPLE_RATE,
-        channels=CHANNELS, #8 channels for 7.1, some will be blank if stereo or 5.1
-        device=DEVICE_INDEX
-    )
-    sd.wait()
-
-    # Convert float32 into int16 WAV
-    audio_int16 = (audio * 32767).astype(np.int16)
-    write(filename, SAMPLE_RATE, audio_int16)
-
-def run_prediction(filepath):
-
-    print(f"Predicting {filepath}...")
-
-    predicted, confidence = predict(filepath, threshold=0.3)
-    direction = detect_direction(filepath)
-
-    # display output
-    print("\n--- MODEL PREDICTION ---")
-    for label, score in sorted(confidence.items(), key=lambda x: x[1], reverse=True):
-        print(f"{label:12} {score:.4f}{'  (PRED)' if label in predicted else ''}")
-
-    print("\nFinal Predicted Labels:", predicted)
-    print(f"Direction: {direction['angle']:.1f}°")
-    print(f"Intensity: {direction['intensity']:.3f}")
-    print("-" * 50)
-
-    # WRITE JSON for overlay and use tmp so it never reads a half written file
-    write_json({
-        "angle": direction["angle"],
-        "intensity": direction["intensity"],
+class CaptureStream:
+    """Callback-driven capture so recording never pauses while a window is being analyzed.
+
+    PortAudio calls the callback on its own thread with one full chunk at a
+    time; the chunk is queued for the inference loop. That thread is boosted and
+    optionally pinned the first time it runs.
+    """
+
+    def __init__(self):
+        self.chunks = queue.Queue(maxsize=MAX_QUEUED_CHUNKS)
+        self.dropped = 0
+        self._thread_setup = False
+        # silent channels (stereo or 5.1 games on the 8-channel device) are dropped here
+        self.active = ActiveChannels(SAMPLE_RATE, CHANNELS)
+        self.stream = sd.InputStream(
+            samplerate=SAMPLE_RATE,
+            channels=CHANNELS, #8 channels for 7.1, some will be blank if stereo or 5.1
+            device=DEVICE_INDEX,
+            blocksize=int(CHUNK_DURATION * SAMPLE_RATE),
+            dtype="float32",
+            callback=self._callback,
+        )
+
+    def _callback(self, indata, frames, time_info, status):
+        if not self._thread_setup:
+            runtime.raise_thread_priority()
+            runtime.pin_current_thread(CAPTURE_CPUS)
+            self._thread_setup = True
+        if status:
+            print(f"Capture status: {status}")
+        # the column -> device channel map travels with the chunk for the flight recorder
+        chunk = (self.active.select(indata), self.active.indices)
+        try:
+            self.chunks.put_nowait(chunk)
+        except queue.Full:
+            # inference is behind; drop the oldest window rather than stall the callback
+            try:
+                self.chunks.get_nowait()
+            except queue.Empty:
+                pass
+            self.chunks.put_nowait(chunk)
+            self.dropped += 1
+
+    def __enter__(self):
+        self.stream.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stream.stop()
+        self.stream.close()
+
+    def read_chunk(self):
+        return self.chunks.get()
+
+def classify_window(audio):
+    """Direction + labels for one (samples, channels) window, without printing or publishing"""
+    # downmix over every device channel, as the models were trained on, however many are active
+    analysis = analyzer.analyze(audio, downmix_channels=CHANNELS)
+    direction = analysis["direction"]
+
+    if not analysis["active"]:
+        # silent window: nothing to classify or draw
+        return {"angle": float(direction["angle"]), "intensity": 0.0, "label": [], "confidence": {}}
+
+    if inference_client is not None:
+        predicted, confidence = inference_client.predict(prepare_waveform(audio, SAMPLE_RATE, CHANNELS), threshold=0.3)
+    elif cascade is not None:
+        predicted, confidence = cascade.classify_waveform(audio, SAMPLE_RATE, threshold=0.3,
+                                                          spectrogram=analysis["mel"], downmix_channels=CHANNELS)
+    else:
+        predicted, confidence = live_model.classify_spectrogram(analysis["mel"], threshold=0.3)
+
+    return {
+        "angle": float(direction["angle"]),
+        "intensity": float(direction["intensity"]),
         "label": predicted,
         "confidence": confidence
-    })
+    }
+
+def run_prediction(audio):
+
+    result = classify_window(audio)
+    predicted = result["label"]
+    confidence = result["confidence"]
+
+    if confidence:
+        # display output
+        print("\n--- MODEL PREDICTION ---")
+        for label, score in sorted(confidence.items(), key=lambda x: x[1], reverse=True):
+            print(f"{label:12} {score:.4f}{'  (PRED)' if label in predicted else ''}")
+
+        print("\nFinal Predicted Labels:", predicted)
+        if live_model is not None:
+            print(f"Model version: {live_model.info['version']}")
+        print(f"Direction: {result['angle']:.1f}°")
+        print(f"Intensity: {result['intensity']:.3f}")
+        print("-" * 50)
+
+    publish_result(result)
+    return result
+
+def listen_for_hotkey(save_requested):
+    # pressing Enter in the capture console saves the last few seconds
+    while True:
+        try:
+            input()
+        except EOFError:
+            return
+        save_requested.set()
 
     
 if __name__ == "__main__":
+    # thread pools must be sized before any model is loaded; pinning first means
+    # torch's worker threads inherit the inference CPU set when they are created
+    runtime.pin_current_thread(INFERENCE_CPUS)
+    runtime.configure_torch(TORCH_THREADS, TORCH_INTEROP_THREADS)
+    analyzer = WindowAnalyzer(SAMPLE_RATE)
+    codec = DetectionCodec(load_labels())
+    event_log = DetectionLog(EVENT_LOG_DIR, codec.labels)
+
     DEVICE_INDEX = find_vbcable()
     print(f"Using VB-Cable device index: {DEVICE_INDEX}")
 
-    os.makedirs(CHUNKS_DIR, exist_ok=True)
+    if INFERENCE_SERVER is not None:
+        inference_client = InferenceClient(*INFERENCE_SERVER)
+        print(f"Using inference server at {INFERENCE_SERVER[0]}:{INFERENCE_SERVER[1]}")
+    else:
+        live_model = HotReloadingModel()
+        if USE_CASCADE:
+            from cascade import CascadeClassifier
+            cascade = CascadeClassifier(cnn=live_model)
+
+    recorder = FlightRecorder(FLIGHT_RECORDER_SECONDS, SAMPLE_RATE, CHANNELS)
+    save_requested = threading.Event()
+    threading.Thread(target=listen_for_hotkey, args=(save_requested,), daemon=True).start()
+    last_auto_save = 0.0
+
+    # pay first-inference costs now rather than on the first live window
+    runtime.warm_up(classify_window, SAMPLE_RATE, CHANNELS, CHUNK_DURATION, WARMUP_WINDOWS)
+    if cascade is not None:
+        # noise rarely escalates, so warm the AST tier explicitly
+        cascade.ast.batch_logits([np.zeros(cascade.ast.sampling_rate, dtype=np.float32)])
 
-    chunk_id = 0
     print("Starting LIVE audio classifier...")
+    print("Press Enter at any time to save the last few seconds for labeling.")
 
-    while True:
-        filename = os.path.join(CHUNKS_DIR, f"live_chunk_{chunk_id:04}.wav")
-        record_chunk(filename)
-        run_prediction(filename)
-        chunk_id += 1
-        time.sleep(0.2)  # small gap
+    assembler = EventAssembler(*EVENT_THRESHOLDS)
+
+    with CaptureStream() as capture:
+        layout = None
+        while True:
+            audio, columns = capture.read_chunk()
+            if audio.shape[1] != layout:
+                layout = audio.shape[1]
+                print(f"Active channel layout: {layout} channels")
+            sample_range = recorder.push(audio, columns)
+            result = run_prediction(audio)
+            recorder.add_detection(sample_range, result)
+            for event in assembler.update(sample_range[0] / SAMPLE_RATE, sample_range[1] / SAMPLE_RATE,
+                                          result["confidence"], result):
+                print(f"EVENT {event['label']} at {event['angle']:.0f}° "
+                      f"({event['peak_confidence']:.2f} peak, {event['offset'] - event['onset']:.1f}s)")
+
+            if save_requested.is_set():
+                save_requested.clear()
+                recorder.save_clip(CHUNKS_DIR, CLIP_SECONDS, reason="hotkey")
+            else:
+                top = max(result["confidence"].values(), default=0.0)
+                now = time.time()
+                if LOW_CONFIDENCE_BAND[0] <= top <= LOW_CONFIDENCE_BAND[1] and now - last_auto_save > SAVE_COOLDOWN:
+                    recorder.save_clip(CHUNKS_DIR, CLIP_SECONDS, reason="lowconf")
+                    last_auto_save = now
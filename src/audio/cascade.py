@@ -0,0 +1,144 @@
+import sys
+import os
+import time
+import librosa
+import torch
+
+CNN_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "CNNmain", "cnnStuff", "src")
+)
+sys.path.insert(0, CNN_PATH)
+
+from cnnstuff.audio_model import audio_to_spectrogram, prepare_waveform, waveform_to_spectrogram
+from cnnstuff.hot_reload import HotReloadingModel
+from cnnstuff.predict import probs_to_labels
+from classifier import AudioClassifier
+
+# sigmoid confidences inside this band are "not sure" and send the window to AST
+UNCERTAIN_LOW = 0.2
+UNCERTAIN_HIGH = 0.7
+
+# AudioSet classes (AST id2label names) that count as evidence for each of our labels
+AUDIOSET_LABEL_MAP = {
+    "footsteps": ["Walk, footsteps", "Run", "Shuffle"],
+    "gunshot": ["Gunshot, gunfire", "Machine gun", "Fusillade", "Artillery fire", "Cap gun"],
+    "gun_handling": ["Ratchet, pawl", "Mechanisms", "Clicking", "Tick"],
+    "explosion": ["Explosion", "Boom", "Burst, pop", "Eruption"],
+    "knife": ["Whoosh, swoosh, swish", "Scrape", "Chopping (food)"],
+    "interface": ["Beep, bleep", "Ding", "Chime"],
+    "background": ["Music", "Speech", "Silence", "Noise", "Wind", "Rain"],
+}
+
+
+class CascadeClassifier:
+    """Runs the small AudioCNN on every window and asks the AST model only when it is unsure.
+
+    A window is escalated when any CNN sigmoid confidence falls inside
+    [uncertain_low, uncertain_high]. For escalated windows the uncertain labels
+    take the AST score, computed as the max sigmoid over the AudioSet classes
+    mapped to that label; confident labels keep the CNN score.
+    """
+
+    def __init__(self, cnn=None, ast=None, uncertain_low=UNCERTAIN_LOW, uncertain_high=UNCERTAIN_HIGH,
+                 label_map=AUDIOSET_LABEL_MAP):
+        self.cnn = cnn or HotReloadingModel()
+        self.ast = ast or AudioClassifier()
+        self.uncertain_low = uncertain_low
+        self.uncertain_high = uncertain_high
+
+        # resolve AudioSet names to class indices once; a typo would silently drop evidence
+        label2id = self.ast.model.config.label2id
+        unknown = sorted({name for names in label_map.values() for name in names if name not in label2id})
+        if unknown:
+            raise ValueError(f"label_map names not in the AST model's classes: {unknown}")
+        self.ast_indices = {label: [label2id[name] for name in names] for label, names in label_map.items()}
+
+        self.counters = {"windows": 0, "cnn_only": 0, "escalated": 0, "cnn_ms": 0.0, "ast_ms": 0.0}
+        self.last_tier = None
+
+    def _ast_scores(self, ast_audio, labels):
+        probs = torch.sigmoid(self.ast.batch_logits([ast_audio]))[0]
+        scores = {}
+        for label in labels:
+            indices = self.ast_indices.get(label)
+            if indices:
+                scores[label] = float(probs[indices].max())
+        return scores
+
+    def classify(self, audio_file, threshold=0.5):
+        """Same return shape as cnnstuff.predict.classify: (predicted labels, label -> confidence)"""
+        return self._classify(
+            lambda: audio_to_spectrogram(audio_file),
+            lambda: librosa.load(audio_file, sr=self.ast.sampling_rate)[0],
+            threshold,
+        )
+
+    def classify_waveform(self, audio, sr, threshold=0.5, spectrogram=None, downmix_channels=None):
+        """Cascade on (samples, channels) audio already in memory; pass a precomputed spectrogram to reuse it"""
+        def ast_audio():
+            mono = audio.sum(axis=1) / (downmix_channels or audio.shape[1]) if audio.ndim == 2 else audio
+            return librosa.resample(mono.astype("float32"), orig_sr=sr, target_sr=self.ast.sampling_rate)
+
+        return self._classify(
+            lambda: spectrogram if spectrogram is not None else
+                waveform_to_spectrogram(prepare_waveform(audio, sr, downmix_channels)),
+            ast_audio,
+            threshold,
+        )
+
+    def _classify(self, get_spectrogram, get_ast_audio, threshold):
+        # inputs come in as callables so the AST input is only prepared for escalated windows
+        model, labels = self.cnn.current()
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            probs = torch.sigmoid(model(get_spectrogram().unsqueeze(0))).squeeze(0)
+        self.counters["cnn_ms"] += (time.perf_counter() - start) * 1000.0
+        self.counters["windows"] += 1
+
+        uncertain = [label for label, p in zip(labels, probs.tolist())
+                     if self.uncertain_low <= p <= self.uncertain_high]
+        if not uncertain:
+            self.counters["cnn_only"] += 1
+            self.last_tier = "cnn"
+            return probs_to_labels(probs, labels, threshold)
+
+        start = time.perf_counter()
+        ast_scores = self._ast_scores(get_ast_audio(), uncertain)
+        self.counters["ast_ms"] += (time.perf_counter() - start) * 1000.0
+        self.counters["escalated"] += 1
+        self.last_tier = "ast"
+
+        for label, score in ast_scores.items():
+            probs[labels.index(label)] = score
+        return probs_to_labels(probs, labels, threshold)
+
+    def stats(self):
+        windows = max(1, self.counters["windows"])
+        return dict(
+            self.counters,
+            escalation_rate=self.counters["escalated"] / windows,
+            mean_cnn_ms=self.counters["cnn_ms"] / windows,
+            mean_ast_ms=self.counters["ast_ms"] / max(1, self.counters["escalated"]),
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Classify audio files with the CNN -> AST cascade.")
+    parser.add_argument("audio_files", nargs="+")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--low", type=float, default=UNCERTAIN_LOW)
+    parser.add_argument("--high", type=float, default=UNCERTAIN_HIGH)
+    args = parser.parse_args()
+
+    cascade = CascadeClassifier(uncertain_low=args.low, uncertain_high=args.high)
+    for path in args.audio_files:
+        predicted, confidence = cascade.classify(path, args.threshold)
+        print(f"{os.path.basename(path)} [{cascade.last_tier}]: {predicted if predicted else 'None'}")
+
+    print("\n--- Cascade stats ---")
+    for key, value in cascade.stats().items():
+        print(f"{key:16} {value:.3f}" if isinstance(value, float) else f"{key:16} {value}")
+    cascade.cnn.stop()
@@ -0,0 +1,69 @@
+import numpy as np
+
+# The capture device is always opened with 8 channels, but stereo and 5.1 games
+# leave some of them silent. ActiveChannels watches per-channel levels and picks
+# the smallest layout (see direction.CHANNEL_LAYOUTS) that covers everything
+# that carried signal recently, so only those channels go downstream.
+
+ACTIVE_DB = -70.0       # a block louder than this (RMS, dBFS) marks its channel active
+HOLD_SECONDS = 10.0     # a channel stays active this long after its last signal
+
+# device channel order for 8-channel capture: FL FR C LFE RL RR SL SR
+_REAR = (4, 5)
+_SIDE = (6, 7)
+
+
+class ActiveChannels:
+    """Rolling per-channel activity for (samples, channels) capture blocks.
+
+    The layout widens as soon as a new channel becomes active and narrows only
+    after it has been silent for hold_seconds, so quiet stretches in a match
+    don't make the layout flap.
+    """
+
+    def __init__(self, sample_rate, channels=8, active_db=ACTIVE_DB, hold_seconds=HOLD_SECONDS):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.threshold = 10 ** (active_db / 10.0)  # mean-square power
+        self.hold_samples = int(hold_seconds * sample_rate)
+        self.position = 0
+        self.last_active = np.full(channels, -self.hold_samples - 1, dtype=np.int64)
+        # only an 8-channel device has a layout to choose; anything else is passed through
+        self.indices = np.arange(2 if channels == 8 else channels)
+
+    @property
+    def layout(self):
+        return len(self.indices)
+
+    def update(self, block):
+        """Record a block's levels and return the device channel indices to keep, in layout order"""
+        power = np.einsum("ij,ij->j", block, block) / max(1, len(block))
+        self.position += len(block)
+        self.last_active[power > self.threshold] = self.position
+
+        if self.channels != 8:
+            return self.indices
+
+        active = (self.position - self.last_active) <= self.hold_samples
+        rear = active[list(_REAR)].any()
+        side = active[list(_SIDE)].any()
+        if rear and side:
+            indices = np.arange(8)
+        elif rear or side or active[2:4].any():
+            # 5.1 as FL FR C LFE SL SR; Windows may route its surrounds to either pair
+            indices = np.array([0, 1, 2, 3, *(_REAR if rear else _SIDE)])
+        else:
+            indices = np.arange(2)
+
+        if not np.array_equal(indices, self.indices):
+            self.indices = indices
+        return self.indices
+
+    def select(self, block):
+        """Only the active channels of a block, as a new array"""
+        indices = self.update(block)
+        if len(indices) == self.channels:
+            return block.copy()
+        if len(indices) == 2:
+            return block[:, :2].copy()  # contiguous slice, cheaper than fancy indexing
+        return block[:, indices]
@@ -2,18 +2,177 @@ from transformers import AutoFeatureExtractor, AutoModelForAudioClassification
 import torch
 import librosa
 import numpy as np
+import soundfile as sf
+import soxr
 import os
+import sys
+
+CNN_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "CNNmain", "cnnStuff", "src")
+)
+sys.path.insert(0, CNN_PATH)
+# main.py imports this module as src.audio.classifier; its siblings are imported bare
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cnnstuff.audio_cache import CACHE_DIR, CacheWriter, get_cached
+from events import EventAssembler
+from ast_features import KaldiFbank
+
+STREAM_BLOCK_FRAMES = 65536  # source frames decoded per read when streaming
+FEATURE_CACHE_DIR = os.path.join(CACHE_DIR, "ast_fbank")  # per-segment fbank frames, same LRU rules
+FEATURE_BATCH = 8  # segments per AST forward pass when scanning a file
+
+
+def _decoded_blocks(audio_path, target_sr, use_cache=True):
+    """Mono float32 blocks at target_sr, served from the decoded-audio cache when possible"""
+    cached = get_cached(audio_path, target_sr) if use_cache else None
+    if cached is not None:
+        for i in range(0, len(cached), STREAM_BLOCK_FRAMES):
+            yield cached[i:i + STREAM_BLOCK_FRAMES]
+        return
+
+    writer = None
+    if use_cache:
+        try:
+            writer = CacheWriter(audio_path, target_sr)
+        except OSError as e:
+            print(f"Warning: Could not cache decoded audio ({e}).")
+    try:
+        with sf.SoundFile(audio_path) as f:
+            resampler = None
+            if f.samplerate != target_sr:
+                resampler = soxr.ResampleStream(f.samplerate, target_sr, 1, dtype="float32")
+
+            done = False
+            while not done:
+                block = f.read(STREAM_BLOCK_FRAMES, dtype="float32", always_2d=True)
+                done = len(block) < STREAM_BLOCK_FRAMES
+                block = block.mean(axis=1)
+                if resampler is not None:
+                    block = resampler.resample_chunk(block, last=done)
+                if writer is not None:
+                    writer.append(block)
+                yield block
+    except BaseException:
+        # includes the consumer stopping early; a partial decode must not be cached
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        writer.commit()
+
+
+def segment_layout(target_sr, segment_duration, overlap=0.0):
+    """(samples per segment, samples between segment starts)"""
+    chunk_samples = int(segment_duration * target_sr)
+    return chunk_samples, max(1, int(chunk_samples * (1.0 - overlap)))
+
+
+def stream_audio(audio_path, target_sr, segment_duration, overlap=0.0, use_cache=True):
+    """Decode a file block by block, yielding (timestamp, mono segment) at target_sr.
+
+    Only a few blocks of audio are held in memory at once, so this works the same
+    on a 3 second clip and a multi-hour recording. overlap is the fraction of each
+    segment shared with the next one (0 <= overlap < 1). A completed decode is
+    stored in the decoded-audio cache, so later passes skip decoding entirely.
+    """
+    if not 0.0 <= overlap < 1.0:
+        raise ValueError(f"overlap must be in [0, 1), got {overlap}")
+
+    chunk_samples, hop = segment_layout(target_sr, segment_duration, overlap)
+
+    buffer = np.zeros(0, dtype=np.float32)
+    start = 0  # index of buffer[0] in the resampled stream
+    for block in _decoded_blocks(audio_path, target_sr, use_cache):
+        buffer = np.concatenate([buffer, block])
+
+        while len(buffer) >= chunk_samples:
+            yield start / target_sr, buffer[:chunk_samples]
+            buffer = buffer[hop:]
+            start += hop
+
+    # same tail rule as process_long_audio: keep it if at least half a segment, zero padded
+    if len(buffer) >= chunk_samples // 2 and (start == 0 or len(buffer) > chunk_samples - hop):
+        yield start / target_sr, np.pad(buffer, (0, chunk_samples - len(buffer)))
 
 class AudioClassifier:
-    def __init__(self, model_name="MIT/ast-finetuned-audioset-10-10-0.4593", sampling_rate=16000):
+    def __init__(self, model_name="MIT/ast-finetuned-audioset-10-10-0.4593", sampling_rate=16000,
+                 shared_weights=False, dtype="fp32", feature_cache=False):
+        # shared_weights maps an exported copy of the weights read-only (see ast_weights.py),
+        # so every process on the machine shares one copy; dtype="bf16" halves it again.
+        # feature_cache keeps each scanned file's fbank frames so repeat scans skip the front-end
         print("Loading model...")
         self.extractor = AutoFeatureExtractor.from_pretrained(model_name)
-        self.model = AutoModelForAudioClassification.from_pretrained(model_name)
+        self.fbank = KaldiFbank(self.extractor)  # batched stand-in for the extractor's per-example loop
+        self.feature_cache = feature_cache
+        if shared_weights:
+            from ast_weights import load_shared_model
+            self.model = load_shared_model(model_name, dtype)
+        else:
+            self.model = AutoModelForAudioClassification.from_pretrained(model_name)
+        self.dtype = next(self.model.parameters()).dtype
         self.sampling_rate = sampling_rate
         print("Model loaded.")
 
+    def _features(self, audio):
+        chunks = [audio] if np.ndim(audio) == 1 else audio
+        return {"input_values": self.fbank(chunks).to(self.dtype)}
+
+    def iter_segment_frames(self, audio_path, segment_duration, overlap=0.0, batch_size=FEATURE_BATCH):
+        """Yield (timestamps, fbank frames per segment) in batches, from the feature cache when enabled"""
+        key = f"fbank{self.sampling_rate}-{segment_duration}-{overlap}"
+        _, hop = segment_layout(self.sampling_rate, segment_duration, overlap)
+        cached = get_cached(audio_path, key, FEATURE_CACHE_DIR) if self.feature_cache else None
+        if cached is not None:
+            for i in range(0, len(cached), batch_size):
+                frames = cached[i:i + batch_size]
+                yield [(i + j) * hop / self.sampling_rate for j in range(len(frames))], frames
+            return
+
+        writer = None
+        try:
+            timestamps, chunks = [], []
+            for timestamp, chunk in stream_audio(audio_path, self.sampling_rate, segment_duration, overlap):
+                timestamps.append(timestamp)
+                chunks.append(chunk)
+                if len(chunks) < batch_size:
+                    continue
+                frames = self.fbank.frames(chunks)
+                writer = self._cache_frames(writer, audio_path, key, frames)
+                yield timestamps, frames
+                timestamps, chunks = [], []
+            if chunks:
+                frames = self.fbank.frames(chunks)
+                writer = self._cache_frames(writer, audio_path, key, frames)
+                yield timestamps, frames
+        except BaseException:
+            if writer:
+                writer.abort()
+            raise
+        if writer:
+            writer.commit()
+
+    def _cache_frames(self, writer, audio_path, key, frames):
+        if not self.feature_cache or writer is False:
+            return writer
+        if writer is None:
+            try:
+                writer = CacheWriter(audio_path, key, FEATURE_CACHE_DIR, frame_shape=frames[0].shape)
+            except OSError as e:
+                print(f"Warning: Could not cache AST features ({e}).")
+                return False
+        writer.append(np.stack([f.numpy() for f in frames]))
+        return writer
+
     def classify_file(self, audio_path):
-        audio_input, _ = librosa.load(audio_path, sr=self.sampling_rate)
+        # the extractor truncates to max_length frames (10 ms hop), so don't decode past that
+        max_frames = getattr(self.extractor, "max_length", None)
+        duration = max_frames * 0.01 + 0.025 if max_frames else None
+        cached = get_cached(audio_path, self.sampling_rate)
+        if cached is not None:
+            audio_input = cached if duration is None else cached[:int(duration * self.sampling_rate)]
+        else:
+            audio_input, _ = librosa.load(audio_path, sr=self.sampling_rate, duration=duration)
         predicted_label, confidence, top3 = self.classify_chunk(audio_input)
         print(f"\nWhole file prediction: {predicted_label} ({confidence:.3f} confidence)")
         print("Top 3 predictions:")
@@ -21,34 +180,59 @@ class AudioClassifier:
             print(f"  {i}. {lbl}: {conf:.3f}")
         return predicted_label, confidence, top3
 
-    def process_long_audio(self, audio_path, segment_duration=2.0, confidence_threshold=0.3):
-        audio_input, sr = librosa.load(audio_path, sr=self.sampling_rate)
-        chunk_samples = int(segment_duration * sr)
+    def iter_long_audio(self, audio_path, segment_duration=2.0, confidence_threshold=0.3, overlap=0.0):
+        """Stream a long file and yield (timestamp, label, confidence, top3) as each event is found"""
+        for timestamps, frames in self.iter_segment_frames(audio_path, segment_duration, overlap):
+            for timestamp, (label, confidence, top3) in zip(timestamps, self._classify_frames(frames)):
+                if confidence >= confidence_threshold:
+                    yield timestamp, label, confidence, top3
+
+    def process_long_audio(self, audio_path, segment_duration=2.0, confidence_threshold=0.3, overlap=0.0):
         segments = []
 
-        for i in range(0, len(audio_input), chunk_samples):
-            chunk = audio_input[i:i + chunk_samples]
-            if len(chunk) < chunk_samples // 2:
-                continue
-            if len(chunk) < chunk_samples:
-                chunk = np.pad(chunk, (0, chunk_samples - len(chunk)))
-            timestamp = i / sr
-            label, confidence, top3 = self.classify_chunk(chunk)
-            if confidence >= confidence_threshold:
-                minutes, seconds = divmod(int(timestamp), 60)
-                print(f"\nDetected {label} at {minutes:02}:{seconds:02} ({confidence:.3f} confidence)")
-                print("Top 3 predictions:")
-                for rank, (lbl, conf) in enumerate(top3, start=1):
-                    print(f"  {rank}. {lbl}: {conf:.3f}")
-                segments.append((timestamp, label, confidence, top3))
+        for timestamp, label, confidence, top3 in self.iter_long_audio(
+                audio_path, segment_duration, confidence_threshold, overlap):
+            minutes, seconds = divmod(int(timestamp), 60)
+            print(f"\nDetected {label} at {minutes:02}:{seconds:02} ({confidence:.3f} confidence)")
+            print("Top 3 predictions:")
+            for rank, (lbl, conf) in enumerate(top3, start=1):
+                print(f"  {rank}. {lbl}: {conf:.3f}")
+            segments.append((timestamp, label, confidence, top3))
         print(f"\nFound {len(segments)} confident audio events!")
         return segments
 
+    def detect_events(self, audio_path, segment_duration=2.0, overlap=0.5, on_threshold=0.3, off_threshold=0.2):
+        """Scan with overlapping windows and merge repeated detections into one event per sound.
+
+        Every label scoring at least off_threshold is passed on, not just the
+        top 3, so an event stays open while its label stays above the off
+        threshold even when other classes outrank it; see events.py for the
+        hysteresis and non-max suppression. Returns event dicts in onset order.
+        """
+        assembler = EventAssembler(on_threshold, off_threshold)
+        id2label = self.model.config.id2label
+        events = []
+        for timestamps, frames in self.iter_segment_frames(audio_path, segment_duration, overlap):
+            probs = torch.nn.functional.softmax(self._frame_logits(frames), dim=-1)
+            for timestamp, row in zip(timestamps, probs):
+                # labels below off_threshold would close or not open an event either way
+                indices = torch.nonzero(row >= off_threshold).flatten().tolist()
+                scores = {id2label[i]: float(row[i]) for i in indices}
+                events.extend(assembler.update(timestamp, timestamp + segment_duration, scores))
+        events.extend(assembler.flush())
+
+        for event in events:
+            minutes, seconds = divmod(int(event["onset"]), 60)
+            print(f"{minutes:02}:{seconds:02} {event['label']} ({event['peak_confidence']:.3f} peak, "
+                  f"{event['offset'] - event['onset']:.1f}s, {event['windows']} windows)")
+        print(f"\nFound {len(events)} audio events!")
+        return events
+
     def classify_chunk(self, audio_chunk):
-        inputs = self.extractor(audio_chunk, sampling_rate=self.sampling_rate, return_tensors="pt", padding=True)
+        inputs = self._features(audio_chunk)
         with torch.no_grad():
             outputs = self.model(**inputs)
-            predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+            predictions = torch.nn.functional.softmax(outputs.logits.float(), dim=-1)
             top_prediction = torch.argmax(predictions, dim=-1)
             confidence = torch.max(predictions).item()
             predicted_label = self.model.config.id2label[top_prediction.item()]
@@ -57,6 +241,34 @@ class AudioClassifier:
                            for conf, class_id in zip(top_3.values[0], top_3.indices[0])]
             return predicted_label, confidence, top3_labels
 
+    def batch_logits(self, audio_chunks):
+        """Raw AudioSet logits for several chunks in one forward pass, shape (n_chunks, n_classes)"""
+        inputs = self._features(list(audio_chunks))
+        with torch.no_grad():
+            return self.model(**inputs).logits.float()
+
+    def _frame_logits(self, frames):
+        # frames from iter_segment_frames -> one forward pass
+        with torch.no_grad():
+            return self.model(input_values=self.fbank.finish(frames).to(self.dtype)).logits.float()
+
+    def _classify_frames(self, frames):
+        return self._top3(self._frame_logits(frames))
+
+    def classify_batch(self, audio_chunks):
+        """Classify several chunks in one forward pass, returning a (label, confidence, top3) per chunk"""
+        return self._top3(self.batch_logits(audio_chunks))
+
+    def _top3(self, logits):
+        predictions = torch.nn.functional.softmax(logits, dim=-1)
+        top_3 = torch.topk(predictions, 3)
+        id2label = self.model.config.id2label
+        results = []
+        for values, indices in zip(top_3.values.tolist(), top_3.indices.tolist()):
+            top3_labels = [(id2label[class_id], conf) for conf, class_id in zip(values, indices)]
+            results.append((top3_labels[0][0], top3_labels[0][1], top3_labels))
+        return results
+
 dataset = [
     {"path": r"C:/wicseSP/src/tests/rifle-gun.mp3", "label": "gunfire"},
     {"path": r"C:/wicseSP/src/tests/game-explosion.mp3", "label": "explosion"},
@@ -3,78 +3,60 @@ import soundfile as sf
 
 #captures directional audio as 7.1, but only uses the first two channels for direction detection
 
-def detect_direction(audio_chunk):
+#channel order for each layout; LFE is bass and non directional
+CHANNEL_LAYOUTS = {
+    2: ["FL", "FR"],
+    6: ["FL", "FR", "C", "LFE", "SL", "SR"],
+    8: ["FL", "FR", "C", "LFE", "RL", "RR", "SL", "SR"],
+}
 
-    audio_chunk, samplerate = sf.read(audio_chunk)
+def detect_direction(audio_chunk, verbose=True):
+
+    # accepts a WAV path or a (samples, channels) array straight from the capture device
+    if isinstance(audio_chunk, str):
+        audio_chunk, samplerate = sf.read(audio_chunk)
+    audio_chunk = np.asarray(audio_chunk, dtype=np.float64)
 
     if audio_chunk.ndim == 1:
         # Mono: duplicate to 8 channels
         audio_chunk = np.stack([audio_chunk] * 8, axis=1)
     num_channels = audio_chunk.shape[1]
 
-    #get num of channels 
-    if num_channels == 2: 
-        FL = audio_chunk[:, 0]
-        FR = audio_chunk[:, 1]
+    layout = channel_layout(num_channels)
+
+    #compute energy per channel
+    energies = {name: float(np.sum(audio_chunk[:, i]**2)) for i, name in enumerate(layout)}
+
+    return direction_from_energies(energies, verbose)
 
-        energies = {
-            "FL": float(np.sum(FL**2)),
-            "FR": float(np.sum(FR**2))
-        }
+def channel_layout(num_channels):
+    #get channel names for the number of channels
+    if num_channels == 2:
+        return CHANNEL_LAYOUTS[2]
+    elif num_channels == 6:
+        return CHANNEL_LAYOUTS[6]
+    elif num_channels >= 8:
+        return CHANNEL_LAYOUTS[8]
+    else: 
+        raise ValueError(f"Unsupported number of channels: {num_channels}")
 
+def direction_from_energies(energies, verbose=False):
+    # energies: channel name -> energy, named as in CHANNEL_LAYOUTS
+    num_channels = len(energies)
+
+    if num_channels == 2: 
         energy_left = energies["FL"]
         energy_right = energies["FR"]
         energy_front = energy_left + energy_right
         energy_back = 0
 
-
     elif num_channels == 6:
-        #map channels
-        FL = audio_chunk[:, 0] 
-        FR = audio_chunk[:, 1]
-        C = audio_chunk[:, 2]
-        LFE = audio_chunk[:, 3] 
-        SL = audio_chunk[:, 4]
-        SR = audio_chunk[:, 5]
-
-        #compute energy
-        energies = {
-            "FL": float(np.sum(FL**2)),
-            "FR": float(np.sum(FR**2)),
-            "C":  float(np.sum(C**2)),
-            "LFE":float(np.sum(LFE**2)),
-            "SL": float(np.sum(SL**2)),
-            "SR": float(np.sum(SR**2)),
-        }
-    
         energy_left  = energies["FL"] + energies["SL"]
         energy_right = energies["FR"] + energies["SR"]
         energy_front = energies["FL"] + energies["FR"] + energies["C"]
         energy_back  = energies["SL"] + energies["SR"]
 
-    elif num_channels >= 8:
-        #map channels
-        FL = audio_chunk[:, 0] #if stereo, only this and FR
-        FR = audio_chunk[:, 1]
-        C = audio_chunk[:, 2]
-        LFE = audio_chunk[:, 3] #bass, non directional 
-        RL = audio_chunk[:, 4]
-        RR = audio_chunk[:, 5]
-        SL = audio_chunk[:, 6]
-        SR = audio_chunk[:, 7]
-
-        #compute energy
-        energies = {
-            "FL": float(np.sum(FL**2)),
-            "FR": float(np.sum(FR**2)),
-            "C":  float(np.sum(C**2)),
-            "LFE":float(np.sum(LFE**2)),
-            "SL": float(np.sum(SL**2)),
-            "SR": float(np.sum(SR**2)),
-            "RL": float(np.sum(RL**2)),
-            "RR": float(np.sum(RR**2)),
-        }
-        
+    else:
         #compute energy regions
         #add all the left, right, front, back to get total energy region
         energy_left  = energies["FL"] + energies["SL"] + energies["RL"]
@@ -82,10 +64,6 @@ def detect_direction(audio_chunk):
         energy_front = energies["FL"] + energies["FR"] + energies["C"]
         energy_back  = energies["RL"] + energies["RR"]
 
-    else: 
-        raise ValueError(f"Unsupported number of channels: {num_channels}")
-
-    
     #calculate angle
     x = energy_right - energy_left
     y = energy_front - energy_back
@@ -95,7 +73,8 @@ def detect_direction(audio_chunk):
     magnitude = np.sqrt(x*x + y*y)
     total = (energy_left + energy_right + energy_front + energy_back + 1e-6)
     intensity = magnitude / total
-    print("ENERGIES:", energies)
+    if verbose:
+        print("ENERGIES:", energies)
 
     return {
     "angle": angle,
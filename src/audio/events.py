@@ -0,0 +1,97 @@
+# Event assembly: turns per-window label scores into one event per physical sound.
+#
+# With overlapping windows (or any sound longer than a window) a single gunshot
+# scores in several consecutive windows. Per label, an event opens when a
+# window's score reaches on_threshold and stays open while scores stay at or
+# above off_threshold (hysteresis), so a sound hovering around one threshold
+# doesn't split. Closed events are then held for min_separation seconds; a
+# new event of the same label starting within that gap is merged into it and
+# the peak is kept (temporal non-max suppression).
+
+ON_THRESHOLD = 0.5
+OFF_THRESHOLD = 0.3
+MIN_SEPARATION = 0.25  # seconds between same-label events before they count as separate sounds
+
+
+class EventAssembler:
+    """Feed update() every window in time order; it returns the events that have been finalized.
+
+    Thresholds can be overridden per label with {label: (on, off)}.
+    Events are dicts with label, onset, offset, peak_confidence, peak_time,
+    angle and intensity (at the peak window) and the number of windows merged.
+    """
+
+    def __init__(self, on_threshold=ON_THRESHOLD, off_threshold=OFF_THRESHOLD,
+                 min_separation=MIN_SEPARATION, label_thresholds=None):
+        if off_threshold > on_threshold:
+            raise ValueError("off_threshold must not be above on_threshold")
+        self.on_threshold = on_threshold
+        self.off_threshold = off_threshold
+        self.min_separation = min_separation
+        self.label_thresholds = label_thresholds or {}
+        self.open = {}  # label -> event still receiving windows
+        self.held = {}  # label -> closed event waiting out min_separation
+        self.ready = []  # finalized events not returned yet
+
+    def thresholds(self, label):
+        return self.label_thresholds.get(label, (self.on_threshold, self.off_threshold))
+
+    def update(self, start, end, scores, direction=None):
+        """Add one window's scores ({label: confidence}); returns finished events"""
+        for label, score in scores.items():
+            on, off = self.thresholds(label)
+            event = self.open.get(label)
+            if event is not None:
+                if score >= off:
+                    self._extend(event, start, end, score, direction)
+                else:
+                    self._close(label)
+            elif score >= on:
+                held = self.held.get(label)
+                if held is not None and start - held["offset"] < self.min_separation:
+                    # same sound resurfacing: reopen the held event rather than start a second one
+                    self.open[label] = self.held.pop(label)
+                    self._extend(self.open[label], start, end, score, direction)
+                else:
+                    if held is not None:
+                        self.ready.append(self.held.pop(label))
+                    self.open[label] = self._new(label, start, end, score, direction)
+
+        # labels missing from this window count as silent
+        for label in [l for l in self.open if l not in scores]:
+            self._close(label)
+        return self._release(start)
+
+    def flush(self):
+        """Close and return everything still pending, e.g. at the end of a file"""
+        for label in list(self.open):
+            self._close(label)
+        return self._release(float("inf"))
+
+    @staticmethod
+    def _new(label, start, end, score, direction):
+        event = {"label": label, "onset": start, "offset": end, "peak_confidence": -1.0,
+                 "peak_time": None, "angle": None, "intensity": None, "windows": 0}
+        EventAssembler._extend(event, start, end, score, direction)
+        return event
+
+    @staticmethod
+    def _extend(event, start, end, score, direction):
+        event["offset"] = max(event["offset"], end)
+        event["windows"] += 1
+        if score > event["peak_confidence"]:
+            event["peak_confidence"] = float(score)
+            event["peak_time"] = (start + end) / 2
+            if direction is not None:
+                event["angle"] = float(direction["angle"])
+                event["intensity"] = float(direction["intensity"])
+
+    def _close(self, label):
+        # any earlier held event of this label was released or reopened when this one started
+        self.held[label] = self.open.pop(label)
+
+    def _release(self, now):
+        done = [label for label, event in self.held.items() if now - event["offset"] >= self.min_separation]
+        events = self.ready + [self.held.pop(label) for label in done]
+        self.ready = []
+        return sorted(events, key=lambda e: e["onset"])
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+import numpy as np
+from scipy.io.wavfile import write
+
+
+class FlightRecorder:
+    """Keeps the last few seconds of multichannel capture, plus detections, in memory.
+
+    Audio is stored as int16 in a fixed ring buffer, so memory is bounded
+    (8 ch x 48 kHz x 30 s is about 23 MB) and nothing touches the disk until a
+    clip is asked for with save_clip().
+    """
+
+    def __init__(self, seconds, sample_rate, channels):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.capacity = int(seconds * sample_rate)
+        self.buffer = np.zeros((self.capacity, channels), dtype=np.int16)
+        self.total = 0  # samples pushed since start; the write position is total % capacity
+        self.detections = deque()  # (start_sample, end_sample, wall_time, detection)
+        self.lock = threading.Lock()
+
+    def push(self, audio, columns=None):
+        """Append a float32 (samples, channels) block; returns its (start, end) sample range
+
+        columns gives the device channel each block column belongs to when the
+        block holds only some of them, so a layout change mid-clip doesn't put
+        e.g. side and rear audio in the same column.
+        """
+        block = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+        if block.ndim == 1:
+            block = block[:, None]
+        full = len(block)
+        block = block[-self.capacity:]
+        n = len(block)
+
+        with self.lock:
+            start = self.total
+            pos = (start + full - n) % self.capacity
+            first = min(n, self.capacity - pos)
+            if columns is None:
+                columns = np.arange(block.shape[1])
+            if len(columns) == self.channels:
+                self.buffer[pos:pos + first] = block[:first]
+                self.buffer[:n - first] = block[first:]
+            else:
+                # capture may pass only its active channels; the rest are cleared so stale audio doesn't linger
+                rows = np.zeros((n, self.channels), dtype=np.int16)
+                rows[:, columns] = block
+                self.buffer[pos:pos + first] = rows[:first]
+                self.buffer[:n - first] = rows[first:]
+            self.total += full
+
+            # drop detections whose audio has been overwritten
+            oldest = self.total - self.capacity
+            while self.detections and self.detections[0][1] <= oldest:
+                self.detections.popleft()
+        return start, start + full
+
+    def add_detection(self, sample_range, detection):
+        with self.lock:
+            self.detections.append((sample_range[0], sample_range[1], time.time(), detection))
+
+    def snapshot(self, seconds=None):
+        """(audio, start_sample, detections) for the most recent `seconds` of audio, oldest first"""
+        with self.lock:
+            available = min(self.total, self.capacity)
+            n = available if seconds is None else min(available, int(seconds * self.sample_rate))
+            end = self.total % self.capacity
+            idx = (np.arange(end - n, end)) % self.capacity
+            audio = self.buffer[idx].copy()
+            start = self.total - n
+            detections = [d for d in self.detections if d[1] > start]
+        return audio, start, detections
+
+    def save_clip(self, out_dir, seconds=None, reason="manual"):
+        """Write the recent audio as a WAV with a JSON sidecar of aligned detections"""
+        audio, start, detections = self.snapshot(seconds)
+        if len(audio) == 0:
+            return None
+
+        os.makedirs(out_dir, exist_ok=True)
+        now = time.time()
+        stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(now)) + f"_{int(now * 1000) % 1000:03d}"
+        base = os.path.join(out_dir, f"flight_{stamp}_{reason}")
+        n = 1
+        while os.path.exists(base + ".wav"):
+            # two saves in the same millisecond (e.g. hotkey and low-confidence together)
+            base = os.path.join(out_dir, f"flight_{stamp}_{reason}_{n}")
+            n += 1
+        write(base + ".wav", self.sample_rate, audio)
+
+        sidecar = {
+            "reason": reason,
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "duration": len(audio) / self.sample_rate,
+            "detections": [
+                {
+                    "start": max(0, s - start) / self.sample_rate,
+                    "end": (e - start) / self.sample_rate,
+                    "wall_time": t,
+                    **detection,
+                }
+                for s, e, t, detection in detections
+            ],
+        }
+        with open(base + ".json", "w") as f:
+            json.dump(sidecar, f, indent=2)
+
+        print(f"💾 Saved flight recorder clip ({reason}): {base}.wav")
+        return base + ".wav"
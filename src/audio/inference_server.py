@@ -0,0 +1,295 @@
+import sys
+import os
+import asyncio
+import argparse
+import json
+import socket
+import struct
+import time
+from collections import deque
+
+import numpy as np
+import torch
+
+CNN_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "CNNmain", "cnnStuff", "src")
+)
+sys.path.insert(0, CNN_PATH)
+
+from cnnstuff.audio_model import waveform_to_spectrogram
+from cnnstuff.hot_reload import HotReloadingModel
+from cnnstuff.predict import probs_to_labels
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_BATCH_SIZE = 16
+MAX_WAIT_MS = 10      # how long the first request in a batch may wait for company
+LATENCY_WINDOW = 500  # latencies kept per client for the percentile stats
+
+# Wire format, both directions: 4-byte big-endian header length, a JSON header,
+# then header["nbytes"] bytes of raw little-endian float32 audio (requests only).
+_LEN = struct.Struct(">I")
+
+
+def encode_message(header, payload=b""):
+    if payload:
+        header = dict(header, nbytes=len(payload))
+    raw = json.dumps(header).encode("utf-8")
+    return _LEN.pack(len(raw)) + raw + payload
+
+
+async def read_message(reader):
+    size = _LEN.unpack(await reader.readexactly(_LEN.size))[0]
+    header = json.loads(await reader.readexactly(size))
+    payload = b""
+    if header.get("nbytes"):
+        payload = await reader.readexactly(header["nbytes"])
+    return header, payload
+
+
+class ClientStats:
+    def __init__(self):
+        self.queued = 0
+        self.completed = 0
+        self.latencies_ms = deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self):
+        lat = np.array(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        return {
+            "queue_depth": self.queued,
+            "completed": self.completed,
+            "latency_ms_p50": float(np.percentile(lat, 50)),
+            "latency_ms_p95": float(np.percentile(lat, 95)),
+            "latency_ms_max": float(lat.max()),
+        }
+
+
+class MicroBatcher:
+    """Collects requests from many clients and runs them through one model in batches.
+
+    A batch is flushed when it reaches max_batch_size or when its oldest request
+    has waited max_wait_ms, whichever comes first. Requests are bucketed by key
+    (e.g. waveform length) so every batch can be stacked into one tensor.
+    """
+
+    def __init__(self, run_batch, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = asyncio.Queue()
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+
+    async def submit(self, key, item):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, item, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(pending) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    pending.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            buckets = {}
+            for key, item, future in pending:
+                buckets.setdefault(key, []).append((item, future))
+
+            for key, entries in buckets.items():
+                items = [item for item, _ in entries]
+                self.batch_sizes.append(len(items))
+                try:
+                    # inference runs off the event loop so clients can keep queueing
+                    results = await loop.run_in_executor(None, self.run_batch, items)
+                except Exception as e:
+                    for _, future in entries:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                for (_, future), result in zip(entries, results):
+                    if not future.done():
+                        future.set_result(result)
+
+
+class InferenceServer:
+    def __init__(self, use_ast=False, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        print("Loading AudioCNN...")
+        self.live_model = HotReloadingModel()
+        self.batchers = {"cnn": MicroBatcher(self._run_cnn, max_batch_size, max_wait_ms)}
+
+        self.ast = None
+        if use_ast:
+            from classifier import AudioClassifier
+            self.ast = AudioClassifier()
+            self.batchers["ast"] = MicroBatcher(self._run_ast, max_batch_size, max_wait_ms)
+
+        self.clients = {}
+        self.connections = 0
+
+    def _run_cnn(self, items):
+        # one snapshot per batch so a reload can't split a batch across versions
+        model, labels = self.live_model.current()
+        audio = np.stack([audio for audio, _ in items])
+        with torch.no_grad():
+            probs = torch.sigmoid(model(waveform_to_spectrogram(audio)))
+        return [probs_to_labels(row, labels, threshold)
+                for row, (_, threshold) in zip(probs, items)]
+
+    def _run_ast(self, items):
+        return self.ast.classify_batch([audio for audio, _ in items])
+
+    def stats(self):
+        return {
+            "model_version": self.live_model.info["version"],
+            "clients": {cid: s.as_dict() for cid, s in self.clients.items()},
+            "mean_batch_size": {
+                name: float(np.mean(b.batch_sizes)) if b.batch_sizes else 0.0
+                for name, b in self.batchers.items()
+            },
+        }
+
+    async def handle_request(self, client_id, header, payload):
+        op = header.get("op", "predict")
+        if op == "stats":
+            return {"ok": True, "stats": self.stats()}
+
+        model_name = header.get("model", "cnn")
+        if model_name not in self.batchers:
+            return {"ok": False, "error": f"model '{model_name}' is not loaded"}
+
+        audio = np.frombuffer(payload, dtype="<f4")
+        stats = self.clients[client_id]
+        stats.queued += 1
+        start = time.perf_counter()
+        try:
+            if model_name == "cnn":
+                predicted, confidence = await self.batchers["cnn"].submit(
+                    len(audio), (audio, header.get("threshold", 0.5)))
+                result = {"label": predicted, "confidence": confidence}
+            else:
+                label, confidence, top3 = await self.batchers["ast"].submit(len(audio), (audio, None))
+                result = {"label": label, "confidence": confidence, "top3": top3}
+        finally:
+            stats.queued -= 1
+        stats.completed += 1
+        stats.latencies_ms.append((time.perf_counter() - start) * 1000.0)
+        return dict(result, ok=True, id=header.get("id"))
+
+    async def handle_client(self, reader, writer):
+        # unix socket peers have no address, so a counter keeps their ids distinct
+        self.connections += 1
+        client_id = f"{writer.get_extra_info('peername') or 'unix'}#{self.connections}"
+        self.clients[client_id] = ClientStats()
+        write_lock = asyncio.Lock()
+
+        async def respond(header, payload):
+            try:
+                response = await self.handle_request(client_id, header, payload)
+            except Exception as e:
+                response = {"ok": False, "id": header.get("id"), "error": str(e)}
+            async with write_lock:
+                writer.write(encode_message(response))
+                await writer.drain()
+
+        tasks = set()
+        try:
+            while True:
+                header, payload = await read_message(reader)
+                # one task per request so a client may pipeline several windows
+                task = asyncio.create_task(respond(header, payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.clients.pop(client_id, None)
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT, unix_path=None):
+        for batcher in self.batchers.values():
+            asyncio.create_task(batcher.run())
+
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_client, path=unix_path)
+            print(f"Inference server listening on {unix_path}")
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+            print(f"Inference server listening on {host}:{port}")
+
+        async with server:
+            await server.serve_forever()
+
+
+class InferenceClient:
+    """Blocking client used by capture.py; one connection per capture stream"""
+
+    def __init__(self, host=HOST, port=PORT, unix_path=None, timeout=5.0):
+        if unix_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port))
+        self.sock.settimeout(timeout)
+        self.next_id = 0
+
+    def _recv_exactly(self, n):
+        buf = bytearray()
+        while len(buf) < n:
+            part = self.sock.recv(n - len(buf))
+            if not part:
+                raise ConnectionError("Inference server closed the connection")
+            buf.extend(part)
+        return bytes(buf)
+
+    def request(self, header, audio=None):
+        self.next_id += 1
+        header = dict(header, id=self.next_id)
+        payload = np.ascontiguousarray(audio, dtype="<f4").tobytes() if audio is not None else b""
+        self.sock.sendall(encode_message(header, payload))
+        size = _LEN.unpack(self._recv_exactly(_LEN.size))[0]
+        response = json.loads(self._recv_exactly(size))
+        if not response.get("ok"):
+            raise RuntimeError(f"Inference server error: {response.get('error')}")
+        return response
+
+    def predict(self, audio, threshold=0.5):
+        """audio is mono float32 at cnnstuff's SAMPLE_RATE; returns (predicted, confidence) like predict()"""
+        response = self.request({"op": "predict", "model": "cnn", "threshold": threshold}, audio)
+        return response["label"], response["confidence"]
+
+    def classify_ast(self, audio):
+        """audio is mono float32 at 16 kHz; returns (label, confidence, top3) like classify_chunk()"""
+        response = self.request({"op": "predict", "model": "ast"}, audio)
+        return response["label"], response["confidence"], [tuple(t) for t in response["top3"]]
+
+    def stats(self):
+        return self.request({"op": "stats"})["stats"]
+
+    def close(self):
+        self.sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shared local inference server with micro-batching.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", default=None, help="Serve on a Unix socket path instead of TCP.")
+    parser.add_argument("--ast", action="store_true", help="Also load the AST AudioClassifier.")
+    parser.add_argument("--max_batch_size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max_wait_ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    server = InferenceServer(args.ast, args.max_batch_size, args.max_wait_ms)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        print("Inference server stopped.")
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import threading
+import numpy as np
+import torch
+
+
+def configure_torch(intra_threads=None, interop_threads=None):
+    """Cap torch's thread pools so inference doesn't compete with the audio callback for every core.
+
+    Must run before the first model is loaded; torch only accepts the
+    inter-op setting before any parallel work has started.
+    """
+    if intra_threads:
+        torch.set_num_threads(intra_threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            print(f"Warning: Could not set inter-op threads ({e}).")
+    print(f"torch threads: intra={torch.get_num_threads()} inter={torch.get_num_interop_threads()}")
+
+
+def pin_current_thread(cpus):
+    """Restrict the calling thread to a set of CPU indices (Linux and Windows)"""
+    if not cpus:
+        return False
+    try:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(threading.get_native_id(), set(cpus))
+            return True
+        if sys.platform == "win32":
+            import ctypes
+            mask = sum(1 << cpu for cpu in cpus)
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetThreadAffinityMask(kernel32.GetCurrentThread(), mask))
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not set CPU affinity ({e}).")
+    return False
+
+
+def raise_thread_priority():
+    """Best-effort priority boost for the calling thread; silently keeps the default if not allowed"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            THREAD_PRIORITY_HIGHEST = 2
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_HIGHEST))
+        if hasattr(os, "setpriority"):
+            # on Linux the nice value is per thread when addressed by native id
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -10)
+            return True
+    except (OSError, AttributeError):
+        pass
+    return False
+
+
+def warm_up(run_window, sample_rate, channels, seconds, windows=3):
+    """Push a few synthetic windows through the live path before capture starts.
+
+    This pays torch's one-off costs (kernel selection, allocator growth, lazy
+    init) up front so the first real window runs at steady-state latency.
+    run_window gets a (samples, channels) float32 array like the capture stream produces.
+    """
+    rng = np.random.default_rng(0)
+    n = int(seconds * sample_rate)
+    times = []
+    for _ in range(windows):
+        # quiet noise rather than silence so the activity gate lets it through
+        audio = (rng.standard_normal((n, channels)) * 0.05).astype(np.float32)
+        start = time.perf_counter()
+        run_window(audio)
+        times.append((time.perf_counter() - start) * 1000.0)
+    print("Warm-up window latencies: " + ", ".join(f"{t:.1f} ms" for t in times))
+    return times
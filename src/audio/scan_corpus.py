@@ -0,0 +1,272 @@
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import hashlib
+import argparse
+import multiprocessing as mp
+import numpy as np
+import soundfile as sf
+import soxr
+import torch
+
+CNN_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "CNNmain", "cnnStuff", "src")
+)
+sys.path.insert(0, CNN_PATH)
+
+from direction import detect_direction
+
+# Offline scan of a directory of recordings: every file is cut into windows,
+# each window gets labels from one model plus a direction estimate, and all
+# events end up in one CSV or Parquet table. Each file's events are staged
+# under <output>.parts/ as soon as it finishes, so an interrupted scan resumes
+# where it stopped.
+
+AUDIO_EXTENSIONS = (".wav", ".flac", ".ogg", ".mp3")
+COLUMNS = ["file", "start", "end", "label", "confidence", "angle", "intensity", "model"]
+BATCH_SIZE = 16  # windows per forward pass
+
+# per-worker state, filled in by init_worker
+_backend = None
+
+
+class ASTBackend:
+    """AudioSet AST, top label per window (see classifier.py)"""
+    name = "ast"
+    segment_duration = 2.0
+
+    def __init__(self, ast_weights="fp32"):
+        from classifier import AudioClassifier
+        # every worker maps the same exported weights instead of holding its own copy
+        if ast_weights == "hub":
+            self.classifier = AudioClassifier()
+        else:
+            self.classifier = AudioClassifier(shared_weights=True, dtype=ast_weights)
+        self.sample_rate = self.classifier.sampling_rate
+
+    def classify(self, windows, threshold):
+        return [[(label, confidence)] if confidence >= threshold else []
+                for label, confidence, _ in self.classifier.classify_batch(windows)]
+
+
+class CNNBackend:
+    """Our AudioCNN, every label over the threshold per window"""
+    name = "cnn"
+
+    def __init__(self, ast_weights=None):
+        from cnnstuff.predict import load_model
+        from cnnstuff.audio_model import SAMPLE_RATE, CLIP_SECONDS, waveform_to_spectrogram
+        self.model, self.labels = load_model()
+        self.to_spectrogram = waveform_to_spectrogram
+        self.sample_rate = SAMPLE_RATE
+        self.segment_duration = CLIP_SECONDS
+
+    def classify(self, windows, threshold):
+        with torch.no_grad():
+            probs = torch.sigmoid(self.model(self.to_spectrogram(np.stack(windows)))).tolist()
+        return [[(label, p) for label, p in zip(self.labels, row) if p > threshold] for row in probs]
+
+
+BACKENDS = {"ast": ASTBackend, "cnn": CNNBackend}
+
+
+def init_worker(model_name, threads, ast_weights):
+    # several workers share the machine, so each one gets a small torch pool
+    global _backend
+    torch.set_num_threads(threads)
+    _backend = BACKENDS[model_name](ast_weights)
+
+
+def file_signature(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def iter_windows(path, segment_duration):
+    """(start seconds, (samples, channels) float32 window at the file's own rate, sample rate)"""
+    with sf.SoundFile(path) as f:
+        sr = f.samplerate
+        frames = int(segment_duration * sr)
+        start = 0
+        while True:
+            window = f.read(frames, dtype="float32", always_2d=True)
+            # keep a tail of at least half a window, like process_long_audio
+            if len(window) < max(1, frames // 2):
+                return
+            yield start / sr, window, sr
+            start += len(window)
+
+
+def window_direction(window):
+    # mono files and odd channel counts have no usable layout
+    if window.shape[1] == 1:
+        return detect_direction(window[:, 0], verbose=False)
+    try:
+        return detect_direction(window, verbose=False)
+    except ValueError:
+        return {"angle": float("nan"), "intensity": float("nan")}
+
+
+def scan_file(args):
+    """Events for one file; runs in a worker process"""
+    path, threshold, segment_duration = args
+    backend = _backend
+    segment_duration = segment_duration or backend.segment_duration
+    window_samples = int(segment_duration * backend.sample_rate)
+
+    rows = []
+    pending = []
+
+    def flush():
+        results = backend.classify([w for _, _, w in pending], threshold)
+        for (start, direction, _), labels in zip(pending, results):
+            for label, confidence in labels:
+                rows.append([path, round(start, 3), round(start + segment_duration, 3), label,
+                             round(float(confidence), 4), round(float(direction["angle"]), 1),
+                             round(float(direction["intensity"]), 4), backend.name])
+        pending.clear()
+
+    try:
+        for start, window, sr in iter_windows(path, segment_duration):
+            direction = window_direction(window)
+            mono = window.mean(axis=1)
+            if sr != backend.sample_rate:
+                mono = soxr.resample(mono, sr, backend.sample_rate)
+            mono = np.pad(mono[:window_samples], (0, max(0, window_samples - len(mono))))
+            pending.append((start, direction, mono))
+            if len(pending) >= BATCH_SIZE:
+                flush()
+        if pending:
+            flush()
+    except Exception as e:
+        # one unreadable or odd file shouldn't abort the whole scan; it is reported and retried next run
+        return path, None, f"{type(e).__name__}: {e}"
+    return path, rows, None
+
+
+def find_files(inputs):
+    files = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                files.extend(os.path.join(root, n) for n in names if n.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.extend(glob.glob(pattern, recursive=True))
+    return sorted(set(os.path.abspath(f) for f in files))
+
+
+class ScanProgress:
+    """Which files already have staged events, keyed by path and invalidated by mtime/size"""
+
+    def __init__(self, parts_dir, settings):
+        self.parts_dir = parts_dir
+        self.path = os.path.join(parts_dir, "progress.json")
+        os.makedirs(parts_dir, exist_ok=True)
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        # a different model or window setup means the staged events don't apply
+        self.settings = settings
+        self.done = data.get("files", {}) if data.get("settings") == settings else {}
+
+    def part_path(self, audio_path):
+        return os.path.join(self.parts_dir, hashlib.sha1(audio_path.encode("utf-8")).hexdigest()[:16] + ".csv")
+
+    def is_done(self, audio_path):
+        entry = self.done.get(audio_path)
+        return (entry is not None and entry["signature"] == file_signature(audio_path)
+                and os.path.exists(self.part_path(audio_path)))
+
+    def record(self, audio_path, rows):
+        part = self.part_path(audio_path)
+        with open(part + ".tmp", "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+        os.replace(part + ".tmp", part)
+        self.done[audio_path] = {"signature": file_signature(audio_path), "events": len(rows)}
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"settings": self.settings, "files": self.done}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def merge_parts(progress, files, output):
+    """Write every staged file's events into one table (Parquet if output ends in .parquet)"""
+    parts = [progress.part_path(f) for f in files if progress.is_done(f)]
+    if output.endswith(".parquet"):
+        import pandas as pd
+        frames = [pd.read_csv(p, header=None, names=COLUMNS) for p in parts if os.path.getsize(p) > 0]
+        table = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+        table.to_parquet(output, index=False)  # needs pyarrow or fastparquet
+        return len(table)
+
+    count = 0
+    with open(output + ".tmp", "w", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        for p in parts:
+            with open(p, "r", newline="") as f:
+                for row in csv.reader(f):
+                    writer.writerow(row)
+                    count += 1
+    os.replace(output + ".tmp", output)
+    return count
+
+
+def scan(inputs, output, model_name="cnn", workers=None, threads=1, threshold=0.3, segment_duration=None,
+         ast_weights="fp32"):
+    files = find_files(inputs)
+    settings = {"model": model_name, "threshold": threshold, "segment_duration": segment_duration}
+    if model_name == "ast":
+        settings["ast_weights"] = ast_weights
+    progress = ScanProgress(output + ".parts", settings)
+    todo = [f for f in files if not progress.is_done(f)]
+    print(f"📂 {len(files)} files, {len(files) - len(todo)} already scanned, {len(todo)} to go.")
+
+    workers = workers or max(1, (os.cpu_count() or 1) // threads)
+    failed = {}
+    if todo:
+        if model_name == "ast" and ast_weights != "hub":
+            # export once up front rather than letting every worker race to do it
+            from ast_weights import weights_path, export_weights
+            if not os.path.exists(weights_path(dtype=ast_weights)):
+                export_weights(dtype=ast_weights)
+
+        start = time.perf_counter()
+        # spawn so every worker loads its own model instead of inheriting a forked torch state
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(workers, initializer=init_worker, initargs=(model_name, threads, ast_weights)) as pool:
+            jobs = [(f, threshold, segment_duration) for f in todo]
+            for i, (path, rows, error) in enumerate(pool.imap_unordered(scan_file, jobs), start=1):
+                if error is not None:
+                    failed[path] = error
+                    print(f"[{i}/{len(todo)}] ❌ {os.path.basename(path)}: {error}")
+                    continue
+                progress.record(path, rows)
+                print(f"[{i}/{len(todo)}] {os.path.basename(path)}: {len(rows)} events")
+        print(f"Scanned {len(todo) - len(failed)} files in {time.perf_counter() - start:.1f}s with {workers} workers.")
+
+    count = merge_parts(progress, files, output)
+    print(f"✅ Wrote {count} events to {output}")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classify every window of a directory of recordings using all cores.")
+    parser.add_argument("inputs", nargs="+", help="Directories and/or glob patterns of audio files.")
+    parser.add_argument("--output", required=True, help="Events table; .parquet or .csv")
+    parser.add_argument("--model", choices=list(BACKENDS), default="cnn")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="torch threads per worker")
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--segment", type=float, default=None,
+                        help="Window length in seconds (default: 3.0 for cnn, 2.0 for ast)")
+    parser.add_argument("--ast_weights", choices=["fp32", "bf16", "hub"], default="fp32",
+                        help="AST weights: shared memory-mapped fp32/bf16 export, or a private hub copy per worker")
+    args = parser.parse_args()
+
+    scan(args.inputs, args.output, args.model, args.workers, args.threads, args.threshold, args.segment,
+         args.ast_weights)
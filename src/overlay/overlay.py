@@ -4,11 +4,19 @@
 import tkinter as tk
 import math
 import os
-import json
-import random
+import sys
 import time
+from collections import deque
+import numpy as np
 
-JSON_PATH = "latest_direction.json"  # same location capture.py writes to
+CNN_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "CNNmain", "cnnStuff", "src")
+)
+sys.path.insert(0, CNN_PATH)
+
+from cnnstuff.detection_record import DetectionCodec, load_labels, read_record
+
+DETECTION_PATH = "latest_detection.bin"  # same location capture.py writes to
 
 ICON_MAP = {
     "footsteps": "",
@@ -20,23 +28,79 @@ ICON_MAP = {
     "background": ""
 }
 
-def read_json(path):
-    try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            raw = f.read()
+def read_detection(path, codec):
+    """Latest detection dict, None if nothing complete has been written yet.
 
-        if not raw or raw.strip() == "":
-            return None
+    Raises ValueError if capture writes a different record version or labels.json.
+    """
+    data = read_record(path)
+    if data is None:
+        return None
+    return codec.decode(data)
+
+
+class ParticleBuffer:
+    """Struct-of-arrays particle storage so fading and culling run as array ops"""
+
+    def __init__(self, capacity=1024):
+        self.count = 0
+        self.x = np.empty(capacity, dtype=np.float32)
+        self.y = np.empty(capacity, dtype=np.float32)
+        self.size = np.empty(capacity, dtype=np.float32)
+        self.alpha = np.empty(capacity, dtype=np.float32)
+        self.color_row = np.empty(capacity, dtype=np.intp)  # intensity row in the color LUT
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self, needed):
+        capacity = len(self.x)
+        while capacity < needed:
+            capacity *= 2
+        for name in ("x", "y", "size", "alpha", "color_row"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def spawn(self, x, y, size, alpha, color_row):
+        n = len(x)
+        if n == 0:
+            return
+        end = self.count + n
+        if end > len(self.x):
+            self._grow(end)
+        self.x[self.count:end] = x
+        self.y[self.count:end] = y
+        self.size[self.count:end] = size
+        self.alpha[self.count:end] = alpha
+        self.color_row[self.count:end] = color_row
+        self.count = end
+
+    def fade(self, rate):
+        # fade everything, then compact the survivors to the front of the buffers
+        n = self.count
+        self.alpha[:n] -= rate
+        alive = self.alpha[:n] > 0
+        kept = int(np.count_nonzero(alive))
+        if kept != n:
+            for arr in (self.x, self.y, self.size, self.alpha, self.color_row):
+                arr[:kept] = arr[:n][alive]
+            self.count = kept
+
+    def keep_newest(self, n):
+        # particles are stored oldest first, so drop from the front
+        drop = self.count - n
+        if drop <= 0:
+            return
+        for arr in (self.x, self.y, self.size, self.alpha, self.color_row):
+            arr[:n] = arr[drop:self.count]
+        self.count = n
 
-        raw = raw.strip()
-        if not raw.startswith("{") or not raw.endswith("}"):
-            return None
+    def clear(self):
+        self.count = 0
 
-        return json.loads(raw)
 
-    except:
-        return None
-    
 class Overlay(tk.Tk):
     MAX_PARTICLES = 120   # adjust
     PARTICLE_SIZE = (2, 6)
@@ -44,10 +108,32 @@ class Overlay(tk.Tk):
     ICON_FADE_RATE = 0.03
     CIRCLE_RADIUS = 250
 
-    def __init__(self, *a, **kw):
+    # resolution of the precomputed Tk color tables
+    COLOR_INTENSITY_STEPS = 64
+    COLOR_ALPHA_STEPS = 32
+
+    FRAME_INTERVAL_MS = 33   # animation tick
+    UPDATE_INTERVAL_MS = 70  # how often the detection record is polled
+
+    # adaptive budget: quality scales spawn counts, particle lifetime and icons
+    FRAME_BUDGET_MS = 6.0    # CPU time per animation frame the overlay may use
+    MIN_QUALITY = 0.15
+    PARTICLE_CAP = 1500      # live particles allowed at full quality
+    MAX_ICONS = 12           # live icons allowed at full quality
+    SHOW_STATS = False       # draw the budget stats in the corner
+
+    def __init__(self, *a, frame_budget_ms=None, replay=None, **kw):
         tk.Tk.__init__(self, *a, **kw)
         super().__init__(*a, **kw)
 
+        self.frame_budget_ms = frame_budget_ms or self.FRAME_BUDGET_MS
+        self.quality = 1.0
+        self.frame_ms_ema = 0.0
+        self.frame_times = deque(maxlen=120)
+        self.codec = DetectionCodec(load_labels())
+        self.record_error = None
+        self.replay = replay  # LogReplay to play back a detection log instead of following capture
+
         self.update_idletasks()
         self.WINDOW_W = self.winfo_screenwidth()
         self.WINDOW_H = self.winfo_screenheight()
@@ -55,8 +141,10 @@ class Overlay(tk.Tk):
 
         self._setup_window()
         self._create_ui_elements()
+        self._build_color_tables()
 
-        self.active_particles = []
+        self.rng = np.random.default_rng()
+        self.active_particles = ParticleBuffer()
         self.active_icons = []
 
         self.update_overlay()
@@ -82,6 +170,20 @@ class Overlay(tk.Tk):
             cx + r, cy + r,
             outline="#b5b5b5", width=2
 )
+
+    def _build_color_tables(self):
+        # every (intensity, alpha) color string is formatted once here instead of per particle per frame
+        n_int = self.COLOR_INTENSITY_STEPS
+        n_alpha = self.COLOR_ALPHA_STEPS
+        self.color_lut = np.empty((n_int, n_alpha), dtype=object)
+        for i in range(n_int):
+            for a in range(n_alpha):
+                self.color_lut[i, a] = self.intensity_to_color(i / (n_int - 1), a / (n_alpha - 1))
+        self.fade_lut = [self.fade_color(a / (n_alpha - 1)) for a in range(n_alpha)]
+
+    def _alpha_index(self, alpha):
+        return np.rint(np.clip(alpha, 0.0, 1.0) * (self.COLOR_ALPHA_STEPS - 1)).astype(np.intp)
+
     #indicates where mouse is in relation to window
     def _click(self, event): 
         self.x_offset = self.winfo_pointerx() - self.winfo_rootx()
@@ -96,7 +198,6 @@ class Overlay(tk.Tk):
         if intensity <= 0:
             return
 
-        count = max(10, int(intensity * self.MAX_PARTICLES))
         base_ang = math.radians(angle_deg)
         cx, cy = self.CENTER
         R = self.CIRCLE_RADIUS
@@ -117,41 +218,39 @@ class Overlay(tk.Tk):
             spread_mult = 1.0
             count_mult = 1.0
 
-        count = int(count * count_mult)
+        count = int(count * count_mult * self.quality)
 
         max_spread_deg = max(10, 60 * (1 - intensity)**0.6)
         boosted_spread = math.radians(max_spread_deg * spread_mult)
 
-        for _ in range(count):
-            ang_offset = random.uniform(-boosted_spread, boosted_spread)
-            a = base_ang + ang_offset
-            dist_factor = abs(ang_offset) / boosted_spread 
+        rng = self.rng
+        ang_offset = rng.uniform(-boosted_spread, boosted_spread, count)
+        dist_factor = np.abs(ang_offset) / boosted_spread
 
-            if random.random() < dist_factor:
-                continue  
+        # particles further from the center of the arc are more likely to be dropped
+        keep = rng.random(count) >= dist_factor
+        ang_offset = ang_offset[keep]
+        dist_factor = dist_factor[keep]
+        n = len(ang_offset)
 
-            radial_offset = random.uniform(-6 * spread_mult, 6 * spread_mult)
-            radius = R + radial_offset
+        radial_offset = rng.uniform(-6 * spread_mult, 6 * spread_mult, n)
+        radius = R + radial_offset
+        a = base_ang + ang_offset
 
-            x = cx + radius * math.cos(a)
-            y = cy - radius * math.sin(a)
+        x = cx + radius * np.cos(a)
+        y = cy - radius * np.sin(a)
 
-            # size taper
-            size = random.uniform(*self.PARTICLE_SIZE) * (1 - 0.45 * dist_factor)
+        # size taper
+        size = rng.uniform(*self.PARTICLE_SIZE, n) * (1 - 0.45 * dist_factor)
 
-            # color & opacity taper 
-            alpha = 1.0 * (1 - 0.35 * dist_factor)
+        # color & opacity taper 
+        alpha = 1.0 * (1 - 0.35 * dist_factor)
 
-            p = {
-                "x": x,
-                "y": y,
-                "size": size,
-                "alpha": alpha,
-                "intensity": intensity,
-                "dist_factor": dist_factor
-            }
+        intensity = max(0.0, min(1.0, intensity))
+        color_row = int(round(intensity * (self.COLOR_INTENSITY_STEPS - 1)))
 
-            self.active_particles.append(p)
+        self.active_particles.spawn(x, y, size, alpha, color_row)
+        self.active_particles.keep_newest(int(self.PARTICLE_CAP * self.quality))
 
     def emit_icon(self, angle_deg, labels):
         if not isinstance(labels, list):
@@ -159,6 +258,10 @@ class Overlay(tk.Tk):
 
         angle_rad = math.radians(angle_deg)
 
+        # under load keep fewer icons alive; newest win
+        max_icons = max(1, int(self.MAX_ICONS * self.quality))
+        labels = labels[:max_icons]
+
         for i, label in enumerate(labels):
             emoji = ICON_MAP.get(label, "❓")
 
@@ -181,29 +284,41 @@ class Overlay(tk.Tk):
         return f"#{val:02x}{val:02x}{val:02x}"
 
     def animate(self):
+        start = time.perf_counter()
+        self.draw_frame()
+        self._update_budget((time.perf_counter() - start) * 1000.0)
+
+        # if even minimum quality doesn't fit, tick less often instead of stuttering
+        interval = self.FRAME_INTERVAL_MS
+        if self.quality <= self.MIN_QUALITY and self.frame_ms_ema > self.frame_budget_ms:
+            interval = int(self.FRAME_INTERVAL_MS * 1.5)
+        self.after(interval, self.animate)
+
+    def draw_frame(self):
         self.canvas.delete("particle")
         self.canvas.delete("icon")
 
-        # animate particles
-        new_particles = []
-        for p in self.active_particles:
-            p["alpha"] -= self.FADE_RATE
-            if p["alpha"] > 0:
-                col = self.intensity_to_color(p["intensity"], p["alpha"])
-                self.canvas.create_oval(
-                    p["x"] - p["size"], p["y"] - p["size"],
-                    p["x"] + p["size"], p["y"] + p["size"],
-                    fill=col, outline="", tags="particle"
-                )
-                new_particles.append(p)
-        self.active_particles = new_particles
+        # animate particles; at lower quality they fade out faster (up to 2x)
+        particles = self.active_particles
+        particles.fade(self.FADE_RATE * (2.0 - self.quality))
+        n = len(particles)
+        if n:
+            x = particles.x[:n]
+            y = particles.y[:n]
+            size = particles.size[:n]
+            colors = self.color_lut[particles.color_row[:n], self._alpha_index(particles.alpha[:n])]
+            create_oval = self.canvas.create_oval
+            for x0, y0, x1, y1, col in zip((x - size).tolist(), (y - size).tolist(),
+                                           (x + size).tolist(), (y + size).tolist(), colors):
+                create_oval(x0, y0, x1, y1, fill=col, outline="", tags="particle")
 
         # animate icons
+        max_icons = max(1, int(self.MAX_ICONS * self.quality))
         new_icons = []
-        for icon in self.active_icons:
+        for icon in self.active_icons[-max_icons:]:
             icon["alpha"] -= self.ICON_FADE_RATE
             if icon["alpha"] > 0:
-                fill = self.fade_color(icon["alpha"])
+                fill = self.fade_lut[int(self._alpha_index(icon["alpha"]))]
                 self.canvas.create_text(
                     icon["x"], icon["y"],
                     text=icon["emoji"],
@@ -213,20 +328,73 @@ class Overlay(tk.Tk):
                 )
                 new_icons.append(icon)
         self.active_icons = new_icons
-        self.after(33, self.animate)
+
+        if self.SHOW_STATS:
+            stats = self.budget_stats()
+            self.canvas.create_text(
+                10, 10, anchor="nw", fill="#b5b5b5", font=("Consolas", 10), tags="icon",
+                text=(f"frame {stats['frame_ms_ema']:.1f}/{stats['budget_ms']:.1f} ms  "
+                      f"p95 {stats['frame_ms_p95']:.1f}  q {stats['quality']:.2f}  "
+                      f"particles {stats['particles']}")
+            )
+
+    def _update_budget(self, frame_ms):
+        self.frame_times.append(frame_ms)
+        self.frame_ms_ema = 0.8 * self.frame_ms_ema + 0.2 * frame_ms if self.frame_ms_ema else frame_ms
+
+        # back off quickly when over budget, recover slowly when well under it
+        if self.frame_ms_ema > self.frame_budget_ms:
+            self.quality = max(self.MIN_QUALITY, self.quality * 0.85)
+        elif self.frame_ms_ema < 0.7 * self.frame_budget_ms:
+            self.quality = min(1.0, self.quality + 0.02)
+
+    def budget_stats(self):
+        """Current quality level and recent frame-time stats"""
+        times = np.array(self.frame_times) if self.frame_times else np.zeros(1)
+        return {
+            "budget_ms": self.frame_budget_ms,
+            "quality": self.quality,
+            "frame_ms_ema": self.frame_ms_ema,
+            "frame_ms_p95": float(np.percentile(times, 95)),
+            "frame_ms_max": float(times.max()),
+            "particles": len(self.active_particles),
+            "particle_cap": int(self.PARTICLE_CAP * self.quality),
+            "icons": len(self.active_icons),
+        }
+
+    def read_capture(self):
+        try:
+            return read_detection(DETECTION_PATH, self.codec)
+        except ValueError:
+            # capture switches labels when a retrained model is hot-reloaded
+            labels = load_labels()
+            if labels == self.codec.labels:
+                raise
+            self.codec = DetectionCodec(labels)
+            return read_detection(DETECTION_PATH, self.codec)
 
     def update_overlay(self):
-        data = read_json(JSON_PATH)
+        try:
+            if self.replay is not None:
+                data = self.replay.current()
+            else:
+                data = self.read_capture()
+        except ValueError as e:
+            # keep polling in case capture is restarted; only report each problem once
+            if str(e) != self.record_error:
+                print(f"Skipping detection record: {e}")
+                self.record_error = str(e)
+            data = None
         if data:
-            angle = data.get("angle", 0)
-            intensity = data.get("intensity", 0)
-            label = data.get("label", "background")
+            angle = data["angle"]
+            intensity = data["intensity"]
+            label = data["label"]
 
             if intensity > 0.05:  # adjust threshold if needed
                 self.spawn_particles(angle, intensity)
                 self.emit_icon(angle, label)
 
-        self.after(70, self.update_overlay)
+        self.after(self.UPDATE_INTERVAL_MS, self.update_overlay)
 
     def intensity_to_color(self, intensity, alpha=1.0):
         #Convert intensity (0-1) into a gradient
@@ -267,5 +435,14 @@ class Overlay(tk.Tk):
 
 #driver code
 if __name__ == "__main__":
-    app = Overlay()
+    import argparse
+    from cnnstuff.event_log import LogReplay, read_log
+
+    parser = argparse.ArgumentParser(description="Direction overlay for live capture or a recorded detection log.")
+    parser.add_argument("--replay", default=None, help="Detection log segment or directory (e.g. data/event_log)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier, e.g. 1, 4, 10")
+    args = parser.parse_args()
+
+    replay = LogReplay(read_log(args.replay), args.speed) if args.replay else None
+    app = Overlay(replay=replay)
     app.run()
\ No newline at end of file